@@ -0,0 +1,115 @@
+"""
+Suggestions de saisie (clients, missions, utilisateurs) pour les champs à
+complétion automatique des formulaires.
+
+Index de préfixes EntreeAutocompletion : pour chaque libellé, une ligne par
+début de mot ("Société Générale" -> "societe generale", "generale"). Le
+préfixe tapé, quel que soit le mot, se résout donc par un parcours
+d'intervalle sur l'index (type_objet, cle). Tenu à jour par les signaux,
+reconstruit par ``rebuild_search_index``. Les réponses sont mises en cache
+par utilisateur (le périmètre dépend du rôle) pendant AUTOCOMPLETION_CACHE_TTL.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Client, EntreeAutocompletion, Mission, Utilisateur
+from .permissions import is_admin
+from .recherche import normaliser
+
+LONGUEUR_CLE = 100
+ROLES_INTERVENANTS = ('employe', 'freelance')
+# Objets (ré)indexés par requête
+TAILLE_LOT = 500
+
+MODELES = {
+    'client': Client,
+    'mission': Mission,
+    'utilisateur': Utilisateur,
+}
+
+
+def _libelles(type_objet, ids):
+    """(objet_id, libellé, catégorie) des objets à indexer"""
+    if type_objet == 'client':
+        return [(pk, nom, '') for pk, nom in Client.objects.filter(pk__in=ids).values_list('pk', 'nom')]
+    if type_objet == 'mission':
+        return [(pk, titre, '') for pk, titre in Mission.objects.filter(pk__in=ids).values_list('pk', 'titre')]
+    return [
+        (pk, f"{prenom} {nom} ({identifiant})".strip() if prenom or nom else identifiant, role)
+        for pk, prenom, nom, identifiant, role in Utilisateur.objects.filter(pk__in=ids).values_list(
+            'pk', 'first_name', 'last_name', 'username', 'role'
+        )
+    ]
+
+
+def _cles(libelle):
+    """Le libellé normalisé à partir de chacun de ses mots"""
+    mots = normaliser(libelle).split()
+    return {' '.join(mots[i:])[:LONGUEUR_CLE] for i in range(len(mots))}
+
+
+def indexer_suggestions(type_objet, ids):
+    """(Ré)indexe les libellés des objets donnés ; ceux qui n'existent plus sont retirés"""
+    ids = list(ids)
+    for debut in range(0, len(ids), TAILLE_LOT):
+        _indexer_lot(type_objet, ids[debut:debut + TAILLE_LOT])
+
+
+def _indexer_lot(type_objet, ids):
+    entrees = [
+        EntreeAutocompletion(type_objet=type_objet, objet_id=objet_id, cle=cle, libelle=libelle[:255], categorie=categorie)
+        for objet_id, libelle, categorie in _libelles(type_objet, ids)
+        for cle in _cles(libelle)
+    ]
+    with transaction.atomic():
+        retirer_suggestions(type_objet, ids)
+        EntreeAutocompletion.objects.bulk_create(entrees, batch_size=2000)
+
+
+def retirer_suggestions(type_objet, ids):
+    EntreeAutocompletion.objects.filter(type_objet=type_objet, objet_id__in=list(ids)).delete()
+
+
+def _perimetre(entrees, utilisateur, type_objet):
+    """Restreint les suggestions à ce que l'utilisateur peut choisir"""
+    if type_objet == 'utilisateur':
+        return entrees.filter(categorie__in=ROLES_INTERVENANTS)
+    if type_objet == 'mission' and not is_admin(utilisateur):
+        return entrees.filter(objet_id__in=Mission.objects.visible_to(utilisateur).values('pk'))
+    return entrees
+
+
+def suggerer(utilisateur, type_objet, texte, limite=10):
+    """[{'id', 'libelle'}] des objets dont un mot commence par ``texte``, par ordre alphabétique"""
+    prefixe = ' '.join(normaliser(texte).split())[:LONGUEUR_CLE]
+    if not prefixe:
+        return []
+
+    def calcul():
+        entrees = _perimetre(
+            EntreeAutocompletion.objects.filter(type_objet=type_objet, cle__gte=prefixe, cle__lt=prefixe + '\uffff'),
+            utilisateur, type_objet
+        )
+        resultats = {}
+        # Un objet peut correspondre par plusieurs de ses mots : on lit un peu plus que la limite
+        for objet_id, libelle in entrees.order_by('cle').values_list('objet_id', 'libelle')[:limite * 3]:
+            resultats.setdefault(objet_id, libelle)
+        return [{'id': objet_id, 'libelle': libelle} for objet_id, libelle in list(resultats.items())[:limite]]
+
+    ttl = getattr(settings, 'AUTOCOMPLETION_CACHE_TTL', 0)
+    if not ttl:
+        return calcul()
+    empreinte = hashlib.md5(prefixe.encode()).hexdigest()
+    return cache.get_or_set(f"autocompletion:{utilisateur.pk}:{type_objet}:{empreinte}:{limite}", calcul, ttl)
+
+
+def libelle_suggestion(type_objet, objet_id):
+    """Libellé affiché pour une valeur déjà choisie"""
+    if not objet_id:
+        return ''
+    return EntreeAutocompletion.objects.filter(
+        type_objet=type_objet, objet_id=objet_id
+    ).values_list('libelle', flat=True).first() or ''
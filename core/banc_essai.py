@@ -0,0 +1,136 @@
+"""
+Banc d'essai des vues principales (commande ``benchmark_vues``).
+
+Chaque scénario appelle une vue via le client de test de Django, connecté sous un
+utilisateur du jeu de données (voir core/jeu_donnees.py), et mesure la latence de
+bout en bout (middlewares et rendu compris) et le nombre de requêtes SQL. Les
+appels d'échauffement ne sont pas comptés. Les scénarios qui modifient des
+données (POST de détection des retards) sont exécutés dans une transaction
+annulée : chaque itération repart du même état.
+
+Le résultat (p50, p95, maximum, requêtes SQL) se compare à une référence JSON
+enregistrée sur la même machine et le même jeu de données : une hausse du nombre
+de requêtes ou un p95 au-delà de la tolérance est une régression.
+"""
+import math
+import time
+from contextlib import nullcontext
+from urllib.parse import urlencode
+
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client as ClientTest
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from . import pdf
+from .jeu_donnees import PREFIXE
+from .models import DocumentRecherche, Mission, TermeRecherche, Utilisateur
+
+# Tolérance sur le p95 : proportion de la référence, plus une marge absolue contre le bruit
+TOLERANCE = 0.25
+MARGE_MS = 5
+
+
+def centile(valeurs, proportion):
+    """Centile par rang le plus proche"""
+    ordonnees = sorted(valeurs)
+    return ordonnees[max(0, math.ceil(proportion * len(ordonnees)) - 1)]
+
+
+def _terme_frequent():
+    """Terme de l'index de recherche présent dans le plus de documents"""
+    terme = (
+        TermeRecherche.objects.values('terme').annotate(nombre=Count('pk'))
+        .order_by('-nombre', 'terme').values_list('terme', flat=True).first()
+    )
+    return terme or 'maintenance'
+
+
+def scenarios():
+    """Scénarios mesurés, construits à partir des données présentes en base"""
+    utilisateurs = Utilisateur.objects.filter(username__startswith=PREFIXE, is_active=True)
+    admin = utilisateurs.filter(role='administrateur').order_by('pk').first()
+    # L'intervenant le plus chargé : le pire cas des listes filtrées par utilisateur
+    employe = utilisateurs.filter(role__in=['employe', 'freelance']).order_by('-notifications_non_lues', 'pk').first()
+    mission = Mission.objects.filter(assigne_a__username__startswith=PREFIXE).order_by('pk').first()
+    if admin is None or employe is None or mission is None or not DocumentRecherche.objects.exists():
+        return None
+
+    def pdf_a_rendre():
+        # Rendu supprimé avant chaque appel : la vue reconstruit le PDF
+        pdf.invalider_rendus('mission', [mission.pk])
+
+    recherche = reverse('search') + '?' + urlencode({'q': _terme_frequent()})
+    return [
+        {'nom': 'dashboard', 'utilisateur': admin, 'url': reverse('dashboard')},
+        {'nom': 'dashboard_employe', 'utilisateur': employe, 'url': reverse('dashboard')},
+        {'nom': 'intervention_list', 'utilisateur': admin, 'url': reverse('intervention_list')},
+        {'nom': 'intervention_list_employe', 'utilisateur': employe, 'url': reverse('intervention_list')},
+        {'nom': 'search', 'utilisateur': admin, 'url': recherche},
+        {'nom': 'search_employe', 'utilisateur': employe, 'url': recherche},
+        {
+            'nom': 'generer_pdf_mission', 'utilisateur': admin, 'preparer': pdf_a_rendre,
+            'url': reverse('generer_pdf_mission', args=[mission.pk]), 'reglages': {'PDF_RENDU_ASYNCHRONE': False},
+        },
+        {'nom': 'check_retards', 'utilisateur': admin, 'url': reverse('check_retards_automatiques')},
+        {
+            'nom': 'check_retards_post', 'utilisateur': admin, 'methode': 'post', 'annuler': True,
+            'url': reverse('check_retards_automatiques'),
+        },
+    ]
+
+
+def _appel(client, scenario):
+    reponse = getattr(client, scenario.get('methode', 'get'))(scenario['url'])
+    if reponse.status_code >= 400:
+        raise RuntimeError(f"{scenario['nom']} : réponse {reponse.status_code}")
+    if reponse.streaming:
+        for _ in reponse.streaming_content:
+            pass
+    return reponse
+
+
+def mesurer(scenario, iterations=20, echauffement=2):
+    """Latences (ms) et nombre de requêtes SQL d'un scénario"""
+    client = ClientTest()
+    client.force_login(scenario['utilisateur'])
+    durees = []
+    requetes = []
+    with override_settings(**scenario.get('reglages', {})):
+        for numero in range(echauffement + iterations):
+            if 'preparer' in scenario:
+                scenario['preparer']()
+            with transaction.atomic() if scenario.get('annuler') else nullcontext():
+                with CaptureQueriesContext(connection) as capture:
+                    debut = time.perf_counter()
+                    _appel(client, scenario)
+                    duree = (time.perf_counter() - debut) * 1000
+                if scenario.get('annuler'):
+                    transaction.set_rollback(True)
+            if numero >= echauffement:
+                durees.append(duree)
+                requetes.append(len(capture.captured_queries))
+    return {
+        'p50_ms': round(centile(durees, 0.5), 2),
+        'p95_ms': round(centile(durees, 0.95), 2),
+        'max_ms': round(max(durees), 2),
+        'requetes': max(requetes),
+    }
+
+
+def comparer(resultats, reference, tolerance=TOLERANCE, marge_ms=MARGE_MS):
+    """Régressions par rapport à la référence, une phrase par écart"""
+    regressions = []
+    for nom, mesure in resultats.items():
+        attendu = reference.get(nom)
+        if attendu is None:
+            continue
+        if mesure['requetes'] > attendu['requetes']:
+            regressions.append(f"{nom} : {mesure['requetes']} requêtes SQL (référence {attendu['requetes']})")
+        limite = attendu['p95_ms'] * (1 + tolerance) + marge_ms
+        if mesure['p95_ms'] > limite:
+            regressions.append(
+                f"{nom} : p95 {mesure['p95_ms']:.1f} ms (référence {attendu['p95_ms']:.1f} ms, limite {limite:.1f} ms)"
+            )
+    return regressions
@@ -1,8 +1,7 @@
-from .models import Notification
-
 def unread_notifications(request):
     if request.user.is_authenticated:
-        count = Notification.objects.filter(utilisateur=request.user, lue=False).count()
+        # Compteur dénormalisé sur l'utilisateur, déjà chargé par AuthenticationMiddleware
+        count = request.user.notifications_non_lues
     else:
         count = 0
-    return {'unread_notifications_count': count} 
\ No newline at end of file
+    return {'unread_notifications_count': count} 
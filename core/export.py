@@ -0,0 +1,198 @@
+"""
+Export groupé des rapports de missions en archive ZIP.
+
+Les PDF passent par la file RenduPDF (core/pdf.py) : un PDF déjà rendu pour
+l'état actuel de la mission est repris du cache, un nouveau rendu l'alimente.
+L'archive est produite au fil de l'eau (générateurs d'octets utilisables tels
+quels par une StreamingHttpResponse), elle n'est jamais entière en mémoire.
+
+- ``archiver_rendus`` (vue export_missions) n'assemble que des rendus terminés
+  par le worker render_pdfs : la requête ne rend aucun PDF elle-même ;
+- ``exporter_zip`` (commande export_missions_zip) rend les PDF manquants dans un
+  pool de processus (ReportLab est limité par le GIL).
+"""
+import itertools
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+
+import django
+from django.apps import apps
+from django.core.files.storage import default_storage
+from django.db import connections
+
+from .models import Mission
+from .pdf import demander_rendu, rendre_fichier_temporaire, rendre_si_en_attente
+
+# Taille des blocs copiés dans l'archive
+TAILLE_BLOC = 64 * 1024
+
+
+def missions_a_exporter(client=None, date_debut=None, date_fin=None, statut=None):
+    """Missions retenues par les filtres de l'export (tous optionnels)"""
+    missions = Mission.objects.all()
+    if client is not None:
+        missions = missions.filter(client=client)
+    if date_debut is not None:
+        missions = missions.filter(date__gte=date_debut)
+    if date_fin is not None:
+        missions = missions.filter(date__lte=date_fin)
+    if statut:
+        missions = missions.filter(statut=statut)
+    return missions.order_by('client__nom', 'date', 'id')
+
+
+def _initialiser_processus():
+    if not apps.ready:
+        django.setup()
+
+
+def _rendre_mission(mission_id):
+    """
+    Exécuté dans un processus du pool. Retourne (chemin, temporaire) : le fichier du
+    cache RenduPDF, ou un fichier temporaire à supprimer si le rendu n'a pas pu y être déposé.
+    """
+    rendu = rendre_si_en_attente(demander_rendu('mission', mission_id))
+    if rendu is not None and rendu.statut == 'termine':
+        return rendu.fichier.name, False
+    with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as fichier:
+        with rendre_fichier_temporaire('mission', mission_id) as tampon:
+            shutil.copyfileobj(tampon, fichier)
+    return fichier.name, True
+
+
+def _rendre_en_parallele(mission_ids, processus):
+    """Génère (mission_id, future) au fil des rendus terminés, au plus 2 rendus en avance par processus"""
+    # Les processus forkés ne doivent pas partager les connexions ouvertes du parent
+    connections.close_all()
+    contexte = multiprocessing.get_context('fork') if 'fork' in multiprocessing.get_all_start_methods() else None
+    restants = iter(mission_ids)
+    with ProcessPoolExecutor(max_workers=processus, mp_context=contexte, initializer=_initialiser_processus) as pool:
+        en_cours = {pool.submit(_rendre_mission, mission_id): mission_id
+                    for mission_id in itertools.islice(restants, 2 * processus)}
+        try:
+            while en_cours:
+                termines, _ = wait(en_cours, return_when=FIRST_COMPLETED)
+                for future in termines:
+                    mission_id = en_cours.pop(future)
+                    for suivant in itertools.islice(restants, 1):
+                        en_cours[pool.submit(_rendre_mission, suivant)] = suivant
+                    yield mission_id, future
+        finally:
+            for future in en_cours:
+                future.cancel()
+
+
+def _rendre_en_sequence(mission_ids):
+    """Même interface que ``_rendre_en_parallele``, rendus dans le processus courant"""
+    for mission_id in mission_ids:
+        future = Future()
+        try:
+            future.set_result(_rendre_mission(mission_id))
+        except Exception as exc:
+            future.set_exception(exc)
+        yield mission_id, future
+
+
+class _FluxZip:
+    """
+    Sortie non positionnable de zipfile : chaque entrée est suivie d'un descripteur
+    de données, les octets écrits sont récupérés par ``vider``.
+    """
+
+    def __init__(self):
+        self._blocs = []
+
+    def write(self, donnees):
+        self._blocs.append(bytes(donnees))
+        return len(donnees)
+
+    def flush(self):
+        pass
+
+    def vider(self):
+        blocs, self._blocs = self._blocs, []
+        return blocs
+
+
+def _resultats(rendus):
+    """(mission_id, chemin, temporaire, erreur) à partir des (mission_id, future) des rendus"""
+    for mission_id, future in rendus:
+        try:
+            chemin, temporaire = future.result()
+        except Exception as exc:
+            yield mission_id, None, False, f"{type(exc).__name__}: {exc}"
+        else:
+            yield mission_id, chemin, temporaire, None
+
+
+def _archiver(resultats, total, progression=None):
+    """
+    Octets d'une archive ZIP à partir de (mission_id, chemin, temporaire, erreur) : ``chemin``
+    dans le stockage, ou fichier temporaire à supprimer ; les erreurs vont dans ERREURS.txt.
+    """
+    flux = _FluxZip()
+    erreurs = []
+    with zipfile.ZipFile(flux, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for fait, (mission_id, chemin, temporaire, erreur) in enumerate(resultats, 1):
+            source = None
+            if erreur is None:
+                try:
+                    source = open(chemin, 'rb') if temporaire else default_storage.open(chemin, 'rb')
+                except OSError as exc:
+                    # Rendu invalidé (mission modifiée) depuis la constitution de l'export
+                    erreur = f"{type(exc).__name__}: {exc}"
+            if source is None:
+                erreurs.append(f"Mission {mission_id} : {erreur}")
+            else:
+                try:
+                    entete = zipfile.ZipInfo(f"rapport_mission_{mission_id}.pdf", time.localtime()[:6])
+                    entete.compress_type = zipfile.ZIP_DEFLATED
+                    with archive.open(entete, 'w', force_zip64=True) as entree:
+                        for bloc in iter(lambda: source.read(TAILLE_BLOC), b''):
+                            entree.write(bloc)
+                            yield from flux.vider()
+                finally:
+                    source.close()
+                    if temporaire:
+                        os.unlink(chemin)
+            if progression is not None:
+                progression(fait, total)
+            yield from flux.vider()
+        if erreurs:
+            archive.writestr('ERREURS.txt', '\n'.join(erreurs))
+    yield from flux.vider()
+
+
+def exporter_zip(mission_ids, processus=None, progression=None):
+    """
+    Générateur des octets d'une archive ZIP contenant le rapport PDF de chaque mission,
+    rendu si nécessaire dans ce processus ou dans un pool (hors requête HTTP : commande
+    export_missions_zip). ``processus`` : taille du pool (nombre de CPU par défaut, 1 pour
+    rendre dans le processus courant). ``progression(fait, total)`` est appelée après
+    chaque mission ; les missions en échec sont listées dans ERREURS.txt à la fin de l'archive.
+    """
+    mission_ids = list(mission_ids)
+    processus = processus or os.cpu_count() or 1
+    if processus > 1 and len(mission_ids) > 1:
+        rendus = _rendre_en_parallele(mission_ids, processus)
+    else:
+        rendus = _rendre_en_sequence(mission_ids)
+    return _archiver(_resultats(rendus), len(mission_ids), progression)
+
+
+def archiver_rendus(rendus):
+    """
+    Générateur des octets d'une archive ZIP des rendus de missions traités par la file
+    (statut terminé ou en échec) ; les rendus en échec sont listés dans ERREURS.txt.
+    """
+    rendus = list(rendus)
+    return _archiver((
+        (rendu.objet_id, rendu.fichier.name, False, None) if rendu.statut == 'termine'
+        else (rendu.objet_id, None, False, rendu.erreur or rendu.get_statut_display())
+        for rendu in rendus
+    ), len(rendus))
@@ -1,9 +1,27 @@
 from django import forms
 from django.forms import modelformset_factory
 from django.contrib.auth.forms import UserCreationForm
-from .models import Utilisateur, Mission, Intervention, RapportIntervention, PieceJointe, RetardIntervention
+from .models import Utilisateur, Client, Mission, Intervention, RapportIntervention, PieceJointe, RetardIntervention
+from .autocompletion import libelle_suggestion
 from datetime import date
 
+class AutocompletionWidget(forms.Widget):
+    """
+    Champ texte à suggestions (vue ``autocompletion``) à la place d'un <select> :
+    l'identifiant choisi est porté par un champ caché, aucune liste n'est chargée avec la page.
+    """
+    template_name = 'core/widgets/autocompletion.html'
+
+    def __init__(self, type_objet, attrs=None):
+        super().__init__(attrs)
+        self.type_objet = type_objet
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        context['widget']['type_objet'] = self.type_objet
+        context['widget']['libelle'] = libelle_suggestion(self.type_objet, context['widget']['value'])
+        return context
+
 class UtilisateurCreationForm(UserCreationForm):
     class Meta:
         model = Utilisateur
@@ -66,12 +84,12 @@ class InterventionForm(forms.ModelForm):
                 'class': 'form-input',
                 'placeholder': 'Titre de l\'intervention'
             }),
-            'mission': forms.Select(attrs={
-                'class': 'form-select',
+            'mission': AutocompletionWidget('mission', attrs={
+                'class': 'form-input',
                 'placeholder': 'Sélectionnez une mission'
             }),
-            'intervenant': forms.Select(attrs={
-                'class': 'form-select',
+            'intervenant': AutocompletionWidget('utilisateur', attrs={
+                'class': 'form-input',
                 'placeholder': 'Sélectionnez un intervenant'
             }),
             'date': forms.DateInput(attrs={
@@ -123,7 +141,7 @@ class PieceJointeForm(forms.ModelForm):
         fields = ['titre', 'fichier', 'type_fichier', 'description']
         widgets = {
             'titre': forms.TextInput(attrs={'class': 'form-control'}),
-            'fichier': forms.FileInput(attrs={'class': 'form-control'}),
+            'fichier': forms.FileInput(attrs={'class': 'form-control', 'data-televersement': ''}),
             'type_fichier': forms.Select(attrs={'class': 'form-control'}),
             'description': forms.Textarea(attrs={'class': 'form-control', 'rows': 3}),
         }
@@ -333,4 +351,28 @@ class InterventionRetardForm(forms.ModelForm):
         super().__init__(*args, **kwargs)
         for field in self.fields.values():
             if not isinstance(field.widget, forms.CheckboxInput):
-                field.widget.attrs['class'] = 'form-control' 
\ No newline at end of file
+                field.widget.attrs['class'] = 'form-control'
+
+class ExportMissionsForm(forms.Form):
+    client = forms.ModelChoiceField(
+        queryset=Client.objects.order_by('nom'), required=False,
+        label="Client", empty_label="Tous les clients"
+    )
+    date_debut = forms.DateField(required=False, label="Missions du", widget=forms.DateInput(attrs={'type': 'date'}))
+    date_fin = forms.DateField(required=False, label="au", widget=forms.DateInput(attrs={'type': 'date'}))
+    statut = forms.ChoiceField(
+        required=False, label="Statut",
+        choices=[('', 'Tous les statuts')] + Mission._meta.get_field('statut').choices
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for field in self.fields.values():
+            field.widget.attrs['class'] = 'form-control'
+
+    def clean(self):
+        cleaned_data = super().clean()
+        date_debut, date_fin = cleaned_data.get('date_debut'), cleaned_data.get('date_fin')
+        if date_debut and date_fin and date_debut > date_fin:
+            raise forms.ValidationError("La date de début doit précéder la date de fin.")
+        return cleaned_data
@@ -0,0 +1,182 @@
+"""
+Indicateurs agrégés des interventions (table IndicateurIntervention).
+
+Chaque création, modification ou suppression d'intervention applique une
+variation (+1 / -1) aux lignes qu'elle touche : global, client, intervenant et
+semaine. Les tableaux de bord lisent ces lignes au lieu d'agréger tout
+l'historique, leur coût reste donc constant quand la table grossit.
+
+Les écritures en masse qui contournent les signaux (bulk_create, update)
+doivent appeler ``appliquer_variations`` elles-mêmes ; la commande
+``refresh_kpi_rollups`` reconstruit la table à partir des données.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.db.models.functions import TruncWeek
+from django.utils import timezone
+
+from .models import IndicateurIntervention, Intervention, Mission
+
+STATUTS = ('en_attente', 'en_cours', 'terminee')
+COMPTEURS = ('total',) + STATUTS + ('en_retard',)
+
+
+def debut_semaine(jour):
+    """Lundi de la semaine du jour donné"""
+    return jour - timedelta(days=jour.weekday())
+
+
+def cle_intervenant(intervenant_id):
+    return f"intervenant:{intervenant_id or ''}"
+
+
+def _lignes(etat):
+    """(clé, valeurs par défaut) des lignes d'indicateurs touchées par une intervention"""
+    semaine = debut_semaine(etat['date'])
+    return [
+        ('global', {'dimension': 'global'}),
+        (f"client:{etat['client_id']}", {'dimension': 'client', 'client_id': etat['client_id']}),
+        (cle_intervenant(etat['intervenant_id']), {'dimension': 'intervenant', 'intervenant_id': etat['intervenant_id']}),
+        (f"semaine:{semaine.isoformat()}", {'dimension': 'semaine', 'semaine': semaine}),
+    ]
+
+
+def _compteurs(etat):
+    compteurs = {'total': 1}
+    if etat['statut'] in STATUTS:
+        compteurs[etat['statut']] = 1
+    if etat['en_retard'] and not etat['retard_resolu']:
+        compteurs['en_retard'] = 1
+    return compteurs
+
+
+def etat_enregistre(pk):
+    """État actuellement en base d'une intervention (None si elle n'existe pas)"""
+    etat = Intervention.objects.filter(pk=pk).values(
+        'mission__client_id', 'intervenant_id', 'date', 'statut', 'en_retard', 'retard_resolu'
+    ).first()
+    if etat is not None:
+        etat['client_id'] = etat.pop('mission__client_id')
+    return etat
+
+
+def etat_instance(intervention):
+    """État d'une intervention tel qu'il sera enregistré"""
+    if Intervention.mission.is_cached(intervention):
+        client_id = intervention.mission.client_id
+    else:
+        client_id = Mission.objects.filter(pk=intervention.mission_id).values_list('client_id', flat=True).first()
+    return {
+        'client_id': client_id,
+        'intervenant_id': intervention.intervenant_id,
+        'date': intervention.date,
+        'statut': intervention.statut,
+        'en_retard': intervention.en_retard,
+        'retard_resolu': intervention.retard_resolu,
+    }
+
+
+def ajouter_etat(variations, etat, signe):
+    """Cumule dans ``variations`` la contribution (+1 ou -1) d'une intervention"""
+    if etat is None or etat['client_id'] is None:
+        return
+    compteurs = _compteurs(etat)
+    for cle, defauts in _lignes(etat):
+        _, deltas = variations.setdefault(cle, (defauts, defaultdict(int)))
+        for champ, valeur in compteurs.items():
+            deltas[champ] += signe * valeur
+
+
+def appliquer_variations(variations):
+    """
+    Applique {clé: (valeurs par défaut, {champ: delta})} avec des UPDATE atomiques (F()),
+    une requête par combinaison de deltas identiques.
+    """
+    variations = {
+        cle: (defauts, {champ: delta for champ, delta in deltas.items() if delta})
+        for cle, (defauts, deltas) in variations.items()
+    }
+    variations = {cle: valeurs for cle, valeurs in variations.items() if valeurs[1]}
+    if not variations:
+        return
+    # Une ligne absente n'est créée que pour recevoir un ajout : un retrait sur une ligne
+    # absente (suppression en cascade d'un client, par exemple) ne doit pas la recréer
+    IndicateurIntervention.objects.bulk_create(
+        [IndicateurIntervention(cle=cle, **defauts) for cle, (defauts, deltas) in variations.items()
+         if any(delta > 0 for delta in deltas.values())],
+        ignore_conflicts=True
+    )
+    groupes = defaultdict(list)
+    for cle, (_, deltas) in variations.items():
+        groupes[tuple(sorted(deltas.items()))].append(cle)
+    maintenant = timezone.now()
+    for deltas, cles in groupes.items():
+        IndicateurIntervention.objects.filter(cle__in=cles).update(
+            date_maj=maintenant,
+            **{champ: F(champ) + delta for champ, delta in deltas}
+        )
+
+
+def deplacer_mission(mission_id, ancien_client_id, nouveau_client_id):
+    """Reporte les interventions d'une mission d'un client à un autre"""
+    agregats = Intervention.objects.filter(mission_id=mission_id).aggregate(**_agregats())
+    if not agregats['total']:
+        return
+    appliquer_variations({
+        f"client:{ancien_client_id}": ({'dimension': 'client', 'client_id': ancien_client_id},
+                                      {champ: -valeur for champ, valeur in agregats.items()}),
+        f"client:{nouveau_client_id}": ({'dimension': 'client', 'client_id': nouveau_client_id}, agregats),
+    })
+
+
+def liberer_intervenant(intervenant_id):
+    """
+    Reporte les interventions d'un intervenant sur le point d'être supprimé vers la ligne
+    « non assigné » : le SET_NULL de la suppression est un UPDATE qui ne déclenche aucun signal
+    (la ligne de l'intervenant, elle, disparaît en cascade).
+    """
+    agregats = Intervention.objects.filter(intervenant_id=intervenant_id).aggregate(**_agregats())
+    if not agregats['total']:
+        return
+    appliquer_variations({
+        cle_intervenant(None): ({'dimension': 'intervenant', 'intervenant_id': None}, agregats),
+    })
+
+
+def _agregats():
+    agregats = {'total': Count('id')}
+    for statut in STATUTS:
+        agregats[statut] = Count('id', filter=Q(statut=statut))
+    agregats['en_retard'] = Count('id', filter=Q(en_retard=True, retard_resolu=False))
+    return agregats
+
+
+def reconstruire_indicateurs():
+    """Recalcule toute la table à partir des interventions (quatre requêtes GROUP BY)"""
+    agregats = _agregats()
+    lignes = [IndicateurIntervention(cle='global', dimension='global', **Intervention.objects.aggregate(**agregats))]
+    for ligne in Intervention.objects.values('mission__client_id').annotate(**agregats).order_by():
+        client_id = ligne.pop('mission__client_id')
+        lignes.append(IndicateurIntervention(cle=f'client:{client_id}', dimension='client', client_id=client_id, **ligne))
+    for ligne in Intervention.objects.values('intervenant_id').annotate(**agregats).order_by():
+        intervenant_id = ligne.pop('intervenant_id')
+        lignes.append(IndicateurIntervention(
+            cle=cle_intervenant(intervenant_id), dimension='intervenant', intervenant_id=intervenant_id, **ligne
+        ))
+    for ligne in Intervention.objects.annotate(semaine=TruncWeek('date')).values('semaine').annotate(**agregats).order_by():
+        semaine = ligne.pop('semaine')
+        lignes.append(IndicateurIntervention(
+            cle=f'semaine:{semaine.isoformat()}', dimension='semaine', semaine=semaine, **ligne
+        ))
+    with transaction.atomic():
+        IndicateurIntervention.objects.all().delete()
+        IndicateurIntervention.objects.bulk_create(lignes, batch_size=500)
+    return len(lignes)
+
+
+def lire_indicateur(cle):
+    """Ligne d'indicateurs pour une clé, ou une ligne vide si aucune intervention"""
+    return IndicateurIntervention.objects.filter(cle=cle).first() or IndicateurIntervention(cle=cle)
@@ -0,0 +1,272 @@
+"""
+Jeu de données synthétique pour les mesures de performance (commande ``generer_donnees``).
+
+Insère, par lots et sans passer par les signaux, des volumes proportionnels à une
+échelle : clients, missions, interventions (dates étalées sur deux ans, statuts
+cohérents avec les dates), retards, rapports, notifications et fichiers joints.
+Les fichiers viennent d'un petit ensemble de contenus enregistrés une seule fois
+dans le stockage dédoublonné, comme des documents types joints à répétition.
+Une partie des interventions échues n'est pas marquée en retard : la détection
+des retards a du travail.
+
+Les tables dérivées (indicateurs, compteurs de notifications, index de recherche
+et d'autocomplétion, références des fichiers) sont reconstruites à la fin. Les
+comptes créés ont un mot de passe inutilisable et un identifiant préfixé par
+``PREFIXE``.
+"""
+import random
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+
+from . import autocompletion, recherche, stockage
+from .indicateurs import reconstruire_indicateurs
+from .models import (
+    Client, Intervention, Mission, Notification, PieceJointe, RapportFichierJoint, RapportIntervention,
+    RetardIntervention, Utilisateur,
+)
+from .notifications import oublier_destinataires, recalculer_compteurs
+
+PREFIXE = 'bench_'
+
+TAILLE_LOT = 1000
+
+# Volumes pour une échelle de 1 : les effectifs sont multipliés par l'échelle, les
+# volumes « par » objet parent restent fixes (échelle 1 : 10 000 interventions)
+VOLUMES = {
+    'administrateurs': 2,
+    'employes': 20,
+    'freelances': 5,
+    'clients': 50,
+    'missions_par_client': 10,
+    'interventions_par_mission': 20,
+    'notifications_par_utilisateur': 200,
+}
+
+# Proportions (entre 0 et 1), indépendantes de l'échelle
+PROPORTIONS = {
+    'retards': 0.6,             # interventions échues non terminées déjà marquées en retard
+    'rapports': 0.8,            # interventions terminées ayant un rapport
+    'pieces_jointes': 0.3,      # interventions ayant une pièce jointe
+    'fichiers_rapport': 0.25,   # rapports ayant un fichier joint
+    'notifications_lues': 0.8,
+}
+
+NATURES = ['Maintenance', 'Installation', 'Audit', 'Dépannage', 'Inspection', 'Mise en service']
+EQUIPEMENTS = [
+    'climatisation', 'réseau informatique', 'tableau électrique', 'plomberie', 'sécurité incendie',
+    'ascenseur', 'vidéosurveillance', 'groupe électrogène', 'contrôle d\'accès', 'éclairage',
+]
+VILLES = ['Paris', 'Lyon', 'Marseille', 'Lille', 'Nantes', 'Bordeaux', 'Toulouse', 'Strasbourg', 'Rennes', 'Nice']
+SECTEURS = ['Industries', 'Services', 'Logistique', 'Santé', 'Immobilier', 'Distribution', 'Énergie', 'Hôtellerie']
+FREQUENCES = ['', 'Hebdomadaire', 'Mensuelle', 'Trimestrielle', 'Annuelle']
+TYPES_RETARD = [choix for choix, _ in RetardIntervention.TYPE_RETARD_CHOICES]
+
+# Contenus des fichiers joints : (nom d'origine, taille en octets)
+FICHIERS_TYPES = [
+    ('bon_intervention.pdf', 40 * 1024),
+    ('devis.pdf', 25 * 1024),
+    ('plan_site.pdf', 120 * 1024),
+    ('fiche_technique.pdf', 60 * 1024),
+    ('releve_mesures.xlsx', 15 * 1024),
+    ('photo_equipement.jpg', 180 * 1024),
+]
+
+
+def _volume(nom, echelle, volumes):
+    if '_par_' in nom:
+        return volumes[nom]
+    return max(1, round(volumes[nom] * echelle))
+
+
+def _inserer(modele, objets, taille_lot):
+    """bulk_create par lots ; relit les lignes insérées si la base ne renvoie pas les clés"""
+    crees = []
+    for debut in range(0, len(objets), taille_lot):
+        lot = modele.objects.bulk_create(objets[debut:debut + taille_lot])
+        if lot and lot[0].pk is None:
+            lot = list(modele.objects.order_by('-pk')[:len(lot)])[::-1]
+        crees.extend(lot)
+    return crees
+
+
+def _fichiers(hasard, dossier):
+    """Enregistre les contenus types dans le stockage dédoublonné ; retourne leurs noms"""
+    storage = stockage.stockage_medias()
+    noms = []
+    for nom, taille in FICHIERS_TYPES:
+        contenu = hasard.getrandbits(8 * taille).to_bytes(taille, 'little')
+        noms.append((nom, storage.save(f'{dossier}/{nom}', ContentFile(contenu))))
+    return noms
+
+
+def generer(echelle=1.0, graine=0, taille_lot=TAILLE_LOT, fichiers=True, volumes=None, sortie=None):
+    """
+    Insère le jeu de données à l'échelle ``echelle`` (``volumes`` remplace tout ou partie
+    de VOLUMES). Retourne le nombre de lignes créées par modèle.
+    """
+    volumes = {**VOLUMES, **(volumes or {})}
+    hasard = random.Random(graine)
+    maintenant = timezone.now()
+    aujourd_hui = maintenant.date()
+    mot_de_passe = make_password(None)
+    bilan = {}
+
+    def etape(modele, objets):
+        crees = _inserer(modele, objets, taille_lot)
+        bilan[modele.__name__] = bilan.get(modele.__name__, 0) + len(crees)
+        if sortie:
+            sortie(f"  {modele.__name__} : {len(crees)}")
+        return crees
+
+    # Suffixe propre à cette génération : plusieurs générations peuvent cohabiter
+    lot_id = f'{graine}_{maintenant:%Y%m%d%H%M%S}'
+
+    with transaction.atomic():
+        utilisateurs = etape(Utilisateur, [
+            Utilisateur(
+                username=f'{PREFIXE}{role}_{lot_id}_{i}', password=mot_de_passe, role=role,
+                first_name=hasard.choice(['Alice', 'Bruno', 'Chloé', 'David', 'Emma', 'Farid', 'Inès', 'Karim']),
+                last_name=hasard.choice(['Martin', 'Bernard', 'Diallo', 'Petit', 'Moreau', 'Koné', 'Garcia']),
+                email=f'{PREFIXE}{role}_{lot_id}_{i}@example.com',
+            )
+            for role, nombre in (
+                ('administrateur', _volume('administrateurs', echelle, volumes)),
+                ('employe', _volume('employes', echelle, volumes)),
+                ('freelance', _volume('freelances', echelle, volumes)),
+            )
+            for i in range(nombre)
+        ])
+        intervenants = [utilisateur for utilisateur in utilisateurs if utilisateur.role != 'administrateur']
+
+        clients = etape(Client, [
+            Client(
+                nom=f"{hasard.choice(SECTEURS)} {hasard.choice(VILLES)} {i}",
+                contact=f"Contact {i}", email=f'client{i}@example.com',
+                telephone=f'01{hasard.randrange(10 ** 8):08d}', adresse=f"{i} rue de la {hasard.choice(VILLES)}",
+            )
+            for i in range(_volume('clients', echelle, volumes))
+        ])
+
+        missions = etape(Mission, [
+            Mission(
+                client=client, titre=f"{nature} {equipement} - {client.nom}",
+                description=f"{nature} du système de {equipement} sur le site de {ville}",
+                nature=nature, date=aujourd_hui - timedelta(days=hasard.randrange(730)), lieu=ville,
+                frequence=hasard.choice(FREQUENCES), assigne_a=hasard.choice(intervenants),
+                statut=hasard.choice(['en_attente', 'en_cours', 'en_cours', 'terminee', 'terminee']),
+            )
+            for client in clients
+            for nature, equipement, ville in (
+                (hasard.choice(NATURES), hasard.choice(EQUIPEMENTS), hasard.choice(VILLES))
+                for _ in range(_volume('missions_par_client', echelle, volumes))
+            )
+        ])
+
+        interventions = []
+        for mission in missions:
+            for n in range(_volume('interventions_par_mission', echelle, volumes)):
+                date = aujourd_hui + timedelta(days=hasard.randrange(-730, 60))
+                echeance = date + timedelta(days=hasard.randrange(1, 30))
+                if echeance < aujourd_hui - timedelta(days=30):
+                    statut = 'terminee' if hasard.random() < 0.9 else hasard.choice(['en_attente', 'en_cours'])
+                elif date <= aujourd_hui:
+                    statut = hasard.choice(['en_cours', 'terminee', 'en_attente'])
+                else:
+                    statut = 'en_attente'
+                jours_depasses = (aujourd_hui - echeance).days
+                en_retard = statut != 'terminee' and jours_depasses > 0 and hasard.random() < PROPORTIONS['retards']
+                interventions.append(Intervention(
+                    titre=f"{mission.nature} {hasard.choice(EQUIPEMENTS)} n°{n + 1}", mission=mission,
+                    intervenant=hasard.choice(intervenants), cree_par=mission.assigne_a,
+                    date=date, date_echeance=echeance, priorite='urgente' if hasard.random() < 0.15 else 'normale',
+                    ressources_utilisees=hasard.choice(['', 'Échelle, multimètre', 'Nacelle', 'Outillage standard']),
+                    statut=statut, etat_intervention=statut if statut != 'terminee' else 'resolue',
+                    date_cloture=maintenant - timedelta(days=max(0, jours_depasses)) if statut == 'terminee' else None,
+                    en_retard=en_retard, date_retard=maintenant - timedelta(days=jours_depasses) if en_retard else None,
+                ))
+        interventions = etape(Intervention, interventions)
+
+        etape(RetardIntervention, [
+            RetardIntervention(
+                intervention=intervention, type_retard=hasard.choice(TYPES_RETARD),
+                date_debut_retard=intervention.date_retard,
+                motif=f"Intervention non effectuée à la date d'échéance ({intervention.date_echeance:%d/%m/%Y})",
+                impact="Impact sur le planning", responsable_id=intervention.intervenant_id,
+                resolu=hasard.random() < 0.3,
+            )
+            for intervention in interventions if intervention.en_retard
+        ])
+
+        administrateurs = [utilisateur for utilisateur in utilisateurs if utilisateur.role == 'administrateur']
+        rapports = []
+        for intervention in interventions:
+            if intervention.statut != 'terminee' or hasard.random() >= PROPORTIONS['rapports']:
+                continue
+            statut = hasard.choice(['brouillon', 'soumis', 'valide', 'valide', 'valide', 'rejete'])
+            rapports.append(RapportIntervention(
+                intervention=intervention, statut=statut,
+                travaux_realises=f"Contrôle et remise en état : {intervention.titre}",
+                resultat_final=hasard.choice(['Équipement fonctionnel', 'Réparation provisoire', 'Pièce commandée']),
+                ressources_utilisees=intervention.ressources_utilisees,
+                valide_par=hasard.choice(administrateurs) if statut == 'valide' else None,
+                date_validation=intervention.date_cloture if statut == 'valide' else None,
+                rejete_par=hasard.choice(administrateurs) if statut == 'rejete' else None,
+                motif_rejet="Informations manquantes" if statut == 'rejete' else '',
+            ))
+        rapports = etape(RapportIntervention, rapports)
+
+        if fichiers:
+            contenus = _fichiers(hasard, 'pieces_jointes')
+            pieces = []
+            for intervention in interventions:
+                if hasard.random() < PROPORTIONS['pieces_jointes']:
+                    nom, chemin = hasard.choice(contenus)
+                    pieces.append(PieceJointe(
+                        intervention=intervention, titre=nom, fichier=chemin,
+                        type_fichier='photo' if nom.endswith('.jpg') else 'document',
+                    ))
+            etape(PieceJointe, pieces)
+
+            contenus = _fichiers(hasard, 'rapports/fichiers')
+            joints = []
+            for rapport in rapports:
+                if hasard.random() < PROPORTIONS['fichiers_rapport']:
+                    nom, chemin = hasard.choice(contenus)
+                    joints.append(RapportFichierJoint(rapport=rapport, fichier=chemin, description=nom))
+            etape(RapportFichierJoint, joints)
+
+        etape(Notification, [
+            Notification(
+                utilisateur=utilisateur, type_notification=type_notification,
+                message=f"{libelle} : {hasard.choice(interventions).titre}"[:255],
+                lue=hasard.random() < PROPORTIONS['notifications_lues'],
+            )
+            for utilisateur in utilisateurs
+            for type_notification, libelle in (
+                hasard.choice([
+                    ('intervention_assignee', "Nouvelle intervention assignée"),
+                    ('rapport_soumis', "Rapport soumis"),
+                    ('rapport_valide', "Rapport validé"),
+                    ('retard_automatique', "Intervention en retard"),
+                ])
+                for _ in range(_volume('notifications_par_utilisateur', echelle, volumes))
+            )
+        ])
+
+    # bulk_create contourne les signaux : reconstruction des tables dérivées
+    if sortie:
+        sortie("Reconstruction des index et des compteurs...")
+    reconstruire_indicateurs()
+    recalculer_compteurs(Utilisateur.objects.filter(pk__in=[utilisateur.pk for utilisateur in utilisateurs]))
+    oublier_destinataires('administrateur', 'employe', 'freelance')
+    for type_objet, objets in (('client', clients), ('mission', missions), ('intervention', interventions)):
+        recherche.indexer(type_objet, [objet.pk for objet in objets])
+    for type_objet, objets in (('client', clients), ('mission', missions), ('utilisateur', utilisateurs)):
+        autocompletion.indexer_suggestions(type_objet, [objet.pk for objet in objets])
+    if fichiers:
+        stockage.recompter()
+    return bilan
@@ -0,0 +1,41 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from core.retention import TAILLE_LOT, archiver_notifications, purger_archives
+
+
+class Command(BaseCommand):
+    help = "Archive les notifications lues anciennes et supprime les archives expirées, par petits lots"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--jours',
+            type=int,
+            default=None,
+            help="Âge au-delà duquel une notification lue est archivée (NOTIFICATIONS_RETENTION_JOURS par défaut)"
+        )
+        parser.add_argument(
+            '--jours-archive',
+            type=int,
+            default=None,
+            help="Âge au-delà duquel une archive est supprimée (NOTIFICATIONS_ARCHIVE_JOURS par défaut)"
+        )
+        parser.add_argument(
+            '--taille-lot',
+            type=int,
+            default=TAILLE_LOT,
+            help="Nombre de lignes traitées par transaction"
+        )
+
+    def handle(self, *args, **options):
+        jours, jours_archive = options['jours'], options['jours_archive']
+        archivees = archiver_notifications(
+            timedelta(days=jours) if jours is not None else None, options['taille_lot']
+        )
+        purgees = purger_archives(
+            timedelta(days=jours_archive) if jours_archive is not None else None, options['taille_lot']
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"{archivees} notification(s) archivée(s), {purgees} archive(s) supprimée(s)."
+        ))
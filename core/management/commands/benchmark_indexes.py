@@ -0,0 +1,135 @@
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from core.indicateurs import reconstruire_indicateurs
+from core.models import Client, Intervention, Mission, Notification, RetardIntervention, Utilisateur
+from core.notifications import recalculer_compteurs
+
+
+class Command(BaseCommand):
+    help = (
+        "Affiche le plan d'exécution (EXPLAIN) et la durée des requêtes filtrées les plus fréquentes. "
+        "Exécuter avant et après 'migrate core 0015' pour comparer parcours complet et parcours d'index."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help="Insère d'abord ce nombre d'interventions (et autant de notifications et de retards)"
+        )
+        parser.add_argument('--taille-lot', type=int, default=5000, help="Lignes par INSERT lors de l'amorçage")
+        parser.add_argument('--repetitions', type=int, default=5, help="Nombre d'exécutions chronométrées par requête")
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            self.amorcer(options['seed'], options['taille_lot'])
+
+        admin = Utilisateur.objects.filter(role='administrateur').first()
+        employe = Utilisateur.objects.filter(role__in=['employe', 'freelance']).first()
+        if employe is None or admin is None:
+            self.stderr.write("Aucun utilisateur : relancer avec --seed N.")
+            return
+
+        aujourd_hui = timezone.now().date()
+        requetes = [
+            ("Détection des retards", Intervention.objects.filter(
+                statut__in=['en_attente', 'en_cours'], date_echeance__lt=aujourd_hui, en_retard=False
+            ).values('id')),
+            ("Badge / liste des notifications non lues", Notification.objects.filter(
+                utilisateur=admin, lue=False
+            ).order_by('-date_creation').values('id')),
+            ("Missions en cours d'un employé", Mission.objects.filter(
+                assigne_a=employe, statut='en_cours'
+            ).values('id')),
+            ("Interventions en cours d'un employé", Intervention.objects.filter(
+                intervenant=employe, statut='en_cours'
+            ).values('id')),
+            ("Retards non résolus d'un responsable", RetardIntervention.objects.filter(
+                responsable=employe, resolu=False
+            ).order_by('-date_creation').values('id')),
+            ("Page d'interventions (keyset)", Intervention.objects.filter(
+                date__lt=aujourd_hui
+            ).order_by('-date', '-id').values('id')[:25]),
+        ]
+
+        self.stdout.write(f"Base : {connection.vendor}")
+        for titre, queryset in requetes:
+            durees = []
+            for _ in range(options['repetitions']):
+                debut = time.perf_counter()
+                list(queryset.all())
+                durees.append((time.perf_counter() - debut) * 1000)
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n{titre} — médiane {sorted(durees)[len(durees) // 2]:.2f} ms"))
+            self.stdout.write(queryset.explain())
+
+    def amorcer(self, nombre, taille_lot):
+        """Insère un jeu de données synthétique par lots"""
+        self.stdout.write(f"Amorçage de {nombre} interventions...")
+        admin, _ = Utilisateur.objects.get_or_create(username='bench_admin', defaults={'role': 'administrateur'})
+        employes = [
+            Utilisateur.objects.get_or_create(username=f'bench_employe_{i}', defaults={'role': 'employe'})[0]
+            for i in range(50)
+        ]
+        client = Client.objects.create(
+            nom='Client benchmark', contact='Contact', email='bench@example.com', telephone='0', adresse='-'
+        )
+        missions = Mission.objects.bulk_create([
+            Mission(
+                client=client, titre=f'Mission {i}', description='-', nature='-', date=date.today(), lieu='-',
+                assigne_a=employes[i % len(employes)], statut=('en_attente', 'en_cours', 'terminee')[i % 3]
+            )
+            for i in range(max(1, nombre // 100))
+        ], batch_size=taille_lot)
+        if missions[0].pk is None:
+            missions = list(Mission.objects.filter(client=client))
+
+        statuts = ('en_attente', 'en_cours', 'terminee')
+        maintenant = timezone.now()
+        for debut in range(0, nombre, taille_lot):
+            lot = range(debut, min(debut + taille_lot, nombre))
+            interventions = Intervention.objects.bulk_create([
+                Intervention(
+                    titre=f'Intervention {i}', mission=missions[i % len(missions)],
+                    intervenant=employes[i % len(employes)],
+                    date=date.today() - timedelta(days=i % 700),
+                    date_echeance=date.today() - timedelta(days=i % 700 - 30),
+                    statut=statuts[i % 3], en_retard=(i % 7 == 0)
+                )
+                for i in lot
+            ], batch_size=taille_lot)
+            if interventions[0].pk is None:
+                # Relecture du lot dans l'ordre d'insertion
+                interventions = list(Intervention.objects.order_by('-id')[:len(lot)])[::-1]
+            RetardIntervention.objects.bulk_create([
+                RetardIntervention(
+                    intervention=intervention, type_retard='fin', date_debut_retard=maintenant, motif='-',
+                    responsable_id=intervention.intervenant_id, resolu=(n % 2 == 0)
+                )
+                for n, intervention in enumerate(interventions)
+            ], batch_size=taille_lot)
+            Notification.objects.bulk_create([
+                Notification(
+                    utilisateur=admin if i % 2 else employes[i % len(employes)],
+                    message=f'Notification {i}', type_notification='benchmark', lue=(i % 5 != 0)
+                )
+                for i in lot
+            ], batch_size=taille_lot)
+            self.stdout.write(f"  {min(debut + taille_lot, nombre)}/{nombre}")
+
+        # bulk_create contourne les signaux des indicateurs agrégés et des compteurs de notifications
+        reconstruire_indicateurs()
+        recalculer_compteurs()
+
+        # Statistiques à jour pour que l'optimiseur choisisse les index composites
+        with connection.cursor() as cursor:
+            if connection.vendor == 'mysql':
+                tables = [m._meta.db_table for m in (Mission, Intervention, RetardIntervention, Notification)]
+                cursor.execute(f"ANALYZE TABLE {', '.join(tables)}")
+            elif connection.vendor in ('sqlite', 'postgresql'):
+                cursor.execute("ANALYZE")
@@ -0,0 +1,109 @@
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from core.banc_essai import MARGE_MS, TOLERANCE, comparer, mesurer, scenarios
+from core.models import Intervention, Notification
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure la latence (p50/p95) et le nombre de requêtes SQL des vues principales sur le jeu de "
+        "données de generer_donnees, et signale les régressions par rapport à une référence enregistrée"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20, help="Appels mesurés par scénario")
+        parser.add_argument('--echauffement', type=int, default=2, help="Appels non mesurés avant la mesure")
+        parser.add_argument(
+            '--scenario',
+            action='append',
+            default=[],
+            help="Limite la mesure à ce scénario (option répétable)"
+        )
+        parser.add_argument(
+            '--reference',
+            default=os.path.join(settings.BASE_DIR, 'benchmark_reference.json'),
+            help="Fichier JSON de référence"
+        )
+        parser.add_argument(
+            '--enregistrer',
+            action='store_true',
+            help="Enregistre les mesures comme nouvelle référence au lieu de les comparer"
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=TOLERANCE,
+            help="Hausse tolérée du p95, en proportion de la référence"
+        )
+        parser.add_argument('--marge-ms', type=float, default=MARGE_MS, help="Marge absolue ajoutée à la limite du p95")
+
+    def handle(self, *args, **options):
+        liste = scenarios()
+        if liste is None:
+            raise CommandError("Aucun jeu de données de banc d'essai : lancer d'abord generer_donnees.")
+        inconnus = set(options['scenario']) - {scenario['nom'] for scenario in liste}
+        if inconnus:
+            raise CommandError(
+                f"Scénario(s) inconnu(s) : {', '.join(sorted(inconnus))} "
+                f"(disponibles : {', '.join(scenario['nom'] for scenario in liste)})"
+            )
+        if options['scenario']:
+            liste = [scenario for scenario in liste if scenario['nom'] in options['scenario']]
+
+        donnees = {
+            'base': connection.vendor,
+            'interventions': Intervention.objects.count(),
+            'notifications': Notification.objects.count(),
+        }
+        self.stdout.write(
+            f"Base {donnees['base']}, {donnees['interventions']} interventions, "
+            f"{donnees['notifications']} notifications ; {options['iterations']} appels par scénario"
+        )
+        self.stdout.write(f"{'scénario':<28}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}{'SQL':>6}")
+        resultats = {}
+        for scenario in liste:
+            mesure = mesurer(scenario, options['iterations'], options['echauffement'])
+            resultats[scenario['nom']] = mesure
+            self.stdout.write(
+                f"{scenario['nom']:<28}{mesure['p50_ms']:>10.1f}{mesure['p95_ms']:>10.1f}"
+                f"{mesure['max_ms']:>10.1f}{mesure['requetes']:>6}"
+            )
+
+        if options['enregistrer']:
+            reference = {}
+            if os.path.exists(options['reference']):
+                with open(options['reference']) as fichier:
+                    reference = json.load(fichier).get('scenarios', {})
+            with open(options['reference'], 'w') as fichier:
+                json.dump({
+                    'date': timezone.now().isoformat(timespec='seconds'),
+                    'donnees': donnees,
+                    'scenarios': {**reference, **resultats},
+                }, fichier, indent=2, ensure_ascii=False)
+            self.stdout.write(self.style.SUCCESS(f"Référence enregistrée dans {options['reference']}."))
+            return
+
+        if not os.path.exists(options['reference']):
+            self.stdout.write(self.style.WARNING(
+                f"Pas de référence ({options['reference']}) : relancer avec --enregistrer pour en créer une."
+            ))
+            return
+        with open(options['reference']) as fichier:
+            reference = json.load(fichier)
+        if reference.get('donnees') != donnees:
+            self.stdout.write(self.style.WARNING(
+                f"Jeu de données différent de celui de la référence ({reference.get('donnees')}) : "
+                "comparaison indicative."
+            ))
+        regressions = comparer(resultats, reference.get('scenarios', {}), options['tolerance'], options['marge_ms'])
+        if regressions:
+            for regression in regressions:
+                self.stderr.write(regression)
+            raise CommandError(f"{len(regressions)} régression(s) par rapport à la référence.")
+        self.stdout.write(self.style.SUCCESS("Aucune régression par rapport à la référence."))
@@ -0,0 +1,36 @@
+from datetime import timedelta
+from itertools import islice
+
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.notifications import resumes_email
+
+
+class Command(BaseCommand):
+    help = "Envoie à chaque utilisateur un résumé par e-mail de ses notifications non lues récentes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--heures',
+            type=int,
+            default=24,
+            help="Notifications créées depuis ce nombre d'heures (une exécution quotidienne par défaut)"
+        )
+        parser.add_argument(
+            '--taille-lot',
+            type=int,
+            default=100,
+            help="Nombre d'e-mails envoyés par connexion au serveur de messagerie"
+        )
+
+    def handle(self, *args, **options):
+        emails = resumes_email(timezone.now() - timedelta(hours=options['heures']))
+        envoyes = 0
+        while True:
+            lot = list(islice(emails, options['taille_lot']))
+            if not lot:
+                break
+            envoyes += get_connection().send_messages(lot) or 0
+        self.stdout.write(self.style.SUCCESS(f"{envoyes} résumé(s) envoyé(s)."))
@@ -0,0 +1,55 @@
+from argparse import ArgumentTypeError
+from datetime import date
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.export import exporter_zip, missions_a_exporter
+from core.models import Client
+
+
+def _date(valeur):
+    try:
+        return date.fromisoformat(valeur)
+    except ValueError:
+        # Rapporté par le parseur : message d'usage en ligne de commande, CommandError via call_command
+        raise ArgumentTypeError(f"date invalide : {valeur} (format attendu AAAA-MM-JJ)")
+
+
+class Command(BaseCommand):
+    help = "Exporte dans une archive ZIP les rapports PDF des missions filtrées (client, période, statut)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('sortie', help="Chemin de l'archive ZIP à écrire")
+        parser.add_argument('--client', type=int, help="Identifiant du client")
+        parser.add_argument('--du', type=_date, help="Missions à partir de cette date (AAAA-MM-JJ)")
+        parser.add_argument('--au', type=_date, help="Missions jusqu'à cette date incluse (AAAA-MM-JJ)")
+        parser.add_argument('--statut', choices=['en_attente', 'en_cours', 'terminee'])
+        parser.add_argument(
+            '--processus', type=int, default=settings.PDF_EXPORT_PROCESSUS,
+            help="Taille du pool de rendu (0 : un par CPU ; PDF_EXPORT_PROCESSUS par défaut)"
+        )
+
+    def handle(self, *args, **options):
+        client = None
+        if options['client'] is not None:
+            client = Client.objects.filter(pk=options['client']).first()
+            if client is None:
+                raise CommandError(f"Client {options['client']} introuvable.")
+        if options['du'] and options['au'] and options['du'] > options['au']:
+            raise CommandError("La date de début doit précéder la date de fin.")
+        mission_ids = list(missions_a_exporter(
+            client, options['du'], options['au'], options['statut']
+        ).values_list('id', flat=True))
+        if not mission_ids:
+            self.stdout.write("Aucune mission ne correspond à ces critères.")
+            return
+
+        def progression(fait, total):
+            self.stdout.write(f"  {fait}/{total}")
+
+        self.stdout.write(f"Export de {len(mission_ids)} mission(s) vers {options['sortie']}...")
+        with open(options['sortie'], 'wb') as archive:
+            for bloc in exporter_zip(mission_ids, options['processus'], progression):
+                archive.write(bloc)
+        self.stdout.write(self.style.SUCCESS("Export terminé."))
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.jeu_donnees import PREFIXE, TAILLE_LOT, VOLUMES, generer
+
+
+class Command(BaseCommand):
+    help = (
+        "Insère un jeu de données synthétique réaliste (clients, missions, interventions, retards, "
+        "rapports, notifications, fichiers joints) pour les mesures de performance (benchmark_vues)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--echelle',
+            type=float,
+            default=1.0,
+            help="Facteur appliqué aux effectifs (utilisateurs, clients) ; 1 : environ 10 000 interventions"
+        )
+        parser.add_argument(
+            '--volume',
+            action='append',
+            default=[],
+            metavar='NOM=VALEUR',
+            help=f"Remplace un volume de base avant mise à l'échelle ; noms : {', '.join(VOLUMES)}"
+        )
+        parser.add_argument('--graine', type=int, default=0, help="Graine du générateur aléatoire (jeu reproductible)")
+        parser.add_argument('--taille-lot', type=int, default=TAILLE_LOT, help="Lignes par INSERT")
+        parser.add_argument('--sans-fichiers', action='store_true', help="Ne crée ni pièces jointes ni fichiers de rapport")
+
+    def handle(self, *args, **options):
+        volumes = {}
+        for valeur in options['volume']:
+            nom, _, nombre = valeur.partition('=')
+            if nom not in VOLUMES or not nombre.isdigit():
+                raise CommandError(f"Volume invalide : {valeur} (attendu NOM=ENTIER, noms : {', '.join(VOLUMES)})")
+            volumes[nom] = int(nombre)
+
+        self.stdout.write(f"Génération à l'échelle {options['echelle']}...")
+        bilan = generer(
+            echelle=options['echelle'], graine=options['graine'], taille_lot=options['taille_lot'],
+            fichiers=not options['sans_fichiers'], volumes=volumes, sortie=self.stdout.write,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"{sum(bilan.values())} ligne(s) créée(s). Comptes préfixés par '{PREFIXE}', sans mot de passe utilisable."
+        ))
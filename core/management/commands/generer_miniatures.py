@@ -0,0 +1,42 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from core.miniatures import est_image, generer
+from core.models import PieceJointe, RapportFichierJoint, RapportImage, Utilisateur
+
+SOURCES = (
+    (PieceJointe, 'fichier'),
+    (RapportImage, 'image'),
+    (RapportFichierJoint, 'fichier'),
+    (Utilisateur, 'photo'),
+)
+
+
+class Command(BaseCommand):
+    help = "Génère les miniatures manquantes des images déjà téléversées (pièces jointes, rapports, photos de profil)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=4, help="Images traitées en parallèle")
+        parser.add_argument('--forcer', action='store_true', help="Régénère aussi les miniatures existantes")
+
+    def handle(self, *args, **options):
+        noms = sorted({
+            nom
+            for modele, champ in SOURCES
+            for nom in modele.objects.exclude(**{champ: ''}).values_list(champ, flat=True).iterator()
+            if est_image(nom)
+        })
+        self.stdout.write(f"{len(noms)} image(s) à examiner")
+
+        produites = erreurs = 0
+        with ThreadPoolExecutor(max_workers=options['threads']) as pool:
+            futures = {pool.submit(generer, nom, None, options['forcer']): nom for nom in noms}
+            for future, nom in futures.items():
+                try:
+                    produites += future.result()
+                except Exception as exc:
+                    erreurs += 1
+                    self.stderr.write(f"{nom} : {type(exc).__name__}: {exc}")
+
+        self.stdout.write(self.style.SUCCESS(f"{produites} miniature(s) générée(s), {erreurs} image(s) en erreur."))
@@ -0,0 +1,36 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from core.stockage import collecter, recompter
+
+
+class Command(BaseCommand):
+    help = "Supprime les fichiers joints dédoublonnés qui ne sont plus référencés, et leurs miniatures"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--delai-minutes',
+            type=int,
+            default=None,
+            help="Délai de grâce après la dernière référence (STOCKAGE_DELAI_COLLECTE_MINUTES par défaut)"
+        )
+        parser.add_argument(
+            '--recompter',
+            action='store_true',
+            help="Reconstruit d'abord les compteurs de références à partir des tables"
+        )
+        parser.add_argument(
+            '--simulation',
+            action='store_true',
+            help="Affiche ce qui serait supprimé sans rien supprimer"
+        )
+
+    def handle(self, *args, **options):
+        if options['recompter']:
+            corriges = recompter()
+            self.stdout.write(f"{corriges} compteur(s) de références corrigé(s).")
+        delai = timedelta(minutes=options['delai_minutes']) if options['delai_minutes'] is not None else None
+        nombre, octets = collecter(delai, simulation=options['simulation'])
+        verbe = "à supprimer" if options['simulation'] else "supprimé(s)"
+        self.stdout.write(self.style.SUCCESS(f"{nombre} fichier(s) {verbe}, {octets / 1024 ** 2:.1f} Mo."))
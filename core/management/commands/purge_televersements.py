@@ -0,0 +1,22 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from core.televersement import purger
+
+
+class Command(BaseCommand):
+    help = "Supprime les téléversements fragmentés abandonnés ou déjà utilisés, et leurs fichiers partiels"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--heures',
+            type=int,
+            default=None,
+            help="Inactivité au-delà de laquelle une session est supprimée (TELEVERSEMENT_DUREE_HEURES par défaut)"
+        )
+
+    def handle(self, *args, **options):
+        duree = timedelta(hours=options['heures']) if options['heures'] is not None else None
+        supprimees = purger(duree)
+        self.stdout.write(self.style.SUCCESS(f"{supprimees} session(s) de téléversement supprimée(s)."))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from core.notifications import recalculer_compteurs
+
+class Command(BaseCommand):
+    help = 'Reconstruit le compteur de notifications non lues de chaque utilisateur à partir de la table des notifications'
+
+    def handle(self, *args, **options):
+        corriges = recalculer_compteurs()
+        self.stdout.write(
+            self.style.SUCCESS(f'Compteurs reconstruits. {corriges} utilisateur(s) corrigé(s).')
+        )
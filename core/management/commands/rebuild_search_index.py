@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from core import autocompletion
+from core.models import DocumentRecherche, EntreeAutocompletion, TermeRecherche
+from core.recherche import MODELES, indexer
+
+
+class Command(BaseCommand):
+    help = "Reconstruit l'index de la recherche globale et celui de l'autocomplétion"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--si-vide',
+            action='store_true',
+            help="Ne reconstruit que les index encore vides (démarrage du conteneur)"
+        )
+
+    def handle(self, *args, **options):
+        if options['si_vide'] and DocumentRecherche.objects.exists():
+            self.stdout.write("Index de recherche déjà construit.")
+        else:
+            TermeRecherche.objects.all().delete()
+            DocumentRecherche.objects.all().delete()
+            for type_objet, modele in MODELES.items():
+                ids = list(modele.objects.order_by('pk').values_list('pk', flat=True))
+                indexer(type_objet, ids)
+                self.stdout.write(f"  {modele._meta.verbose_name_plural} : {len(ids)} document(s)")
+            self.stdout.write(self.style.SUCCESS("Index de recherche reconstruit."))
+
+        if options['si_vide'] and EntreeAutocompletion.objects.exists():
+            self.stdout.write("Index d'autocomplétion déjà construit.")
+        else:
+            EntreeAutocompletion.objects.all().delete()
+            for type_objet, modele in autocompletion.MODELES.items():
+                ids = list(modele.objects.order_by('pk').values_list('pk', flat=True))
+                autocompletion.indexer_suggestions(type_objet, ids)
+                self.stdout.write(f"  {modele._meta.verbose_name_plural} : {len(ids)} libellé(s)")
+            self.stdout.write(self.style.SUCCESS("Index d'autocomplétion reconstruit."))
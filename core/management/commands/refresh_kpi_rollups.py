@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from core.indicateurs import reconstruire_indicateurs
+
+class Command(BaseCommand):
+    help = "Reconstruit les indicateurs agrégés des interventions (par statut, client, intervenant et semaine)"
+
+    def handle(self, *args, **options):
+        nombre = reconstruire_indicateurs()
+        self.stdout.write(self.style.SUCCESS(f'Indicateurs reconstruits. {nombre} ligne(s) enregistrée(s).'))
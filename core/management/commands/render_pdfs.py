@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.pdf import executer_rendu, reserver_rendu
+
+
+class Command(BaseCommand):
+    help = "Traite la file des rendus PDF (missions et interventions) demandés depuis l'interface"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--une-fois',
+            action='store_true',
+            help="Vide la file puis s'arrête (pour un cron) au lieu de tourner en continu"
+        )
+        parser.add_argument(
+            '--intervalle',
+            type=float,
+            default=2.0,
+            help="Secondes d'attente entre deux consultations d'une file vide"
+        )
+
+    def handle(self, *args, **options):
+        traites = echecs = 0
+        while True:
+            rendu = reserver_rendu()
+            if rendu is None:
+                if options['une_fois']:
+                    break
+                time.sleep(options['intervalle'])
+                continue
+
+            debut = time.perf_counter()
+            if executer_rendu(rendu):
+                traites += 1
+                self.stdout.write(f"{rendu.nom_fichier} rendu en {time.perf_counter() - debut:.2f} s")
+            else:
+                echecs += 1
+                self.stderr.write(f"{rendu.nom_fichier} : rendu en échec ou invalidé")
+
+        self.stdout.write(self.style.SUCCESS(f"{traites} rendu(s) terminé(s), {echecs} en échec."))
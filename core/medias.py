@@ -0,0 +1,188 @@
+"""
+Service des fichiers de MEDIA_ROOT après contrôle des droits.
+
+Un fichier n'est servi que si une ligne qui y renvoie est consultable par
+l'utilisateur, selon les règles de ``visible_to`` (intervention pour les pièces
+jointes, preuves et fichiers de rapport, mission ou intervention pour les rendus
+PDF, tout utilisateur connecté pour les photos de profil). Les miniatures suivent
+les droits de leur image source.
+
+Le transfert lui-même est délégué au serveur frontal selon MEDIAS_ENVOI
+(X-Accel-Redirect pour nginx, X-Sendfile pour Apache/lighttpd) : le worker
+rend la main dès les en-têtes écrits. À défaut, le fichier est envoyé par
+Django, requêtes Range comprises (lecture des vidéos).
+"""
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db.models import Q
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import content_disposition_header, http_date
+from django.views.static import was_modified_since
+
+from .miniatures import DOSSIER as DOSSIER_MINIATURES, FORMATS, TAILLES
+from .models import (
+    Intervention, Mission, PieceJointe, Preuve, RapportFichierJoint, RapportImage, RenduPDF, Utilisateur
+)
+from .permissions import is_admin
+from .stockage import DOSSIER as DOSSIER_DEDOUBLONNE
+
+TAILLE_LECTURE = 64 * 1024
+
+_PLAGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+_MINIATURE = re.compile(
+    r'^%s/(?:%s)/(?P<source>.+)\.(?:%s)$' % (
+        DOSSIER_MINIATURES, '|'.join(map(re.escape, TAILLES)), '|'.join(map(re.escape, FORMATS))
+    )
+)
+
+
+def nom_valide(nom):
+    """Chemin relatif à MEDIA_ROOT, sans remontée ni dossier caché (fichiers partiels des téléversements)"""
+    return bool(nom) and posixpath.normpath(nom) == nom and not any(
+        partie.startswith('.') for partie in nom.split('/')
+    )
+
+
+def _references(user, nom):
+    """(lignes qui renvoient au fichier, condition de visibilité) pour chaque champ fichier"""
+    interventions = Intervention.objects.visible_to(user)
+    champs = [
+        (PieceJointe, 'fichier', Q(intervention__in=interventions)),
+        (Preuve, 'fichier', Q(intervention__in=interventions)),
+        (RapportImage, 'image', Q(rapport__intervention__in=interventions)),
+        (RapportFichierJoint, 'fichier', Q(rapport__intervention__in=interventions)),
+        (RenduPDF, 'fichier', Q(
+            type_document='mission', objet_id__in=Mission.objects.visible_to(user).values('pk')
+        ) | Q(
+            type_document='intervention', objet_id__in=interventions.values('pk')
+        )),
+        (Utilisateur, 'photo', Q()),
+    ]
+    for modele, champ, visibles in champs:
+        # Hors stockage dédoublonné, le dossier upload_to désigne le seul modèle possible
+        if nom.startswith(f'{DOSSIER_DEDOUBLONNE}/') or nom.startswith(modele._meta.get_field(champ).upload_to):
+            yield modele.objects.filter(**{champ: nom}), visibles
+
+
+def peut_consulter(user, nom):
+    """
+    True si ``user`` peut consulter le fichier ``nom`` (ou la miniature d'une image),
+    False sinon ; None si aucune ligne n'y renvoie.
+    """
+    if not user.is_authenticated:
+        return False
+    miniature = _MINIATURE.match(nom)
+    if miniature:
+        nom = miniature.group('source')
+    admin = is_admin(user)
+    reference = False
+    for lignes, visibles in _references(user, nom):
+        if admin:
+            visibles = Q()
+        # Un fichier dédoublonné peut être joint à plusieurs lignes : une seule visible suffit
+        if lignes.filter(visibles).exists():
+            return True
+        reference = reference or lignes.exists()
+    return False if reference else None
+
+
+def _plage(entete, taille):
+    """(debut, fin) inclusifs d'un en-tête Range à plage unique ; None s'il est absent ou ignoré"""
+    correspondance = _PLAGE.match(entete or '')
+    if not correspondance:
+        # Absent, malformé ou à plages multiples : le fichier entier est servi
+        return None
+    debut, fin = correspondance.groups()
+    if not debut:
+        if not fin:
+            return None
+        # bytes=-N : les N derniers octets
+        debut, fin = max(taille - int(fin), 0), taille - 1
+    else:
+        debut, fin = int(debut), min(int(fin), taille - 1) if fin else taille - 1
+    if debut >= taille or debut > fin:
+        raise ValueError(entete)
+    return debut, fin
+
+
+def _lire(fichier, longueur):
+    try:
+        while longueur > 0:
+            donnees = fichier.read(min(TAILLE_LECTURE, longueur))
+            if not donnees:
+                break
+            longueur -= len(donnees)
+            yield donnees
+    finally:
+        fichier.close()
+
+
+def _reponse_directe(request, chemin, statistiques, content_type):
+    """Envoi par Django : réponses conditionnelles et requêtes Range à plage unique"""
+    derniere_modification = http_date(statistiques.st_mtime)
+    if not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'), statistiques.st_mtime):
+        return HttpResponseNotModified()
+    taille = statistiques.st_size
+    plage = None
+    # If-Range : la plage ne vaut que pour la version que le client détient déjà
+    if request.META.get('HTTP_IF_RANGE', derniere_modification) == derniere_modification:
+        try:
+            plage = _plage(request.META.get('HTTP_RANGE'), taille)
+        except ValueError:
+            reponse = HttpResponse(status=416)
+            reponse['Content-Range'] = f'bytes */{taille}'
+            return reponse
+
+    if plage is None:
+        reponse = FileResponse(open(chemin, 'rb'), content_type=content_type)
+    else:
+        debut, fin = plage
+        fichier = open(chemin, 'rb')
+        fichier.seek(debut)
+        reponse = StreamingHttpResponse(_lire(fichier, fin - debut + 1), status=206, content_type=content_type)
+        reponse['Content-Range'] = f'bytes {debut}-{fin}/{taille}'
+        reponse['Content-Length'] = str(fin - debut + 1)
+    reponse['Accept-Ranges'] = 'bytes'
+    reponse['Last-Modified'] = derniere_modification
+    return reponse
+
+
+def reponse_fichier(request, nom, storage=None, as_attachment=False, filename=None, content_type=None):
+    """
+    Réponse qui transmet le fichier ``nom`` du stockage, droits déjà vérifiés par l'appelant.
+    Le transfert est confié au serveur frontal si MEDIAS_ENVOI le prévoit.
+    """
+    storage = storage or default_storage
+    chemin = storage.path(nom)
+    try:
+        statistiques = os.stat(chemin)
+    except (FileNotFoundError, NotADirectoryError):
+        raise Http404("Fichier introuvable")
+    if not os.path.isfile(chemin):
+        raise Http404("Fichier introuvable")
+    content_type = content_type or mimetypes.guess_type(filename or nom)[0] or 'application/octet-stream'
+
+    envoi = getattr(settings, 'MEDIAS_ENVOI', '')
+    if envoi == 'x-accel':
+        reponse = HttpResponse(content_type=content_type)
+        # nginx sert l'emplacement interne, Range et conditionnelles compris
+        reponse['X-Accel-Redirect'] = settings.MEDIAS_URL_INTERNE + quote(nom)
+    elif envoi == 'x-sendfile':
+        reponse = HttpResponse(content_type=content_type)
+        reponse['X-Sendfile'] = chemin
+    else:
+        reponse = _reponse_directe(request, chemin, statistiques, content_type)
+
+    if reponse.status_code in (200, 206):
+        disposition = content_disposition_header(as_attachment, filename or os.path.basename(nom))
+        if disposition:
+            reponse['Content-Disposition'] = disposition
+    # Fichiers soumis à des droits : jamais dans un cache partagé
+    reponse['Cache-Control'] = 'private, max-age=%d' % getattr(settings, 'MEDIAS_CACHE_SECONDES', 3600)
+    return reponse
@@ -0,0 +1,227 @@
+"""
+Métriques de l'application au format texte de Prometheus (vue ``metrics``).
+
+Chaque processus (worker gunicorn, ``render_pdfs``, commandes planifiées) tient
+ses compteurs et histogrammes en mémoire et les recopie, au plus une fois toutes
+les METRIQUES_INTERVALLE_ECRITURE secondes et à sa sortie, dans
+METRIQUES_DOSSIER/<pid>.json (remplacement atomique). La vue additionne les
+fichiers de tous les processus, y compris ceux qui se sont arrêtés : les
+compteurs restent croissants. entrypoint.sh vide le dossier au démarrage, ce que
+Prometheus traite comme une remise à zéro. Sans METRIQUES_DOSSIER, seules les
+valeurs du processus qui répond sont exposées.
+
+Les noms déclarés dans METRIQUES sont les seuls acceptés ; les étiquettes sont
+libres mais doivent rester en nombre borné (nom d'URL, type de document...).
+"""
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+PREFIXE = 'mission_manager_'
+
+LATENCES = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+DUREES_LONGUES = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+EFFECTIFS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+# nom : (type, aide, limites des classes pour un histogramme)
+METRIQUES = {
+    'http_requete_duree_secondes': ('histogram', "Durée des requêtes HTTP par nom d'URL", LATENCES),
+    'sql_requetes_total': ('counter', "Requêtes SQL émises, par nom d'URL", None),
+    'sql_duree_secondes_total': ('counter', "Temps passé en base, par nom d'URL", None),
+    'pdf_rendu_duree_secondes': ('histogram', "Durée de construction des rendus PDF", DUREES_LONGUES),
+    'notifications_destinataires': ('histogram', "Destinataires par envoi de notification groupé", EFFECTIFS),
+    'retards_verification_duree_secondes': ('histogram', "Durée des détections de retards", DUREES_LONGUES),
+    'retards_signales_total': ('counter', "Interventions marquées en retard", None),
+    'televersement_octets_total': ('counter', "Octets reçus par téléversement fragmenté", None),
+    'televersement_blocs_total': ('counter', "Blocs reçus par téléversement fragmenté", None),
+}
+
+_verrou = threading.Lock()
+_valeurs = {}
+_etat = {'pid': os.getpid(), 'ecriture': 0.0}
+
+
+def _cle(nom, etiquettes):
+    if nom not in METRIQUES:
+        raise KeyError(f"Métrique non déclarée : {nom}")
+    return nom, tuple(sorted((cle, str(valeur)) for cle, valeur in etiquettes.items()))
+
+
+def _processus():
+    # Processus issu d'un fork (worker gunicorn) : il repart de valeurs vides, sous son propre pid
+    if _etat['pid'] != os.getpid():
+        _valeurs.clear()
+        _etat.update(pid=os.getpid(), ecriture=0.0)
+
+
+def incrementer(nom, valeur=1, **etiquettes):
+    cle = _cle(nom, etiquettes)
+    with _verrou:
+        _processus()
+        _valeurs[cle] = _valeurs.get(cle, 0) + valeur
+    _ecrire_si_du()
+
+
+def observer(nom, valeur, **etiquettes):
+    """Ajoute une observation à l'histogramme ``nom``"""
+    cle = _cle(nom, etiquettes)
+    limites = METRIQUES[nom][2]
+    with _verrou:
+        _processus()
+        histogramme = _valeurs.setdefault(cle, {'classes': [0] * (len(limites) + 1), 'somme': 0, 'nombre': 0})
+        histogramme['classes'][bisect_left(limites, valeur)] += 1
+        histogramme['somme'] += valeur
+        histogramme['nombre'] += 1
+    _ecrire_si_du()
+
+
+@contextmanager
+def chronometrer(nom, **etiquettes):
+    """Observe la durée du bloc ; les étiquettes peuvent être complétées dans le bloc"""
+    debut = time.perf_counter()
+    try:
+        yield etiquettes
+    finally:
+        observer(nom, time.perf_counter() - debut, **etiquettes)
+
+
+def _dossier():
+    return getattr(settings, 'METRIQUES_DOSSIER', '')
+
+
+def ecrire():
+    """Recopie les valeurs du processus dans son fichier du dossier partagé"""
+    dossier = _dossier()
+    if not dossier:
+        return
+    with _verrou:
+        _processus()
+        instantane = [[nom, list(etiquettes), valeur] for (nom, etiquettes), valeur in _valeurs.items()]
+        _etat['ecriture'] = time.monotonic()
+    os.makedirs(dossier, exist_ok=True)
+    chemin = os.path.join(dossier, f'{os.getpid()}.json')
+    with open(chemin + '.tmp', 'w') as fichier:
+        json.dump(instantane, fichier)
+    os.replace(chemin + '.tmp', chemin)
+
+
+def _ecrire_si_du():
+    if _dossier() and time.monotonic() - _etat['ecriture'] >= getattr(settings, 'METRIQUES_INTERVALLE_ECRITURE', 1):
+        ecrire()
+
+
+atexit.register(lambda: _dossier() and ecrire())
+
+
+def _additionner(total, cle, valeur):
+    if isinstance(valeur, dict):
+        cumul = total.setdefault(cle, {'classes': [0] * len(valeur['classes']), 'somme': 0, 'nombre': 0})
+        cumul['classes'] = [a + b for a, b in zip(cumul['classes'], valeur['classes'])]
+        cumul['somme'] += valeur['somme']
+        cumul['nombre'] += valeur['nombre']
+    else:
+        total[cle] = total.get(cle, 0) + valeur
+
+
+def valeurs():
+    """Valeurs additionnées de tous les processus : {(nom, étiquettes): valeur}"""
+    total = {}
+    with _verrou:
+        _processus()
+        locales = {cle: json.loads(json.dumps(valeur)) for cle, valeur in _valeurs.items()}
+    for cle, valeur in locales.items():
+        _additionner(total, cle, valeur)
+    dossier = _dossier()
+    if dossier:
+        for chemin in glob.glob(os.path.join(dossier, '*.json')):
+            if os.path.basename(chemin) == f'{os.getpid()}.json':
+                continue
+            try:
+                with open(chemin) as fichier:
+                    contenu = json.load(fichier)
+            except (OSError, ValueError):
+                continue
+            for nom, etiquettes, valeur in contenu:
+                if nom in METRIQUES:
+                    _additionner(total, (nom, tuple(tuple(paire) for paire in etiquettes)), valeur)
+    return total
+
+
+def _echapper(valeur):
+    return valeur.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _etiquettes(etiquettes, **supplementaires):
+    paires = list(etiquettes) + list(supplementaires.items())
+    if not paires:
+        return ''
+    return '{' + ','.join(f'{cle}="{_echapper(str(valeur))}"' for cle, valeur in paires) + '}'
+
+
+def _nombre(valeur):
+    return repr(float(valeur)) if isinstance(valeur, float) else str(valeur)
+
+
+def exposition():
+    """Texte au format d'exposition de Prometheus (version 0.0.4)"""
+    par_nom = {}
+    for (nom, etiquettes), valeur in sorted(valeurs().items()):
+        par_nom.setdefault(nom, []).append((etiquettes, valeur))
+    lignes = []
+    for nom, (type_, aide, limites) in METRIQUES.items():
+        complet = PREFIXE + nom
+        lignes.append(f'# HELP {complet} {aide}')
+        lignes.append(f'# TYPE {complet} {type_}')
+        for etiquettes, valeur in par_nom.get(nom, []):
+            if type_ == 'counter':
+                lignes.append(f'{complet}{_etiquettes(etiquettes)} {_nombre(valeur)}')
+                continue
+            cumul = 0
+            for limite, effectif in zip(list(limites) + ['+Inf'], valeur['classes']):
+                cumul += effectif
+                lignes.append(f'{complet}_bucket{_etiquettes(etiquettes, le=limite)} {cumul}')
+            lignes.append(f'{complet}_sum{_etiquettes(etiquettes)} {_nombre(valeur["somme"])}')
+            lignes.append(f'{complet}_count{_etiquettes(etiquettes)} {valeur["nombre"]}')
+    return '\n'.join(lignes) + '\n'
+
+
+class _CompteurSQL:
+    def __init__(self):
+        self.nombre = 0
+        self.duree = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        debut = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.nombre += 1
+            self.duree += time.perf_counter() - debut
+
+
+class MetriquesMiddleware:
+    """Latence de chaque requête HTTP et requêtes SQL émises, par nom d'URL"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        compteur = _CompteurSQL()
+        debut = time.perf_counter()
+        with connections['default'].execute_wrapper(compteur):
+            response = self.get_response(request)
+        duree = time.perf_counter() - debut
+        correspondance = getattr(request, 'resolver_match', None)
+        vue = (correspondance.url_name or correspondance.view_name) if correspondance else 'non_resolue'
+        observer('http_requete_duree_secondes', duree, vue=vue, methode=request.method)
+        incrementer('sql_requetes_total', compteur.nombre, vue=vue)
+        incrementer('sql_duree_secondes_total', compteur.duree, vue=vue)
+        return response
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.3 on 2026-10-18 07:11
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def initialiser_compteurs(apps, schema_editor):
+    Utilisateur = apps.get_model('core', 'Utilisateur')
+    comptes = Utilisateur.objects.annotate(
+        vrai_compte=Count('notifications', filter=Q(notifications__lue=False))
+    ).filter(vrai_compte__gt=0).values_list('pk', 'vrai_compte')
+    for pk, vrai_compte in comptes:
+        Utilisateur.objects.filter(pk=pk).update(notifications_non_lues=vrai_compte)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_intervention_date_retard_intervention_duree_retard_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='utilisateur',
+            name='notifications_non_lues',
+            field=models.IntegerField(default=0, editable=False, verbose_name='Notifications non lues'),
+        ),
+        migrations.RunPython(initialiser_compteurs, migrations.RunPython.noop),
+    ]
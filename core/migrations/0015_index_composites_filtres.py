@@ -0,0 +1,49 @@
+# Generated by Django 5.2.3 on 2026-10-18 07:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_utilisateur_notifications_non_lues'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='intervention',
+            index=models.Index(fields=['en_retard', 'statut', 'date_echeance'], name='interv_retard_check_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='intervention',
+            index=models.Index(fields=['intervenant', 'statut'], name='interv_intervenant_statut_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='intervention',
+            index=models.Index(fields=['date', 'id'], name='interv_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mission',
+            index=models.Index(fields=['assigne_a', 'statut'], name='mission_assigne_statut_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mission',
+            index=models.Index(fields=['date_creation', 'id'], name='mission_date_creation_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['utilisateur', 'lue', 'date_creation'], name='notif_user_lue_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['utilisateur', 'date_creation', 'id'], name='notif_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='retardintervention',
+            index=models.Index(fields=['responsable', 'resolu', 'date_creation'], name='retard_resp_resolu_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='retardintervention',
+            index=models.Index(fields=['date_creation', 'id'], name='retard_date_creation_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.3 on 2026-10-18 07:16
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_index_composites_filtres'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndicateurIntervention',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cle', models.CharField(max_length=50, unique=True, verbose_name='Clé')),
+                ('dimension', models.CharField(choices=[('global', 'Global'), ('client', 'Client'), ('intervenant', 'Intervenant'), ('semaine', 'Semaine')], max_length=20, verbose_name='Dimension')),
+                ('semaine', models.DateField(blank=True, null=True, verbose_name='Semaine du')),
+                ('total', models.IntegerField(default=0, verbose_name='Total')),
+                ('en_attente', models.IntegerField(default=0, verbose_name='En attente')),
+                ('en_cours', models.IntegerField(default=0, verbose_name='En cours')),
+                ('terminee', models.IntegerField(default=0, verbose_name='Terminées')),
+                ('en_retard', models.IntegerField(default=0, verbose_name='En retard')),
+                ('date_maj', models.DateTimeField(auto_now=True, verbose_name='Dernière mise à jour')),
+                ('client', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.client', verbose_name='Client')),
+                ('intervenant', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Intervenant')),
+            ],
+            options={
+                'verbose_name': "Indicateur d'interventions",
+                'verbose_name_plural': "Indicateurs d'interventions",
+                'indexes': [models.Index(fields=['dimension', 'total'], name='indicateur_dimension_idx')],
+            },
+        ),
+    ]
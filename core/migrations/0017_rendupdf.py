@@ -0,0 +1,37 @@
+# Generated by Django 5.2.3 on 2026-10-18 07:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_indicateurintervention'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RenduPDF',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type_document', models.CharField(choices=[('mission', 'Mission'), ('intervention', 'Intervention')], max_length=20, verbose_name='Type de document')),
+                ('objet_id', models.PositiveIntegerField(verbose_name="Identifiant de l'objet")),
+                ('empreinte', models.CharField(max_length=64, verbose_name='Empreinte des données')),
+                ('statut', models.CharField(choices=[('en_attente', 'En attente'), ('en_cours', 'En cours'), ('termine', 'Terminé'), ('echec', 'Échec')], default='en_attente', max_length=20, verbose_name='Statut')),
+                ('fichier', models.FileField(blank=True, upload_to='rendus_pdf/', verbose_name='Fichier')),
+                ('erreur', models.TextField(blank=True, verbose_name='Erreur')),
+                ('date_creation', models.DateTimeField(auto_now_add=True, verbose_name='Date de création')),
+                ('date_debut', models.DateTimeField(blank=True, null=True, verbose_name='Début du rendu')),
+                ('date_fin', models.DateTimeField(blank=True, null=True, verbose_name='Fin du rendu')),
+                ('demande_par', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Demandé par')),
+            ],
+            options={
+                'verbose_name': 'Rendu PDF',
+                'verbose_name_plural': 'Rendus PDF',
+                'indexes': [models.Index(fields=['statut', 'date_creation'], name='rendu_pdf_statut_idx')],
+                'constraints': [models.UniqueConstraint(fields=('type_document', 'objet_id', 'empreinte'), name='rendu_pdf_unique')],
+            },
+        ),
+    ]
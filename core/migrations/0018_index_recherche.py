@@ -0,0 +1,56 @@
+# Generated by Django 5.2.3 on 2026-10-18 07:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def creer_index_fulltext(apps, schema_editor):
+    # Index FULLTEXT propre à MySQL ; les autres bases utilisent l'index inversé TermeRecherche
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute(
+            "ALTER TABLE core_documentrecherche ADD FULLTEXT INDEX document_recherche_fulltext (titre, contenu)"
+        )
+
+
+def supprimer_index_fulltext(apps, schema_editor):
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute("ALTER TABLE core_documentrecherche DROP INDEX document_recherche_fulltext")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_rendupdf'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentRecherche',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type_objet', models.CharField(choices=[('mission', 'Mission'), ('intervention', 'Intervention'), ('client', 'Client')], max_length=20, verbose_name="Type d'objet")),
+                ('objet_id', models.PositiveBigIntegerField(verbose_name="Identifiant de l'objet")),
+                ('titre', models.CharField(max_length=255, verbose_name='Titre normalisé')),
+                ('contenu', models.TextField(verbose_name='Contenu normalisé')),
+                ('date_maj', models.DateTimeField(auto_now=True, verbose_name='Dernière mise à jour')),
+            ],
+            options={
+                'verbose_name': 'Document de recherche',
+                'verbose_name_plural': 'Documents de recherche',
+                'constraints': [models.UniqueConstraint(fields=('type_objet', 'objet_id'), name='document_recherche_unique')],
+            },
+        ),
+        migrations.CreateModel(
+            name='TermeRecherche',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('terme', models.CharField(max_length=64)),
+                ('poids', models.PositiveSmallIntegerField(default=1)),
+                ('document', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='termes', to='core.documentrecherche')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['terme', 'document'], name='terme_recherche_idx')],
+            },
+        ),
+        migrations.RunPython(creer_index_fulltext, supprimer_index_fulltext),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.3 on 2026-10-18 07:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_index_recherche'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EntreeAutocompletion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type_objet', models.CharField(choices=[('client', 'Client'), ('mission', 'Mission'), ('utilisateur', 'Utilisateur')], max_length=20, verbose_name="Type d'objet")),
+                ('objet_id', models.PositiveBigIntegerField(verbose_name="Identifiant de l'objet")),
+                ('cle', models.CharField(max_length=100, verbose_name='Clé normalisée')),
+                ('libelle', models.CharField(max_length=255, verbose_name='Libellé affiché')),
+                ('categorie', models.CharField(blank=True, max_length=20, verbose_name='Catégorie')),
+            ],
+            options={
+                'verbose_name': "Entrée d'autocomplétion",
+                'verbose_name_plural': "Entrées d'autocomplétion",
+                'indexes': [models.Index(fields=['type_objet', 'cle'], name='autocompletion_cle_idx'), models.Index(fields=['type_objet', 'objet_id'], name='autocompletion_objet_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.3 on 2026-10-18 07:48
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def recopier_droits(apps, schema_editor):
+    """Renseigne les droits des documents déjà indexés"""
+    DocumentRecherche = apps.get_model('core', 'DocumentRecherche')
+    Mission = apps.get_model('core', 'Mission')
+    Intervention = apps.get_model('core', 'Intervention')
+    DocumentRecherche.objects.filter(type_objet='mission').update(
+        responsable_id=Subquery(Mission.objects.filter(pk=OuterRef('objet_id')).values('assigne_a_id')[:1])
+    )
+    interventions = Intervention.objects.filter(pk=OuterRef('objet_id'))
+    DocumentRecherche.objects.filter(type_objet='intervention').update(
+        responsable_id=Subquery(interventions.values('mission__assigne_a_id')[:1]),
+        intervenant_id=Subquery(interventions.values('intervenant_id')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_entreeautocompletion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='documentrecherche',
+            name='intervenant_id',
+            field=models.PositiveBigIntegerField(blank=True, null=True, verbose_name="Identifiant de l'intervenant"),
+        ),
+        migrations.AddField(
+            model_name='documentrecherche',
+            name='responsable_id',
+            field=models.PositiveBigIntegerField(blank=True, null=True, verbose_name='Identifiant du responsable de la mission'),
+        ),
+        migrations.AddIndex(
+            model_name='documentrecherche',
+            index=models.Index(fields=['type_objet', 'responsable_id'], name='document_recherche_resp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='documentrecherche',
+            index=models.Index(fields=['type_objet', 'intervenant_id'], name='document_recherche_interv_idx'),
+        ),
+        migrations.RunPython(recopier_droits, migrations.RunPython.noop),
+    ]
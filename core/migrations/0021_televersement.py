@@ -0,0 +1,38 @@
+# Generated by Django 5.2.3 on 2026-10-18 07:52
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_droits_documents_recherche'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Televersement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('jeton', models.UUIDField(default=uuid.uuid4, editable=False, unique=True, verbose_name='Jeton')),
+                ('nom_fichier', models.CharField(max_length=255, verbose_name='Nom du fichier')),
+                ('type_contenu', models.CharField(blank=True, max_length=100, verbose_name='Type de contenu')),
+                ('taille', models.PositiveBigIntegerField(verbose_name='Taille (octets)')),
+                ('sha256', models.CharField(blank=True, max_length=64, verbose_name='Empreinte SHA-256')),
+                ('recu', models.PositiveBigIntegerField(default=0, verbose_name='Octets reçus')),
+                ('statut', models.CharField(choices=[('en_cours', 'En cours'), ('termine', 'Terminé'), ('echec', 'Échec')], default='en_cours', max_length=20, verbose_name='Statut')),
+                ('erreur', models.TextField(blank=True, verbose_name='Erreur')),
+                ('date_creation', models.DateTimeField(auto_now_add=True, verbose_name='Date de création')),
+                ('date_maj', models.DateTimeField(auto_now=True, verbose_name='Dernière mise à jour')),
+                ('utilisateur', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='televersements', to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur')),
+            ],
+            options={
+                'verbose_name': 'Téléversement',
+                'verbose_name_plural': 'Téléversements',
+                'indexes': [models.Index(fields=['date_maj'], name='televersement_date_maj_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.3 on 2026-10-18 07:56
+
+import core.stockage
+import django.core.validators
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_televersement'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='piecejointe',
+            name='fichier',
+            field=models.FileField(storage=core.stockage.stockage_medias, upload_to='pieces_jointes/', verbose_name='Fichier'),
+        ),
+        migrations.AlterField(
+            model_name='preuve',
+            name='fichier',
+            field=models.FileField(storage=core.stockage.stockage_medias, upload_to='preuves/', verbose_name='Fichier'),
+        ),
+        migrations.AlterField(
+            model_name='rapportfichierjoint',
+            name='fichier',
+            field=models.FileField(storage=core.stockage.stockage_medias, upload_to='rapports/fichiers/', validators=[django.core.validators.FileExtensionValidator(['pdf', 'doc', 'docx', 'xls', 'xlsx', 'jpg', 'jpeg', 'png'])]),
+        ),
+        migrations.AlterField(
+            model_name='rapportimage',
+            name='image',
+            field=models.ImageField(storage=core.stockage.stockage_medias, upload_to='rapports/images/', validators=[django.core.validators.FileExtensionValidator(['jpg', 'jpeg', 'png', 'gif'])]),
+        ),
+        migrations.CreateModel(
+            name='FichierStocke',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nom', models.CharField(max_length=255, unique=True, verbose_name='Nom')),
+                ('empreinte', models.CharField(db_index=True, max_length=64, verbose_name='Empreinte SHA-256')),
+                ('taille', models.PositiveBigIntegerField(verbose_name='Taille (octets)')),
+                ('references', models.IntegerField(default=0, verbose_name='Références')),
+                ('date_creation', models.DateTimeField(auto_now_add=True, verbose_name='Date de création')),
+                ('date_maj', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Dernière mise à jour')),
+            ],
+            options={
+                'verbose_name': 'Fichier stocké',
+                'verbose_name_plural': 'Fichiers stockés',
+                'indexes': [models.Index(fields=['references', 'date_maj'], name='fichier_stocke_collecte_idx')],
+            },
+        ),
+    ]
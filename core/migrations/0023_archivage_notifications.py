@@ -0,0 +1,45 @@
+# Generated by Django 5.2.3 on 2026-10-18 08:02
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_stockage_dedoublonne'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationArchivee',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('message', models.CharField(max_length=255, verbose_name='Message')),
+                ('type_notification', models.CharField(max_length=50, verbose_name='Type de notification')),
+                ('date_creation', models.DateTimeField(verbose_name='Date de création')),
+            ],
+            options={
+                'verbose_name': 'Notification archivée',
+                'verbose_name_plural': 'Notifications archivées',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['lue', 'date_creation'], name='notif_lue_date_idx'),
+        ),
+        migrations.AddField(
+            model_name='notificationarchivee',
+            name='utilisateur',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications_archivees', to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur'),
+        ),
+        migrations.AddIndex(
+            model_name='notificationarchivee',
+            index=models.Index(fields=['utilisateur', 'date_creation'], name='notif_archive_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificationarchivee',
+            index=models.Index(fields=['date_creation'], name='notif_archive_date_idx'),
+        ),
+    ]
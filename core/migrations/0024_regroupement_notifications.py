@@ -0,0 +1,32 @@
+# Generated by Django 5.2.3 on 2026-10-18 08:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0023_archivage_notifications'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='cibles',
+            field=models.JSONField(blank=True, default=list, verbose_name='Objets concernés'),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='fenetre',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Début de la fenêtre de regroupement'),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='nombre',
+            field=models.PositiveIntegerField(default=1, verbose_name="Nombre d'événements"),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['utilisateur', 'type_notification', 'fenetre'], name='notif_regroupement_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.3 on 2026-10-18 08:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0024_regroupement_notifications'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificationarchivee',
+            name='cibles',
+            field=models.JSONField(blank=True, default=list, verbose_name='Objets concernés'),
+        ),
+        migrations.AddField(
+            model_name='notificationarchivee',
+            name='nombre',
+            field=models.PositiveIntegerField(default=1, verbose_name="Nombre d'événements"),
+        ),
+    ]
@@ -0,0 +1,129 @@
+"""
+Miniatures des images téléversées (pièces jointes, images et fichiers de rapport,
+photos de profil).
+
+Chaque image source a, pour chaque taille de TAILLES, une version WebP et une
+version JPEG rangées sous MEDIA_ROOT/miniatures/<taille>/<chemin source>.<format>.
+Le chemin se déduit du nom du fichier source : aucune table, les templates
+(filtres ``miniature`` / ``miniature_webp``) retombent sur l'original tant que la
+miniature n'existe pas. Les miniatures sont produites après l'enregistrement par
+un pool de threads (Pillow relâche le GIL pendant le décodage et le
+redimensionnement) ; ``generer_miniatures`` rattrape les fichiers existants.
+"""
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+DOSSIER = 'miniatures'
+# Plus grand côté, en pixels
+TAILLES = {
+    'vignette': 128,
+    'apercu': 640,
+}
+FORMATS = {
+    'webp': ('WEBP', {'quality': 78, 'method': 4}),
+    'jpg': ('JPEG', {'quality': 80, 'optimize': True, 'progressive': True}),
+}
+EXTENSIONS_IMAGES = ('.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp')
+
+_pool = None
+_verrou = threading.Lock()
+
+
+def est_image(nom):
+    return bool(nom) and os.path.splitext(nom)[1].lower() in EXTENSIONS_IMAGES
+
+
+def chemin_miniature(nom_source, taille, format_):
+    return f"{DOSSIER}/{taille}/{nom_source}.{format_}"
+
+
+def url_miniature(fichier, taille, format_='jpg'):
+    """URL de la miniature si elle existe, sinon de l'original"""
+    if not fichier:
+        return ''
+    nom = fichier.name
+    if est_image(nom) and taille in TAILLES:
+        chemin = chemin_miniature(nom, taille, format_)
+        if fichier.storage.exists(chemin):
+            return fichier.storage.url(chemin)
+    return fichier.url
+
+
+def generer(nom_source, storage=None, forcer=False):
+    """Produit les miniatures manquantes (toutes si ``forcer``) d'une image ; retourne leur nombre"""
+    storage = storage or default_storage
+    a_produire = [
+        (taille, format_) for taille in TAILLES for format_ in FORMATS
+        if forcer or not storage.exists(chemin_miniature(nom_source, taille, format_))
+    ]
+    if not a_produire:
+        return 0
+
+    with storage.open(nom_source, 'rb') as source:
+        image = Image.open(source)
+        # Décodage JPEG directement à l'échelle utile : ni la mémoire ni le temps d'une photo de 12 Mpx
+        image.draft('RGB', (max(TAILLES.values()),) * 2)
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'PA') else 'RGB')
+
+    for taille in sorted({taille for taille, _ in a_produire}, key=TAILLES.get, reverse=True):
+        reduite = image.copy()
+        reduite.thumbnail((TAILLES[taille], TAILLES[taille]), Image.Resampling.LANCZOS)
+        for format_ in [f for t, f in a_produire if t == taille]:
+            nom_pil, options = FORMATS[format_]
+            a_enregistrer = reduite.convert('RGB') if nom_pil == 'JPEG' and reduite.mode != 'RGB' else reduite
+            tampon = BytesIO()
+            a_enregistrer.save(tampon, nom_pil, **options)
+            chemin = chemin_miniature(nom_source, taille, format_)
+            # storage.save renommerait le fichier s'il existe déjà
+            storage.delete(chemin)
+            storage.save(chemin, ContentFile(tampon.getvalue()))
+    return len(a_produire)
+
+
+def _generer_sans_erreur(nom_source):
+    try:
+        generer(nom_source)
+    except Exception:
+        logger.exception("Miniatures de %s non générées", nom_source)
+
+
+def _executeur():
+    global _pool
+    with _verrou:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'MINIATURES_THREADS', 2), thread_name_prefix='miniatures'
+            )
+        return _pool
+
+
+def planifier(fichier):
+    """Génère les miniatures d'un fichier image après la validation de la transaction en cours"""
+    if not fichier or not est_image(fichier.name):
+        return
+    nom = fichier.name
+    if getattr(settings, 'MINIATURES_ASYNCHRONE', True):
+        transaction.on_commit(lambda: _executeur().submit(_generer_sans_erreur, nom))
+    else:
+        transaction.on_commit(lambda: _generer_sans_erreur(nom))
+
+
+def supprimer(nom_source, storage=None):
+    storage = storage or default_storage
+    for taille in TAILLES:
+        for format_ in FORMATS:
+            storage.delete(chemin_miniature(nom_source, taille, format_))
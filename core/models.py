@@ -1,8 +1,11 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import FileExtensionValidator
+import uuid
 from datetime import datetime
 from django.utils import timezone
+from .permissions import is_admin
+from .stockage import stockage_medias
 
 class Utilisateur(AbstractUser):
     ROLE_CHOICES = (
@@ -13,6 +16,8 @@ class Utilisateur(AbstractUser):
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, verbose_name="Rôle")
     telephone = models.CharField(max_length=20, blank=True, verbose_name="Téléphone")
     photo = models.ImageField(upload_to='photos_profil/', blank=True, null=True, verbose_name="Photo de profil")
+    # Compteur dénormalisé, tenu à jour par core.notifications (voir rebuild_notification_counters)
+    notifications_non_lues = models.IntegerField(default=0, editable=False, verbose_name="Notifications non lues")
 
     class Meta:
         verbose_name = "Utilisateur"
@@ -21,6 +26,11 @@ class Utilisateur(AbstractUser):
     def __str__(self):
         return f"{self.first_name} {self.last_name}" if self.first_name and self.last_name else self.username
 
+class ClientQuerySet(models.QuerySet):
+    def visible_to(self, user):
+        """Clients consultables par ``user`` : tous, pour un utilisateur connecté"""
+        return self.all() if user.is_authenticated else self.none()
+
 class Client(models.Model):
     nom = models.CharField(max_length=255, verbose_name="Nom de l'entreprise")
     contact = models.CharField(max_length=255, verbose_name="Personne à contacter")
@@ -28,6 +38,8 @@ class Client(models.Model):
     telephone = models.CharField(max_length=20, verbose_name="Téléphone")
     adresse = models.TextField(verbose_name="Adresse")
 
+    objects = ClientQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Client"
         verbose_name_plural = "Clients"
@@ -35,6 +47,19 @@ class Client(models.Model):
     def __str__(self):
         return self.nom
 
+class MissionQuerySet(models.QuerySet):
+    def for_list(self):
+        """Charge en une requête les relations affichées dans les listes de missions"""
+        return self.select_related('client', 'assigne_a')
+
+    def visible_to(self, user):
+        """Missions consultables par ``user`` : toutes pour un administrateur, sinon celles qui lui sont assignées"""
+        if is_admin(user):
+            return self.all()
+        if not user.is_authenticated:
+            return self.none()
+        return self.filter(assigne_a=user)
+
 class Mission(models.Model):
     client = models.ForeignKey(Client, on_delete=models.CASCADE, related_name='missions', verbose_name="Client")
     titre = models.CharField(max_length=255, verbose_name="Titre de la mission")
@@ -52,13 +77,41 @@ class Mission(models.Model):
     )
     date_creation = models.DateTimeField(auto_now_add=True, verbose_name="Date de création")
 
+    objects = MissionQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Mission"
         verbose_name_plural = "Missions"
+        indexes = [
+            # Tableau de bord employé : missions assignées par statut
+            models.Index(fields=['assigne_a', 'statut'], name='mission_assigne_statut_idx'),
+            # Listes paginées sur (-date_creation, -id)
+            models.Index(fields=['date_creation', 'id'], name='mission_date_creation_idx'),
+        ]
     
     def __str__(self):
         return self.titre
 
+def _interventions_visibles(queryset, user, chemin=''):
+    """Filtre de visibilité des interventions ; ``chemin`` mène à l'intervention (``'intervention__'``)"""
+    if is_admin(user):
+        return queryset.all()
+    if not user.is_authenticated:
+        return queryset.none()
+    return queryset.filter(**{f'{chemin}intervenant': user})
+
+class InterventionQuerySet(models.QuerySet):
+    def for_list(self):
+        """Charge en une requête mission, client, intervenant et rapport de chaque intervention"""
+        return self.select_related('mission', 'mission__client', 'intervenant', 'rapport')
+
+    def visible_to(self, user):
+        """
+        Interventions consultables par ``user`` (fiche, rapport, fichiers) : toutes pour un
+        administrateur, sinon celles qui lui sont confiées (règle de can_view_intervention)
+        """
+        return _interventions_visibles(self, user)
+
 class Intervention(models.Model):
     PRIORITE_CHOICES = [
         ('normale', 'Normale'),
@@ -101,9 +154,19 @@ class Intervention(models.Model):
     motif_retard = models.TextField(blank=True, verbose_name="Motif du retard")
     retard_resolu = models.BooleanField(default=False, verbose_name="Retard résolu")
 
+    objects = InterventionQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Intervention"
         verbose_name_plural = "Interventions"
+        indexes = [
+            # Détection des retards : en_retard = False AND statut IN (...) AND date_echeance < ...
+            models.Index(fields=['en_retard', 'statut', 'date_echeance'], name='interv_retard_check_idx'),
+            # Tableau de bord employé : interventions assignées par statut
+            models.Index(fields=['intervenant', 'statut'], name='interv_intervenant_statut_idx'),
+            # Listes paginées sur (-date, -id)
+            models.Index(fields=['date', 'id'], name='interv_date_idx'),
+        ]
     
     def __str__(self):
         return self.titre
@@ -125,38 +188,12 @@ class Intervention(models.Model):
             aujourd_hui = timezone.now().date()
             if aujourd_hui > self.date_echeance:
                 if not self.en_retard:
-                    self.en_retard = True
-                    self.date_retard = timezone.now()
-                    self.save()
-                    
-                    # Créer un retard automatique
-                    from .models import RetardIntervention, Notification
-                    retard = RetardIntervention.objects.create(
-                        intervention=self,
-                        type_retard='fin',
-                        date_debut_retard=timezone.now(),
-                        motif=f"Intervention non effectuée à la date d'échéance ({self.date_echeance.strftime('%d/%m/%Y')})",
-                        impact="Impact sur le planning et la satisfaction client",
-                        actions_correctives="Contacter l'intervenant pour reprogrammer",
-                        responsable=self.intervenant
-                    )
-                    
-                    # Créer des notifications
-                    if self.intervenant:
-                        Notification.objects.create(
-                            utilisateur=self.intervenant,
-                            message=f"Votre intervention '{self.titre}' est en retard depuis le {self.date_echeance.strftime('%d/%m/%Y')}",
-                            type_notification="retard_automatique"
-                        )
-                    
-                    # Notifier les administrateurs
-                    admins = Utilisateur.objects.filter(role='administrateur')
-                    for admin in admins:
-                        Notification.objects.create(
-                            utilisateur=admin,
-                            message=f"Intervention en retard automatique : {self.titre} (Intervenant: {self.intervenant})",
-                            type_notification="retard_automatique_admin"
-                        )
+                    # Même moteur que la vérification quotidienne, restreint à cette intervention
+                    from .retards import detecter_retards
+                    signalees = detecter_retards(Intervention.objects.filter(pk=self.pk), aujourd_hui)
+                    if signalees:
+                        self.en_retard = True
+                        self.date_retard = signalees[0].date_retard
                     
                 return True
         return False
@@ -168,6 +205,19 @@ class Intervention(models.Model):
             return duree
         return None
 
+class RetardInterventionQuerySet(models.QuerySet):
+    def for_list(self):
+        """Charge en une requête l'intervention, sa mission et le responsable de chaque retard"""
+        return self.select_related('intervention', 'intervention__mission', 'responsable')
+
+    def visible_to(self, user):
+        """Retards consultables par ``user`` : tous pour un administrateur, sinon ceux dont il est responsable"""
+        if is_admin(user):
+            return self.all()
+        if not user.is_authenticated:
+            return self.none()
+        return self.filter(responsable=user)
+
 class RetardIntervention(models.Model):
     TYPE_RETARD_CHOICES = [
         ('debut', 'Retard au début'),
@@ -191,9 +241,16 @@ class RetardIntervention(models.Model):
     date_creation = models.DateTimeField(auto_now_add=True, verbose_name="Date de création")
     resolu = models.BooleanField(default=False, verbose_name="Résolu")
 
+    objects = RetardInterventionQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Retard d'intervention"
         verbose_name_plural = "Retards d'intervention"
+        indexes = [
+            # dashboard_retards et retard_list : retards d'un responsable, résolus ou non, par date
+            models.Index(fields=['responsable', 'resolu', 'date_creation'], name='retard_resp_resolu_date_idx'),
+            models.Index(fields=['date_creation', 'id'], name='retard_date_creation_idx'),
+        ]
     
     def __str__(self):
         return f"Retard - {self.intervention.titre} - {self.get_type_retard_display()}"
@@ -215,7 +272,7 @@ class PieceJointe(models.Model):
     ]
     intervention = models.ForeignKey(Intervention, on_delete=models.CASCADE, related_name='pieces_jointes', verbose_name="Intervention")
     titre = models.CharField(max_length=255, verbose_name="Titre du fichier")
-    fichier = models.FileField(upload_to='pieces_jointes/', verbose_name="Fichier")
+    fichier = models.FileField(upload_to='pieces_jointes/', storage=stockage_medias, verbose_name="Fichier")
     type_fichier = models.CharField(
         max_length=20,
         choices=TYPE_CHOICES,
@@ -234,7 +291,7 @@ class PieceJointe(models.Model):
 
 class Preuve(models.Model):
     intervention = models.ForeignKey(Intervention, on_delete=models.CASCADE, related_name='preuves', verbose_name="Intervention")
-    fichier = models.FileField(upload_to='preuves/', verbose_name="Fichier")
+    fichier = models.FileField(upload_to='preuves/', storage=stockage_medias, verbose_name="Fichier")
     type_preuve = models.CharField(
         max_length=20,
         choices=[('avant', 'Avant'), ('apres', 'Après')],
@@ -252,10 +309,55 @@ class Notification(models.Model):
     type_notification = models.CharField(max_length=50, verbose_name="Type de notification")
     lue = models.BooleanField(default=False, verbose_name="Lue")
     date_creation = models.DateTimeField(auto_now_add=True, verbose_name="Date de création")
+    # Notification regroupée (core.notifications.notifier_regroupe) : événements de même type
+    # survenus dans la même fenêtre, avec leur nombre et leurs objets
+    fenetre = models.DateTimeField(null=True, blank=True, verbose_name="Début de la fenêtre de regroupement")
+    nombre = models.PositiveIntegerField(default=1, verbose_name="Nombre d'événements")
+    cibles = models.JSONField(default=list, blank=True, verbose_name="Objets concernés")
 
     class Meta:
         verbose_name = "Notification"
         verbose_name_plural = "Notifications"
+        indexes = [
+            models.Index(fields=['utilisateur', 'type_notification', 'fenetre'], name='notif_regroupement_idx'),
+            # Notifications non lues d'un utilisateur et liste triée par date
+            models.Index(fields=['utilisateur', 'lue', 'date_creation'], name='notif_user_lue_date_idx'),
+            models.Index(fields=['utilisateur', 'date_creation', 'id'], name='notif_user_date_idx'),
+            # Sélection des notifications lues à archiver (core/retention.py)
+            models.Index(fields=['lue', 'date_creation'], name='notif_lue_date_idx'),
+        ]
+
+
+class NotificationArchivee(models.Model):
+    """
+    Notification lue déplacée hors de la table des notifications passé
+    NOTIFICATIONS_RETENTION_JOURS (voir core/retention.py), puis supprimée passé
+    NOTIFICATIONS_ARCHIVE_JOURS.
+    """
+    utilisateur = models.ForeignKey(Utilisateur, on_delete=models.CASCADE, related_name='notifications_archivees', verbose_name="Utilisateur")
+    message = models.CharField(max_length=255, verbose_name="Message")
+    type_notification = models.CharField(max_length=50, verbose_name="Type de notification")
+    # Regroupement conservé tel quel (voir Notification.nombre et Notification.cibles)
+    nombre = models.PositiveIntegerField(default=1, verbose_name="Nombre d'événements")
+    cibles = models.JSONField(default=list, blank=True, verbose_name="Objets concernés")
+    date_creation = models.DateTimeField(verbose_name="Date de création")
+
+    class Meta:
+        verbose_name = "Notification archivée"
+        verbose_name_plural = "Notifications archivées"
+        indexes = [
+            models.Index(fields=['utilisateur', 'date_creation'], name='notif_archive_user_date_idx'),
+            models.Index(fields=['date_creation'], name='notif_archive_date_idx'),
+        ]
+
+class RapportInterventionQuerySet(models.QuerySet):
+    def for_list(self):
+        """Charge en une requête l'intervention, la mission et le client de chaque rapport"""
+        return self.select_related('intervention', 'intervention__mission', 'intervention__mission__client')
+
+    def visible_to(self, user):
+        """Rapports des interventions consultables par ``user``"""
+        return _interventions_visibles(self, user, 'intervention__')
 
 class RapportIntervention(models.Model):
     STATUT_CHOICES = [
@@ -278,6 +380,8 @@ class RapportIntervention(models.Model):
     date_creation = models.DateTimeField(auto_now_add=True)
     date_modification = models.DateTimeField(auto_now=True)
 
+    objects = RapportInterventionQuerySet.as_manager()
+
     def __str__(self):
         return f"Rapport d'intervention #{self.pk}"
 
@@ -292,7 +396,7 @@ class RapportImage(models.Model):
         ("apres", "Après"),
     ]
     rapport = models.ForeignKey(RapportIntervention, on_delete=models.CASCADE, related_name="images")
-    image = models.ImageField(upload_to="rapports/images/", validators=[FileExtensionValidator(["jpg", "jpeg", "png", "gif"])])
+    image = models.ImageField(upload_to="rapports/images/", storage=stockage_medias, validators=[FileExtensionValidator(["jpg", "jpeg", "png", "gif"])])
     type_image = models.CharField(max_length=10, choices=TYPE_CHOICES)
     description = models.CharField(max_length=255, blank=True)
 
@@ -301,8 +405,234 @@ class RapportImage(models.Model):
 
 class RapportFichierJoint(models.Model):
     rapport = models.ForeignKey(RapportIntervention, on_delete=models.CASCADE, related_name="fichiers_joints")
-    fichier = models.FileField(upload_to="rapports/fichiers/", validators=[FileExtensionValidator(["pdf", "doc", "docx", "xls", "xlsx", "jpg", "jpeg", "png"])])
+    fichier = models.FileField(upload_to="rapports/fichiers/", storage=stockage_medias, validators=[FileExtensionValidator(["pdf", "doc", "docx", "xls", "xlsx", "jpg", "jpeg", "png"])])
     description = models.CharField(max_length=255, blank=True)
 
     def __str__(self):
-        return f"Fichier joint #{self.pk}" 
\ No newline at end of file
+        return f"Fichier joint #{self.pk}"
+
+class IndicateurIntervention(models.Model):
+    """
+    Agrégats d'interventions maintenus incrémentalement (voir core/indicateurs.py).
+    Une ligne par clé : global, client, intervenant ou semaine de l'intervention.
+    """
+    DIMENSION_CHOICES = [
+        ('global', 'Global'),
+        ('client', 'Client'),
+        ('intervenant', 'Intervenant'),
+        ('semaine', 'Semaine'),
+    ]
+    cle = models.CharField(max_length=50, unique=True, verbose_name="Clé")
+    dimension = models.CharField(max_length=20, choices=DIMENSION_CHOICES, verbose_name="Dimension")
+    client = models.ForeignKey(Client, on_delete=models.CASCADE, null=True, blank=True, related_name='+', verbose_name="Client")
+    intervenant = models.ForeignKey(Utilisateur, on_delete=models.CASCADE, null=True, blank=True, related_name='+', verbose_name="Intervenant")
+    semaine = models.DateField(null=True, blank=True, verbose_name="Semaine du")
+    total = models.IntegerField(default=0, verbose_name="Total")
+    en_attente = models.IntegerField(default=0, verbose_name="En attente")
+    en_cours = models.IntegerField(default=0, verbose_name="En cours")
+    terminee = models.IntegerField(default=0, verbose_name="Terminées")
+    en_retard = models.IntegerField(default=0, verbose_name="En retard")
+    date_maj = models.DateTimeField(auto_now=True, verbose_name="Dernière mise à jour")
+
+    class Meta:
+        verbose_name = "Indicateur d'interventions"
+        verbose_name_plural = "Indicateurs d'interventions"
+        indexes = [
+            models.Index(fields=['dimension', 'total'], name='indicateur_dimension_idx'),
+        ]
+
+    def __str__(self):
+        return self.cle
+
+    @property
+    def taux_retard(self):
+        """Part des interventions en retard non résolu, en pourcentage"""
+        if not self.total:
+            return 0
+        return round(100 * self.en_retard / self.total, 1)
+
+
+class RenduPDF(models.Model):
+    """
+    Demande de rendu d'un rapport PDF, traitée par la commande ``render_pdfs`` (voir core/pdf.py).
+    L'empreinte identifie l'état des données rendues : un fichier terminé est resservi tel quel.
+    """
+    TYPE_CHOICES = [
+        ('mission', 'Mission'),
+        ('intervention', 'Intervention'),
+    ]
+    STATUT_CHOICES = [
+        ('en_attente', 'En attente'),
+        ('en_cours', 'En cours'),
+        ('termine', 'Terminé'),
+        ('echec', 'Échec'),
+    ]
+    type_document = models.CharField(max_length=20, choices=TYPE_CHOICES, verbose_name="Type de document")
+    objet_id = models.PositiveIntegerField(verbose_name="Identifiant de l'objet")
+    empreinte = models.CharField(max_length=64, verbose_name="Empreinte des données")
+    statut = models.CharField(max_length=20, choices=STATUT_CHOICES, default='en_attente', verbose_name="Statut")
+    fichier = models.FileField(upload_to='rendus_pdf/', blank=True, verbose_name="Fichier")
+    erreur = models.TextField(blank=True, verbose_name="Erreur")
+    demande_par = models.ForeignKey(Utilisateur, on_delete=models.SET_NULL, null=True, blank=True, related_name='+', verbose_name="Demandé par")
+    date_creation = models.DateTimeField(auto_now_add=True, verbose_name="Date de création")
+    date_debut = models.DateTimeField(null=True, blank=True, verbose_name="Début du rendu")
+    date_fin = models.DateTimeField(null=True, blank=True, verbose_name="Fin du rendu")
+
+    class Meta:
+        verbose_name = "Rendu PDF"
+        verbose_name_plural = "Rendus PDF"
+        constraints = [
+            models.UniqueConstraint(fields=['type_document', 'objet_id', 'empreinte'], name='rendu_pdf_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['statut', 'date_creation'], name='rendu_pdf_statut_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_type_document_display()} {self.objet_id} ({self.get_statut_display()})"
+
+    @property
+    def nom_fichier(self):
+        """Nom proposé au téléchargement"""
+        return f"rapport_{self.type_document}_{self.objet_id}.pdf"
+
+
+class DocumentRecherche(models.Model):
+    """
+    Texte indexé d'une mission, d'une intervention ou d'un client pour la recherche globale
+    (voir core/recherche.py). Maintenu par les signaux, reconstruit par ``rebuild_search_index``.
+    """
+    TYPE_CHOICES = [
+        ('mission', 'Mission'),
+        ('intervention', 'Intervention'),
+        ('client', 'Client'),
+    ]
+    type_objet = models.CharField(max_length=20, choices=TYPE_CHOICES, verbose_name="Type d'objet")
+    objet_id = models.PositiveBigIntegerField(verbose_name="Identifiant de l'objet")
+    titre = models.CharField(max_length=255, verbose_name="Titre normalisé")
+    contenu = models.TextField(verbose_name="Contenu normalisé")
+    # Droits de lecture recopiés de l'objet, pour filtrer dans la requête de recherche elle-même
+    responsable_id = models.PositiveBigIntegerField(null=True, blank=True, verbose_name="Identifiant du responsable de la mission")
+    intervenant_id = models.PositiveBigIntegerField(null=True, blank=True, verbose_name="Identifiant de l'intervenant")
+    date_maj = models.DateTimeField(auto_now=True, verbose_name="Dernière mise à jour")
+
+    class Meta:
+        verbose_name = "Document de recherche"
+        verbose_name_plural = "Documents de recherche"
+        constraints = [
+            models.UniqueConstraint(fields=['type_objet', 'objet_id'], name='document_recherche_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['type_objet', 'responsable_id'], name='document_recherche_resp_idx'),
+            models.Index(fields=['type_objet', 'intervenant_id'], name='document_recherche_interv_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.type_objet} {self.objet_id}"
+
+
+class TermeRecherche(models.Model):
+    """Index inversé (terme -> document) utilisé quand la base n'offre pas d'index FULLTEXT"""
+    document = models.ForeignKey(DocumentRecherche, on_delete=models.CASCADE, related_name='termes')
+    terme = models.CharField(max_length=64)
+    poids = models.PositiveSmallIntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['terme', 'document'], name='terme_recherche_idx'),
+        ]
+
+
+class EntreeAutocompletion(models.Model):
+    """
+    Index de préfixes des champs à complétion automatique (voir core/autocompletion.py) :
+    une ligne par mot de départ du libellé d'un client, d'une mission ou d'un utilisateur.
+    """
+    TYPE_CHOICES = [
+        ('client', 'Client'),
+        ('mission', 'Mission'),
+        ('utilisateur', 'Utilisateur'),
+    ]
+    type_objet = models.CharField(max_length=20, choices=TYPE_CHOICES, verbose_name="Type d'objet")
+    objet_id = models.PositiveBigIntegerField(verbose_name="Identifiant de l'objet")
+    cle = models.CharField(max_length=100, verbose_name="Clé normalisée")
+    libelle = models.CharField(max_length=255, verbose_name="Libellé affiché")
+    categorie = models.CharField(max_length=20, blank=True, verbose_name="Catégorie")
+
+    class Meta:
+        verbose_name = "Entrée d'autocomplétion"
+        verbose_name_plural = "Entrées d'autocomplétion"
+        indexes = [
+            models.Index(fields=['type_objet', 'cle'], name='autocompletion_cle_idx'),
+            models.Index(fields=['type_objet', 'objet_id'], name='autocompletion_objet_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.type_objet} {self.objet_id} : {self.cle}"
+
+
+class Televersement(models.Model):
+    """
+    Session de téléversement fragmenté et reprenable (voir core/televersement.py) :
+    le fichier est reconstitué bloc par bloc dans TELEVERSEMENT_DOSSIER, puis remis
+    aux formulaires de pièces jointes et de rapports à la place d'un envoi multipart.
+    """
+    STATUT_CHOICES = [
+        ('en_cours', 'En cours'),
+        ('termine', 'Terminé'),
+        ('echec', 'Échec'),
+    ]
+    jeton = models.UUIDField(default=uuid.uuid4, unique=True, editable=False, verbose_name="Jeton")
+    utilisateur = models.ForeignKey(Utilisateur, on_delete=models.CASCADE, related_name='televersements', verbose_name="Utilisateur")
+    nom_fichier = models.CharField(max_length=255, verbose_name="Nom du fichier")
+    type_contenu = models.CharField(max_length=100, blank=True, verbose_name="Type de contenu")
+    taille = models.PositiveBigIntegerField(verbose_name="Taille (octets)")
+    sha256 = models.CharField(max_length=64, blank=True, verbose_name="Empreinte SHA-256")
+    recu = models.PositiveBigIntegerField(default=0, verbose_name="Octets reçus")
+    statut = models.CharField(max_length=20, choices=STATUT_CHOICES, default='en_cours', verbose_name="Statut")
+    erreur = models.TextField(blank=True, verbose_name="Erreur")
+    date_creation = models.DateTimeField(auto_now_add=True, verbose_name="Date de création")
+    date_maj = models.DateTimeField(auto_now=True, verbose_name="Dernière mise à jour")
+
+    class Meta:
+        verbose_name = "Téléversement"
+        verbose_name_plural = "Téléversements"
+        indexes = [
+            models.Index(fields=['date_maj'], name='televersement_date_maj_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.nom_fichier} ({self.recu}/{self.taille})"
+
+
+class FichierStocke(models.Model):
+    """
+    Fichier du stockage dédoublonné (voir core/stockage.py) : un seul exemplaire par
+    contenu, compté par les lignes de FICHIERS_DEDOUBLONNES qui le joignent.
+    """
+    nom = models.CharField(max_length=255, unique=True, verbose_name="Nom")
+    empreinte = models.CharField(max_length=64, db_index=True, verbose_name="Empreinte SHA-256")
+    taille = models.PositiveBigIntegerField(verbose_name="Taille (octets)")
+    references = models.IntegerField(default=0, verbose_name="Références")
+    date_creation = models.DateTimeField(auto_now_add=True, verbose_name="Date de création")
+    # Mise à jour explicite (enregistrement, variation du compteur) : sert de garde à la collecte
+    date_maj = models.DateTimeField(default=timezone.now, verbose_name="Dernière mise à jour")
+
+    class Meta:
+        verbose_name = "Fichier stocké"
+        verbose_name_plural = "Fichiers stockés"
+        indexes = [
+            models.Index(fields=['references', 'date_maj'], name='fichier_stocke_collecte_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.nom} ({self.references})"
+
+
+# Champs fichier enregistrés dans le stockage dédoublonné
+FICHIERS_DEDOUBLONNES = {
+    PieceJointe: 'fichier',
+    Preuve: 'fichier',
+    RapportImage: 'image',
+    RapportFichierJoint: 'fichier',
+}
@@ -0,0 +1,231 @@
+"""
+Création des notifications et maintien du compteur de notifications non lues.
+
+Le compteur ``Utilisateur.notifications_non_lues`` évite un COUNT sur la table
+des notifications à chaque affichage de page : toute création, lecture ou
+suppression de notification doit passer par les fonctions de ce module.
+
+Les notifications adressées à tout un rôle (administrateurs) passent par
+``notify_many`` et ``destinataires`` : la liste des destinataires est mise en
+cache et l'envoi coûte le même nombre de requêtes quel que soit leur nombre.
+
+Les événements répétitifs (retards automatiques) passent par
+``notifier_regroupe`` : une seule notification par utilisateur, type et fenêtre
+de NOTIFICATIONS_FENETRE_MINUTES, qui porte le nombre d'événements et la liste
+des objets concernés.
+
+Toute variation réveille, après validation, les flux temps réel des
+utilisateurs concernés (core/temps_reel.py).
+"""
+from collections import Counter, defaultdict
+from datetime import datetime, timezone as dt_timezone
+
+from itertools import groupby
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import EmailMessage
+from django.db import transaction
+from django.db.models import Count, F, Q, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from . import metriques, temps_reel
+from .models import Notification, Utilisateur
+
+TAILLE_LOT = 500
+# Objets conservés au plus dans une notification regroupée (le nombre, lui, reste exact)
+CIBLES_MAX = 50
+# Notifications détaillées au plus dans un résumé par e-mail
+RESUME_LIGNES_MAX = 20
+
+
+def _ajuster_compteurs(variations):
+    """Applique {utilisateur_id: variation} en une requête par valeur de variation"""
+    par_variation = defaultdict(list)
+    for utilisateur_id, variation in variations.items():
+        if variation:
+            par_variation[variation].append(utilisateur_id)
+    for variation, ids in par_variation.items():
+        Utilisateur.objects.filter(pk__in=ids).update(
+            notifications_non_lues=Greatest(F('notifications_non_lues') + variation, Value(0))
+        )
+    concernes = [utilisateur_id for ids in par_variation.values() for utilisateur_id in ids]
+    if concernes:
+        transaction.on_commit(lambda: temps_reel.publier(concernes))
+
+
+def create_notification(utilisateur, message, type_notification):
+    """Fonction utilitaire pour créer une notification"""
+    with transaction.atomic():
+        notification = Notification.objects.create(
+            utilisateur=utilisateur,
+            message=message,
+            type_notification=type_notification
+        )
+        _ajuster_compteurs({utilisateur.pk: 1})
+    return notification
+
+
+def enregistrer_notifications(notifications, taille_lot=TAILLE_LOT):
+    """Insère des notifications par lots (bulk_create) et met à jour les compteurs"""
+    if not notifications:
+        return []
+    with transaction.atomic():
+        creees = Notification.objects.bulk_create(notifications, batch_size=taille_lot)
+        _ajuster_compteurs(Counter(n.utilisateur_id for n in creees if not n.lue))
+    return creees
+
+
+def _cle_destinataires(role):
+    return f"notifications:destinataires:{role}"
+
+
+def destinataires(role):
+    """Identifiants des utilisateurs du rôle, en cache (invalidé par les signaux de Utilisateur)"""
+    ttl = getattr(settings, 'NOTIFICATIONS_DESTINATAIRES_CACHE_TTL', 300)
+    calcul = lambda: list(Utilisateur.objects.filter(role=role).order_by('pk').values_list('pk', flat=True))
+    if not ttl:
+        return calcul()
+    return cache.get_or_set(_cle_destinataires(role), calcul, ttl)
+
+
+def oublier_destinataires(*roles):
+    """Invalide la liste en cache des destinataires de ces rôles"""
+    cache.delete_many([_cle_destinataires(role) for role in roles if role])
+
+
+def notify_many(utilisateurs, message, type_notification):
+    """
+    Crée la même notification pour chaque utilisateur (instances ou identifiants, doublons ignorés) :
+    un INSERT par lot et un UPDATE des compteurs, quel que soit le nombre de destinataires.
+    """
+    ids = dict.fromkeys(getattr(utilisateur, 'pk', utilisateur) for utilisateur in utilisateurs)
+    metriques.observer('notifications_destinataires', len(ids), type=type_notification)
+    return enregistrer_notifications([
+        Notification(utilisateur_id=utilisateur_id, message=message, type_notification=type_notification)
+        for utilisateur_id in ids
+    ])
+
+
+def debut_fenetre(moment, minutes):
+    """Début de la fenêtre de ``minutes`` minutes qui contient ``moment``"""
+    duree = minutes * 60
+    return datetime.fromtimestamp(moment.timestamp() // duree * duree, tz=dt_timezone.utc)
+
+
+def notifier_regroupe(cibles_par_utilisateur, type_notification, libelle, maintenant=None):
+    """
+    Notifie chaque utilisateur des événements ``cibles_par_utilisateur[utilisateur_id]``
+    (un dict sérialisable par objet concerné). Une notification non lue du même type dans
+    la même fenêtre est complétée au lieu d'en créer une nouvelle ; ``libelle(nombre, cibles)``
+    donne le message. Fenêtre nulle : une notification par événement, comme ``notify_many``.
+    """
+    cibles_par_utilisateur = {
+        utilisateur_id: cibles for utilisateur_id, cibles in cibles_par_utilisateur.items() if cibles
+    }
+    if not cibles_par_utilisateur:
+        return []
+    metriques.observer('notifications_destinataires', len(cibles_par_utilisateur), type=type_notification)
+    minutes = getattr(settings, 'NOTIFICATIONS_FENETRE_MINUTES', 60)
+    if not minutes:
+        return enregistrer_notifications([
+            Notification(
+                utilisateur_id=utilisateur_id, message=libelle(1, [cible])[:255],
+                type_notification=type_notification, cibles=[cible],
+            )
+            for utilisateur_id, cibles in cibles_par_utilisateur.items() for cible in cibles
+        ])
+
+    fenetre = debut_fenetre(maintenant or timezone.now(), minutes)
+    with transaction.atomic():
+        existantes = {
+            notification.utilisateur_id: notification
+            for notification in Notification.objects.select_for_update().filter(
+                utilisateur_id__in=list(cibles_par_utilisateur), type_notification=type_notification,
+                fenetre=fenetre, lue=False,
+            )
+        }
+        completees = []
+        nouvelles = []
+        for utilisateur_id, cibles in cibles_par_utilisateur.items():
+            notification = existantes.get(utilisateur_id)
+            if notification is None:
+                nouvelles.append(Notification(
+                    utilisateur_id=utilisateur_id, type_notification=type_notification, fenetre=fenetre,
+                    nombre=len(cibles), cibles=cibles[:CIBLES_MAX], message=libelle(len(cibles), cibles)[:255],
+                ))
+            else:
+                notification.nombre += len(cibles)
+                notification.cibles = (notification.cibles + cibles)[:CIBLES_MAX]
+                notification.message = libelle(notification.nombre, notification.cibles)[:255]
+                completees.append(notification)
+        # Déjà non lues : le compteur ne bouge pas
+        Notification.objects.bulk_update(completees, ['nombre', 'cibles', 'message'], batch_size=TAILLE_LOT)
+        creees = enregistrer_notifications(nouvelles)
+    if completees:
+        transaction.on_commit(lambda: temps_reel.publier([n.utilisateur_id for n in completees]))
+    return creees + completees
+
+
+def resumes_email(depuis):
+    """
+    Un e-mail par utilisateur (avec adresse) qui a des notifications non lues créées depuis
+    ``depuis`` ; une seule requête, lue par morceaux.
+    """
+    notifications = Notification.objects.filter(lue=False, date_creation__gte=depuis).exclude(
+        utilisateur__email=''
+    ).select_related('utilisateur').only(
+        'message', 'nombre', 'date_creation', 'utilisateur__username', 'utilisateur__email'
+    ).order_by('utilisateur_id', '-date_creation')
+    for _, groupe in groupby(notifications.iterator(chunk_size=TAILLE_LOT), key=lambda n: n.utilisateur_id):
+        groupe = list(groupe)
+        utilisateur = groupe[0].utilisateur
+        evenements = sum(notification.nombre for notification in groupe)
+        lignes = [
+            f"- {timezone.localtime(n.date_creation):%d/%m/%Y %H:%M} : {n.message}" for n in groupe[:RESUME_LIGNES_MAX]
+        ]
+        if len(groupe) > RESUME_LIGNES_MAX:
+            lignes.append(f"... et {len(groupe) - RESUME_LIGNES_MAX} autre(s) notification(s).")
+        yield EmailMessage(
+            f"Résumé de vos notifications ({evenements} événement(s))",
+            f"Bonjour {utilisateur.username},\n\nVous avez {len(groupe)} notification(s) non lue(s) :\n\n"
+            + "\n".join(lignes),
+            settings.DEFAULT_FROM_EMAIL,
+            [utilisateur.email],
+        )
+
+
+def marquer_lues(utilisateur, queryset=None):
+    """Marque comme lues les notifications non lues du queryset et décrémente le compteur"""
+    if queryset is None:
+        queryset = Notification.objects.all()
+    with transaction.atomic():
+        nombre = queryset.filter(utilisateur=utilisateur, lue=False).update(lue=True)
+        _ajuster_compteurs({utilisateur.pk: -nombre})
+    if nombre:
+        utilisateur.notifications_non_lues = max(utilisateur.notifications_non_lues - nombre, 0)
+    return nombre
+
+
+def supprimer_notification(notification):
+    """Supprime une notification en tenant le compteur à jour"""
+    with transaction.atomic():
+        notification.delete()
+        if not notification.lue:
+            _ajuster_compteurs({notification.utilisateur_id: -1})
+
+
+def recalculer_compteurs(utilisateurs=None):
+    """Reconstruit les compteurs à partir de la table des notifications"""
+    if utilisateurs is None:
+        utilisateurs = Utilisateur.objects.all()
+    comptes = utilisateurs.annotate(
+        vrai_compte=Count('notifications', filter=Q(notifications__lue=False))
+    ).values_list('pk', 'notifications_non_lues', 'vrai_compte')
+    corriges = 0
+    for pk, compteur, vrai_compte in comptes.iterator(chunk_size=TAILLE_LOT):
+        if compteur != vrai_compte:
+            Utilisateur.objects.filter(pk=pk).update(notifications_non_lues=vrai_compte)
+            corriges += 1
+    return corriges
@@ -0,0 +1,132 @@
+"""
+Pagination par curseur (keyset) pour les listes.
+
+Contrairement à OFFSET, le coût d'une page ne dépend pas de sa profondeur :
+la page suivante est obtenue par ``WHERE (cle1, cle2) < (v1, v2) ORDER BY cle1, cle2 LIMIT n``,
+ce qui suit directement l'index du tri.
+"""
+import base64
+import json
+
+from django.conf import settings
+from django.db.models import Q
+
+
+def _taille_page(request, taille):
+    maximum = getattr(settings, 'PAGINATION_TAILLE_MAX', 100)
+    if taille is None:
+        taille = getattr(settings, 'PAGINATION_TAILLE_PAGE', 25)
+    try:
+        taille = int(request.GET.get('taille', taille))
+    except (TypeError, ValueError):
+        pass
+    return max(1, min(taille, maximum))
+
+
+def _encoder(valeurs):
+    texte = json.dumps([v.isoformat() if hasattr(v, 'isoformat') else v for v in valeurs])
+    return base64.urlsafe_b64encode(texte.encode()).decode().rstrip('=')
+
+
+def _decoder(curseur, champs):
+    try:
+        texte = base64.urlsafe_b64decode(curseur + '=' * (-len(curseur) % 4)).decode()
+        valeurs = json.loads(texte)
+        if len(valeurs) != len(champs):
+            return None
+        return [champ.to_python(valeur) for champ, valeur in zip(champs, valeurs)]
+    except Exception:
+        return None
+
+
+def _filtre_apres(cles, valeurs):
+    """Construit (k1 > v1) OR (k1 = v1 AND k2 > v2) OR ... selon le sens de chaque clé"""
+    filtre = Q()
+    egalites = {}
+    for cle, valeur in zip(cles, valeurs):
+        nom = cle.lstrip('-')
+        operateur = 'lt' if cle.startswith('-') else 'gt'
+        filtre |= Q(**egalites, **{f'{nom}__{operateur}': valeur})
+        egalites[nom] = valeur
+    return filtre
+
+
+def _inverser(cles):
+    return [cle[1:] if cle.startswith('-') else f'-{cle}' for cle in cles]
+
+
+class PageCurseur:
+    """Page de résultats ; itérable comme une liste dans les templates"""
+
+    def __init__(self, objets, request, prefixe, curseur_precedent, curseur_suivant):
+        self.objets = objets
+        self.a_precedente = curseur_precedent is not None
+        self.a_suivante = curseur_suivant is not None
+        self.url_precedente = self._url(request, prefixe, 'avant', curseur_precedent)
+        self.url_suivante = self._url(request, prefixe, 'apres', curseur_suivant)
+
+    @staticmethod
+    def _url(request, prefixe, sens, curseur):
+        if curseur is None:
+            return None
+        parametres = request.GET.copy()
+        parametres.pop(f'{prefixe}avant', None)
+        parametres.pop(f'{prefixe}apres', None)
+        parametres[f'{prefixe}{sens}'] = curseur
+        return f'?{parametres.urlencode()}'
+
+    def __iter__(self):
+        return iter(self.objets)
+
+    def __len__(self):
+        return len(self.objets)
+
+    def __bool__(self):
+        return bool(self.objets)
+
+
+def paginer_par_curseur(request, queryset, cles, taille=None, prefixe='', champs=None):
+    """
+    Retourne une PageCurseur pour ``queryset`` trié sur ``cles``.
+
+    ``cles`` doit se terminer par une clé unique (ex. ``('-date', '-id')``).
+    Les curseurs sont lus dans ``?apres=`` / ``?avant=`` (préfixés si plusieurs
+    listes sont paginées sur la même page) ; ``?taille=`` ajuste la taille de page.
+    ``champs`` : champs (non liés) décrivant les clés quand ce sont des annotations ;
+    les lignes du queryset sont alors des dictionnaires (``values()``).
+    """
+    taille = _taille_page(request, taille)
+    if champs is None:
+        champs = [queryset.model._meta.get_field(cle.lstrip('-')) for cle in cles]
+        noms = [champ.attname for champ in champs]
+        valeur = getattr
+    else:
+        noms = [cle.lstrip('-') for cle in cles]
+        valeur = dict.__getitem__
+
+    apres = request.GET.get(f'{prefixe}apres')
+    avant = request.GET.get(f'{prefixe}avant')
+    valeurs_apres = _decoder(apres, champs) if apres else None
+    valeurs_avant = _decoder(avant, champs) if avant else None
+
+    if valeurs_avant is not None:
+        ordre = _inverser(cles)
+        objets = list(queryset.filter(_filtre_apres(ordre, valeurs_avant)).order_by(*ordre)[:taille + 1])
+        plus = len(objets) > taille
+        objets = objets[:taille][::-1]
+        a_precedente, a_suivante = plus, True
+    else:
+        qs = queryset
+        if valeurs_apres is not None:
+            qs = qs.filter(_filtre_apres(cles, valeurs_apres))
+        objets = list(qs.order_by(*cles)[:taille + 1])
+        plus = len(objets) > taille
+        objets = objets[:taille]
+        a_precedente, a_suivante = valeurs_apres is not None, plus
+
+    def curseur(objet):
+        return _encoder([valeur(objet, nom) for nom in noms])
+
+    curseur_precedent = curseur(objets[0]) if objets and a_precedente else None
+    curseur_suivant = curseur(objets[-1]) if objets and a_suivante else None
+    return PageCurseur(objets, request, prefixe, curseur_precedent, curseur_suivant)
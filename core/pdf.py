@@ -0,0 +1,406 @@
+"""
+Rendu des rapports PDF (missions et interventions).
+
+La construction ReportLab est confiée à la commande ``render_pdfs`` : la vue
+enregistre une demande (RenduPDF) puis sert le fichier une fois produit.
+Chaque rendu est identifié par une empreinte SHA-256 des données imprimées
+(mission, interventions, rapports, pièces jointes) : tant qu'elles ne changent
+pas, les téléchargements suivants servent le fichier déjà rendu sous
+MEDIA_ROOT. Toute modification change l'empreinte ; les signaux suppriment en
+plus les rendus périmés et leurs fichiers (``invalider_rendus``).
+"""
+import hashlib
+import tempfile
+import time
+from datetime import timedelta
+
+from django.core.files import File
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import inch
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+from . import metriques
+from .models import Intervention, Mission, PieceJointe, RenduPDF
+
+# À incrémenter quand la mise en page change : invalide tous les rendus existants
+VERSION_GABARIT = 1
+
+# Interventions lues par requête lors du rendu d'une mission (pagination sur la clé (date, id))
+TAILLE_LOT = 200
+
+# Au-delà, le PDF en construction passe de la mémoire à un fichier temporaire sur disque
+TAILLE_MEMOIRE_MAX = 2 * 1024 * 1024
+
+# Un rendu resté « en cours » plus longtemps est considéré comme abandonné (worker arrêté)
+DELAI_ABANDON = timedelta(minutes=10)
+
+
+# Mise en page
+
+def _style_titre(styles):
+    return ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=24,
+        spaceAfter=30,
+        alignment=TA_CENTER,
+        textColor=colors.darkblue
+    )
+
+
+def _style_tableau(entete, taille, marge, premiere_ligne=False):
+    zone = (-1, 0) if premiere_ligne else (0, -1)
+    return TableStyle([
+        ('BACKGROUND', (0, 0), zone, entete),
+        ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 0), (-1, -1), taille),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), marge),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+    ])
+
+
+def _nom(utilisateur, defaut):
+    return f"{utilisateur.first_name} {utilisateur.last_name}" if utilisateur else defaut
+
+
+def _travaux(intervention):
+    rapport = getattr(intervention, 'rapport', None)
+    return rapport.travaux_realises if rapport and rapport.travaux_realises else ''
+
+
+_FIN = object()
+
+
+class _DocumentFlux(SimpleDocTemplate):
+    """
+    Document dont les flowables viennent d'un générateur : la liste passée à ``build``
+    n'est qu'un tampon, complété à chaque flowable traité. Les tables déjà placées
+    sont libérées au fil des pages au lieu de rester toutes en mémoire.
+    """
+
+    def __init__(self, destination, source, tampon=20, **kwargs):
+        super().__init__(destination, **kwargs)
+        self._source = iter(source)
+        self._tampon = tampon
+        self._flowables = None
+
+    def _completer(self, flowables):
+        for _ in range(self._tampon - len(flowables)):
+            suivant = next(self._source, _FIN)
+            if suivant is _FIN:
+                return
+            flowables.append(suivant)
+
+    def handle_flowable(self, flowables):
+        # ReportLab appelle aussi cette méthode sur ses listes internes (self._hanging)
+        if flowables is not self._flowables:
+            return super().handle_flowable(flowables)
+        self._completer(flowables)
+        super().handle_flowable(flowables)
+        # Tampon jamais vide tant que la source n'est pas épuisée : build() s'arrêterait
+        self._completer(flowables)
+
+    def construire(self):
+        self._flowables = []
+        self._completer(self._flowables)
+        self.build(self._flowables)
+
+
+def interventions_par_lots(mission, taille_lot=TAILLE_LOT):
+    """
+    Interventions de la mission (plus récentes d'abord), lues par pages de ``taille_lot``
+    sur la clé (date, id) : une requête par page, sans curseur serveur ni cache de queryset.
+    """
+    interventions = mission.interventions.select_related('intervenant', 'rapport').order_by('-date', '-id')
+    lot = list(interventions[:taille_lot])
+    while lot:
+        yield from lot
+        dernier = lot[-1]
+        lot = list(interventions.filter(
+            Q(date__lt=dernier.date) | Q(date=dernier.date, id__lt=dernier.id)
+        )[:taille_lot])
+
+
+def _flowables_mission(mission, styles, taille_lot):
+    yield Paragraph(f"Rapport de Mission: {mission.titre}", _style_titre(styles))
+    yield Spacer(1, 20)
+
+    mission_data = [
+        ['Client:', mission.client.nom],
+        ['Titre:', mission.titre],
+        ['Description:', mission.description],
+        ['Nature:', mission.nature],
+        ['Date de début:', mission.date.strftime('%d/%m/%Y')],
+        ['Lieu:', mission.lieu],
+        ['Fréquence:', mission.frequence or 'Non spécifiée'],
+        ['Assigné à:', _nom(mission.assigne_a, 'Non assigné')],
+        ['Statut:', mission.get_statut_display()],
+        ['Date de création:', mission.date_creation.strftime('%d/%m/%Y à %H:%M')],
+    ]
+    mission_table = Table(mission_data, colWidths=[2*inch, 4*inch])
+    mission_table.setStyle(_style_tableau(colors.lightgrey, 10, 6))
+    yield mission_table
+    yield Spacer(1, 20)
+
+    a_des_interventions = False
+    for intervention in interventions_par_lots(mission, taille_lot):
+        if not a_des_interventions:
+            a_des_interventions = True
+            yield Paragraph("Interventions réalisées:", styles['Heading2'])
+            yield Spacer(1, 10)
+        intervention_data = [
+            ['Titre:', intervention.titre],
+            ['Date:', intervention.date.strftime('%d/%m/%Y')],
+            ['Lieu:', mission.lieu],
+            ['Intervenant:', _nom(intervention.intervenant, 'Non spécifié')],
+            ['Statut:', intervention.get_statut_display()],
+            ['Compte rendu:', _travaux(intervention) or 'Aucun compte rendu'],
+            ['Ressources utilisées:', intervention.ressources_utilisees or 'Aucune ressource spécifiée'],
+        ]
+        intervention_table = Table(intervention_data, colWidths=[2*inch, 4*inch])
+        intervention_table.setStyle(_style_tableau(colors.lightblue, 9, 4))
+        yield intervention_table
+        yield Spacer(1, 10)
+    if not a_des_interventions:
+        yield Paragraph("Aucune intervention réalisée pour cette mission.", styles['Normal'])
+
+
+def construire_pdf_mission(mission, destination, taille_lot=TAILLE_LOT):
+    """
+    Écrit le rapport d'une mission dans ``destination`` (chemin ou fichier binaire).
+    Interventions lues par pages et tables produites à la demande : seules les pages
+    déjà mises en forme (flux compressés du PDF en cours) restent en mémoire.
+    """
+    _DocumentFlux(destination, _flowables_mission(mission, getSampleStyleSheet(), taille_lot), pagesize=A4).construire()
+
+
+def construire_pdf_intervention(intervention, destination):
+    """Écrit le rapport d'une intervention dans ``destination`` (chemin ou fichier binaire)"""
+    pieces_jointes = intervention.pieces_jointes.all()
+
+    doc = SimpleDocTemplate(destination, pagesize=A4)
+    styles = getSampleStyleSheet()
+    story = []
+
+    story.append(Paragraph(f"Rapport d'Intervention: {intervention.titre}", _style_titre(styles)))
+    story.append(Spacer(1, 20))
+
+    intervention_data = [
+        ['Mission:', intervention.mission.titre],
+        ['Titre:', intervention.titre],
+        ['Date:', intervention.date.strftime('%d/%m/%Y')],
+        ['Lieu:', intervention.mission.lieu],
+        ['Intervenant:', _nom(intervention.intervenant, 'Non spécifié')],
+        ['Statut:', intervention.get_statut_display()],
+        ['Date de création:', intervention.date_creation.strftime('%d/%m/%Y à %H:%M')],
+        ['Date de clôture:', intervention.date_cloture.strftime('%d/%m/%Y à %H:%M') if intervention.date_cloture else 'Non clôturée'],
+    ]
+    intervention_table = Table(intervention_data, colWidths=[2*inch, 4*inch])
+    intervention_table.setStyle(_style_tableau(colors.lightgrey, 10, 6))
+    story.append(intervention_table)
+    story.append(Spacer(1, 20))
+
+    story.append(Paragraph("Compte rendu:", styles['Heading2']))
+    story.append(Paragraph(_travaux(intervention) or 'Aucun compte rendu disponible.', styles['Normal']))
+    story.append(Spacer(1, 20))
+
+    story.append(Paragraph("Ressources utilisées:", styles['Heading2']))
+    story.append(Paragraph(intervention.ressources_utilisees or 'Aucune ressource spécifiée.', styles['Normal']))
+    story.append(Spacer(1, 20))
+
+    if pieces_jointes:
+        story.append(Paragraph("Pièces jointes:", styles['Heading2']))
+        story.append(Spacer(1, 10))
+
+        pieces_data = [['Titre', 'Type', 'Description', 'Date d\'ajout']]
+        for piece in pieces_jointes:
+            pieces_data.append([
+                piece.titre,
+                piece.get_type_fichier_display(),
+                piece.description or 'Aucune description',
+                piece.date_ajout.strftime('%d/%m/%Y')
+            ])
+        pieces_table = Table(pieces_data, colWidths=[1.5*inch, 1*inch, 2*inch, 1*inch])
+        pieces_table.setStyle(_style_tableau(colors.lightblue, 8, 4, premiere_ligne=True))
+        story.append(pieces_table)
+    else:
+        story.append(Paragraph("Aucune pièce jointe disponible.", styles['Normal']))
+
+    doc.build(story)
+
+
+# Empreintes
+
+CHAMPS_MISSION = (
+    'titre', 'description', 'nature', 'date', 'lieu', 'frequence', 'statut', 'date_creation',
+    'client__nom', 'assigne_a__first_name', 'assigne_a__last_name',
+)
+CHAMPS_INTERVENTION = (
+    'id', 'titre', 'date', 'statut', 'ressources_utilisees', 'date_creation', 'date_cloture',
+    'intervenant__first_name', 'intervenant__last_name', 'rapport__travaux_realises',
+)
+
+
+def _empreinte(*blocs):
+    sha = hashlib.sha256(f"gabarit:{VERSION_GABARIT}".encode())
+    for bloc in blocs:
+        for ligne in bloc:
+            sha.update(repr(ligne).encode())
+    return sha.hexdigest()
+
+
+def empreinte_mission(mission_id):
+    """Empreinte des données imprimées dans le rapport d'une mission"""
+    return _empreinte(
+        Mission.objects.filter(pk=mission_id).values_list(*CHAMPS_MISSION),
+        Intervention.objects.filter(mission_id=mission_id).order_by('id').values_list(*CHAMPS_INTERVENTION),
+    )
+
+
+def empreinte_intervention(intervention_id):
+    """Empreinte des données imprimées dans le rapport d'une intervention"""
+    return _empreinte(
+        Intervention.objects.filter(pk=intervention_id).values_list(
+            *CHAMPS_INTERVENTION, 'mission__titre', 'mission__lieu'
+        ),
+        PieceJointe.objects.filter(intervention_id=intervention_id).order_by('id').values_list(
+            'titre', 'type_fichier', 'description', 'date_ajout'
+        ),
+    )
+
+
+EMPREINTES = {
+    'mission': empreinte_mission,
+    'intervention': empreinte_intervention,
+}
+
+
+# File de rendus
+
+def demander_rendu(type_document, objet_id, utilisateur=None, relancer=False):
+    """
+    Rendu correspondant à l'état actuel de l'objet, créé en attente s'il n'existe pas.
+    Les rendus d'états antérieurs du même objet sont supprimés ; ``relancer`` remet
+    en file un rendu en échec ou dont le fichier a disparu.
+    """
+    empreinte = EMPREINTES[type_document](objet_id)
+    rendu, cree = RenduPDF.objects.get_or_create(
+        type_document=type_document, objet_id=objet_id, empreinte=empreinte,
+        defaults={'demande_par': utilisateur}
+    )
+    if cree:
+        invalider_rendus(type_document, [objet_id], sauf=rendu.pk)
+    elif rendu.statut == 'termine' and not rendu.fichier.storage.exists(rendu.fichier.name):
+        relancer = True
+    if relancer and rendu.statut in ('termine', 'echec'):
+        RenduPDF.objects.filter(pk=rendu.pk, statut=rendu.statut).update(statut='en_attente', fichier='', erreur='')
+        rendu.refresh_from_db()
+    return rendu
+
+
+def invalider_rendus(type_document, objet_ids, sauf=None):
+    """Supprime les rendus (et leurs fichiers) des objets donnés"""
+    rendus = RenduPDF.objects.filter(type_document=type_document, objet_id__in=list(objet_ids))
+    if sauf is not None:
+        rendus = rendus.exclude(pk=sauf)
+    rendus = list(rendus)
+    if not rendus:
+        return
+    RenduPDF.objects.filter(pk__in=[rendu.pk for rendu in rendus]).delete()
+    fichiers = [rendu.fichier for rendu in rendus if rendu.fichier]
+
+    def supprimer_fichiers():
+        for fichier in fichiers:
+            fichier.storage.delete(fichier.name)
+    transaction.on_commit(supprimer_fichiers)
+
+
+def reserver_rendu(pk=None):
+    """
+    Réserve le prochain rendu en attente (ou abandonné) pour ce worker, ou le rendu ``pk``.
+    La réservation est un UPDATE conditionnel : deux workers ne peuvent pas prendre le même rendu.
+    """
+    maintenant = timezone.now()
+    disponible = Q(statut='en_attente') | Q(statut='en_cours', date_debut__lt=maintenant - DELAI_ABANDON)
+    candidats = RenduPDF.objects.filter(disponible)
+    if pk is not None:
+        candidats = candidats.filter(pk=pk)
+    for candidat in candidats.order_by('date_creation').values_list('pk', flat=True)[:10]:
+        if RenduPDF.objects.filter(disponible, pk=candidat).update(statut='en_cours', date_debut=maintenant):
+            return RenduPDF.objects.get(pk=candidat)
+    return None
+
+
+def rendre_si_en_attente(rendu):
+    """
+    Exécute immédiatement (sans worker) un rendu en attente.
+    Retourne le rendu relu en base, ou None s'il a été invalidé entre-temps.
+    """
+    if rendu.statut == 'en_attente':
+        reserve = reserver_rendu(rendu.pk)
+        if reserve is not None:
+            executer_rendu(reserve)
+    return RenduPDF.objects.filter(pk=rendu.pk).first()
+
+
+def rendre_fichier_temporaire(type_document, objet_id):
+    """
+    Construit un PDF dans un fichier temporaire (en mémoire jusqu'à TAILLE_MEMOIRE_MAX,
+    sur disque au-delà) rembobiné, à refermer par l'appelant.
+    """
+    tampon = tempfile.SpooledTemporaryFile(max_size=TAILLE_MEMOIRE_MAX)
+    try:
+        if type_document == 'mission':
+            mission = Mission.objects.select_related('client', 'assigne_a').get(pk=objet_id)
+            construire_pdf_mission(mission, tampon)
+        else:
+            intervention = Intervention.objects.select_related(
+                'mission', 'intervenant', 'rapport'
+            ).get(pk=objet_id)
+            construire_pdf_intervention(intervention, tampon)
+    except BaseException:
+        tampon.close()
+        raise
+    tampon.seek(0)
+    return tampon
+
+
+def executer_rendu(rendu):
+    """Construit le PDF d'un rendu réservé et l'enregistre sous MEDIA_ROOT"""
+    debut = time.perf_counter()
+    termine = _executer_rendu(rendu)
+    metriques.observer(
+        'pdf_rendu_duree_secondes', time.perf_counter() - debut,
+        type_document=rendu.type_document, resultat='termine' if termine else 'echec'
+    )
+    return termine
+
+
+def _executer_rendu(rendu):
+    try:
+        with rendre_fichier_temporaire(rendu.type_document, rendu.objet_id) as tampon:
+            nom = rendu.fichier.storage.save(
+                rendu.fichier.field.generate_filename(rendu, f"{rendu.nom_fichier[:-4]}_{rendu.empreinte[:12]}.pdf"),
+                File(tampon)
+            )
+    except Exception as exc:
+        RenduPDF.objects.filter(pk=rendu.pk).update(
+            statut='echec', erreur=f"{type(exc).__name__}: {exc}", date_fin=timezone.now()
+        )
+        return False
+
+    # Le rendu a pu être invalidé pendant la construction : le fichier est alors orphelin
+    if not RenduPDF.objects.filter(pk=rendu.pk, statut='en_cours', date_debut=rendu.date_debut).update(
+        statut='termine', fichier=nom, date_fin=timezone.now()
+    ):
+        rendu.fichier.storage.delete(nom)
+        return False
+    return True
@@ -87,7 +87,24 @@ def can_edit_intervention(user, intervention):
 def can_view_intervention(user, intervention):
     """
     Vérifie si l'utilisateur peut voir une intervention
+    (même règle que Intervention.objects.visible_to)
     """
     if is_admin(user):
         return True
-    return user == intervention.intervenant 
\ No newline at end of file
+    return user == intervention.intervenant
+
+def filter_viewable(user, objets):
+    """
+    Ne garde de ``objets`` que ceux que l'utilisateur peut consulter, dans l'ordre reçu.
+    Une requête par modèle (règles de ``visible_to``) au lieu d'une vérification par objet.
+    """
+    objets = list(objets)
+    par_modele = {}
+    for objet in objets:
+        par_modele.setdefault(type(objet), set()).add(objet.pk)
+    visibles = {
+        (modele, pk)
+        for modele, pks in par_modele.items()
+        for pk in modele.objects.filter(pk__in=pks).visible_to(user).values_list('pk', flat=True)
+    }
+    return [objet for objet in objets if (type(objet), objet.pk) in visibles]
@@ -0,0 +1,160 @@
+"""
+Profilage des requêtes SQL émises par chaque requête HTTP.
+
+ProfilageSQLMiddleware s'active pour toutes les requêtes (PROFILAGE_SQL) ou à la
+demande, avec l'en-tête ``X-Profilage-SQL: 1`` envoyé par un administrateur. Il
+enregistre chaque requête SQL (``connection.execute_wrapper``, DEBUG inutile) :
+durée, et endroit qui l'a déclenchée, la ligne de template en cours de rendu en
+priorité, sinon la ligne de code de l'application.
+
+Le bilan part dans des en-têtes de réponse (X-SQL-Requetes, X-SQL-Duree-Ms,
+X-SQL-Doublons, Server-Timing lisible dans les outils du navigateur), dans le
+journal ``core.profilage`` (une ligne JSON par requête) et, si
+PROFILAGE_SQL_PANNEAU, dans un panneau ajouté en bas des pages HTML.
+
+Une « requête répétée » est un même SQL (paramètres mis à part) exécuté plusieurs
+fois : le motif N+1 d'un ``.count`` ou d'un ``.all`` dans une boucle de template.
+"""
+import json
+import logging
+import os
+import sys
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.template.loader import render_to_string
+
+from .permissions import is_admin
+
+logger = logging.getLogger(__name__)
+
+ENTETE = 'HTTP_X_PROFILAGE_SQL'
+RACINE = str(settings.BASE_DIR)
+# Enregistreurs SQL (celui-ci, celui de core/metriques.py) et bibliothèques : jamais l'origine d'une requête
+_IGNORES = tuple(
+    os.path.join(os.path.dirname(__file__), module) for module in ('profilage.py', 'metriques.py')
+) + (os.sep + 'site-packages' + os.sep,)
+
+
+def origine():
+    """« template:ligne » du nœud de template en cours de rendu, sinon « fichier:ligne » du code appelant"""
+    code = None
+    cadre = sys._getframe(2)
+    while cadre is not None:
+        if cadre.f_code.co_name == 'render_annotated':
+            noeud = cadre.f_locals.get('self')
+            origine_template = getattr(noeud, 'origin', None)
+            jeton = getattr(noeud, 'token', None)
+            if origine_template is not None and jeton is not None:
+                return f"{origine_template.template_name}:{jeton.lineno}"
+        fichier = cadre.f_code.co_filename
+        if code is None and fichier.startswith(RACINE) and not any(ignore in fichier for ignore in _IGNORES):
+            code = f"{os.path.relpath(fichier, RACINE)}:{cadre.f_lineno}"
+        cadre = cadre.f_back
+    return code or '?'
+
+
+class Enregistreur:
+    """execute_wrapper : mesure chaque requête SQL d'une connexion"""
+
+    def __init__(self, alias):
+        self.alias = alias
+        self.requetes = []
+
+    def __call__(self, execute, sql, params, many, context):
+        debut = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.requetes.append({
+                'sql': sql,
+                'params': repr(params)[:200],
+                'duree_ms': (time.perf_counter() - debut) * 1000,
+                'origine': origine(),
+                'base': self.alias,
+            })
+
+
+def bilan(requetes, top=None):
+    """Nombre, durée totale, requêtes répétées (avec leurs origines) et requêtes les plus lentes"""
+    top = top if top is not None else getattr(settings, 'PROFILAGE_SQL_TOP', 5)
+    par_sql = defaultdict(list)
+    for requete in requetes:
+        par_sql[requete['sql']].append(requete)
+    repetees = sorted(
+        (
+            {
+                'sql': sql,
+                'nombre': len(executions),
+                'identiques': len(executions) - len({execution['params'] for execution in executions}),
+                'duree_ms': round(sum(execution['duree_ms'] for execution in executions), 2),
+                'origines': sorted({execution['origine'] for execution in executions}),
+            }
+            for sql, executions in par_sql.items() if len(executions) > 1
+        ),
+        key=lambda groupe: groupe['nombre'], reverse=True,
+    )
+    lentes = sorted(requetes, key=lambda requete: requete['duree_ms'], reverse=True)[:top]
+    return {
+        'requetes': len(requetes),
+        'duree_ms': round(sum(requete['duree_ms'] for requete in requetes), 2),
+        'repetees': repetees[:top],
+        'executions_repetees': sum(groupe['nombre'] - 1 for groupe in repetees),
+        'lentes': [{**requete, 'duree_ms': round(requete['duree_ms'], 2)} for requete in lentes],
+    }
+
+
+class ProfilageSQLMiddleware:
+    """Compte et chronomètre les requêtes SQL de chaque requête HTTP profilée"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def actif(self, request):
+        if getattr(settings, 'PROFILAGE_SQL', False):
+            return True
+        return request.META.get(ENTETE) == '1' and (settings.DEBUG or is_admin(request.user))
+
+    def __call__(self, request):
+        if not self.actif(request):
+            return self.get_response(request)
+
+        enregistreurs = [Enregistreur(alias) for alias in connections]
+        with ExitStack() as pile:
+            for enregistreur in enregistreurs:
+                pile.enter_context(connections[enregistreur.alias].execute_wrapper(enregistreur))
+            response = self.get_response(request)
+            # Réponses paresseuses (TemplateResponse) : le rendu, et ses requêtes, ont lieu ici
+            if hasattr(response, 'render') and callable(response.render):
+                response.render()
+
+        resultat = bilan([requete for e in enregistreurs for requete in e.requetes])
+        response['X-SQL-Requetes'] = str(resultat['requetes'])
+        response['X-SQL-Duree-Ms'] = f"{resultat['duree_ms']:.1f}"
+        response['X-SQL-Doublons'] = str(resultat['executions_repetees'])
+        response['Server-Timing'] = f'db;dur={resultat["duree_ms"]:.1f};desc="{resultat["requetes"]} SQL"'
+        logger.info(json.dumps({
+            'chemin': request.path,
+            'methode': request.method,
+            'vue': getattr(request.resolver_match, 'view_name', None),
+            'statut': response.status_code,
+            **resultat,
+        }, ensure_ascii=False))
+
+        if (getattr(settings, 'PROFILAGE_SQL_PANNEAU', False) and not response.streaming
+                and response.get('Content-Type', '').startswith('text/html')):
+            self.ajouter_panneau(response, resultat)
+        return response
+
+    def ajouter_panneau(self, response, resultat):
+        contenu = response.content.decode(response.charset)
+        position = contenu.lower().rfind('</body>')
+        if position == -1:
+            return
+        panneau = render_to_string('core/profilage_panneau.html', {'bilan': resultat})
+        response.content = contenu[:position] + panneau + contenu[position:]
+        if response.has_header('Content-Length'):
+            response['Content-Length'] = str(len(response.content))
@@ -0,0 +1,233 @@
+"""
+Index de la recherche globale.
+
+Chaque mission, intervention et client a un DocumentRecherche : titre et
+contenu normalisés (minuscules, sans accents) regroupant les champs
+recherchables, y compris ceux des objets liés (client d'une mission, mission
+d'une intervention...), ainsi que les droits de lecture de l'objet (responsable
+de la mission, intervenant) : le périmètre d'un employé ou d'un freelance est un
+filtre de la requête de recherche, pas un tri des résultats après coup. Les
+signaux le tiennent à jour (``indexer`` / ``retirer``), la commande
+``rebuild_search_index`` le reconstruit.
+
+Sous MySQL la recherche passe par un index FULLTEXT (migration 0018) en mode
+booléen. Les autres bases utilisent l'index inversé TermeRecherche : une
+ligne par (terme, document), pondérée par le nombre d'occurrences, le titre
+comptant davantage. Dans les deux cas tous les mots de la requête doivent être
+présents, le dernier pouvant n'être qu'un préfixe (saisie en cours).
+"""
+import re
+import unicodedata
+from collections import Counter
+from functools import reduce
+from operator import or_
+
+from django.db import connection, transaction
+from django.db.models import BooleanField, Case, F, FloatField, IntegerField, Max, PositiveBigIntegerField, Q, Sum, When
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+
+from .models import Client, DocumentRecherche, Intervention, Mission, TermeRecherche
+from .pagination import PageCurseur, paginer_par_curseur
+from .permissions import is_admin
+
+# Objets (ré)indexés par requête
+TAILLE_LOT = 500
+
+LONGUEUR_MIN = 2
+LONGUEUR_MAX = 64
+POIDS_TITRE = 3
+POIDS_MAX = 100
+
+
+def normaliser(texte):
+    """Minuscules sans accents"""
+    texte = unicodedata.normalize('NFKD', texte or '')
+    return ''.join(c for c in texte if not unicodedata.combining(c)).lower()
+
+
+def decouper(texte):
+    """Termes indexables d'un texte"""
+    return [mot[:LONGUEUR_MAX] for mot in re.findall(r'\w+', normaliser(texte)) if len(mot) >= LONGUEUR_MIN]
+
+
+def fulltext_disponible():
+    return connection.vendor == 'mysql'
+
+
+# Contenu indexé : (objet_id, titre, [textes], {droits}) par type d'objet
+
+def _sources_missions(ids):
+    for ligne in Mission.objects.filter(pk__in=ids).values_list(
+        'id', 'assigne_a_id', 'titre', 'description', 'nature', 'lieu', 'client__nom'
+    ):
+        yield ligne[0], ligne[2], ligne[2:], {'responsable_id': ligne[1]}
+
+
+def _sources_interventions(ids):
+    for ligne in Intervention.objects.filter(pk__in=ids).values_list(
+        'id', 'mission__assigne_a_id', 'intervenant_id',
+        'titre', 'ressources_utilisees', 'rapport__travaux_realises', 'mission__titre', 'mission__client__nom'
+    ):
+        yield ligne[0], ligne[3], ligne[3:], {'responsable_id': ligne[1], 'intervenant_id': ligne[2]}
+
+
+def _sources_clients(ids):
+    # Les clients sont visibles de tous
+    for ligne in Client.objects.filter(pk__in=ids).values_list('id', 'nom', 'contact', 'email'):
+        yield ligne[0], ligne[1], ligne[1:], {}
+
+
+SOURCES = {
+    'mission': _sources_missions,
+    'intervention': _sources_interventions,
+    'client': _sources_clients,
+}
+MODELES = {
+    'mission': Mission,
+    'intervention': Intervention,
+    'client': Client,
+}
+
+
+# Mise à jour de l'index
+
+def indexer(type_objet, ids):
+    """(Ré)indexe les objets donnés ; ceux qui n'existent plus sont retirés de l'index"""
+    ids = list(ids)
+    for debut in range(0, len(ids), TAILLE_LOT):
+        _indexer_lot(type_objet, ids[debut:debut + TAILLE_LOT])
+
+
+def _indexer_lot(type_objet, ids):
+    maintenant = timezone.now()
+    documents = {
+        objet_id: DocumentRecherche(
+            type_objet=type_objet, objet_id=objet_id, date_maj=maintenant,
+            titre=normaliser(titre)[:255],
+            contenu=' '.join(normaliser(texte) for texte in textes if texte),
+            **droits,
+        )
+        for objet_id, titre, textes, droits in SOURCES[type_objet](ids)
+    }
+    with transaction.atomic():
+        existants = dict(
+            DocumentRecherche.objects.filter(type_objet=type_objet, objet_id__in=ids).values_list('objet_id', 'pk')
+        )
+        supprimes = [pk for objet_id, pk in existants.items() if objet_id not in documents]
+        if supprimes:
+            DocumentRecherche.objects.filter(pk__in=supprimes).delete()
+        a_creer = []
+        for objet_id, document in documents.items():
+            if objet_id in existants:
+                document.pk = existants[objet_id]
+            else:
+                a_creer.append(document)
+        DocumentRecherche.objects.bulk_update(
+            [document for document in documents.values() if document.pk],
+            ['titre', 'contenu', 'responsable_id', 'intervenant_id', 'date_maj']
+        )
+        DocumentRecherche.objects.bulk_create(a_creer)
+
+        if fulltext_disponible() or not documents:
+            return
+        if a_creer and a_creer[0].pk is None:
+            pks = dict(DocumentRecherche.objects.filter(
+                type_objet=type_objet, objet_id__in=[document.objet_id for document in a_creer]
+            ).values_list('objet_id', 'pk'))
+            for document in a_creer:
+                document.pk = pks[document.objet_id]
+        TermeRecherche.objects.filter(document__in=[document.pk for document in documents.values()]).delete()
+        TermeRecherche.objects.bulk_create([
+            TermeRecherche(document_id=document.pk, terme=terme, poids=poids)
+            for document in documents.values()
+            for terme, poids in _poids_termes(document).items()
+        ], batch_size=2000)
+
+
+def _poids_termes(document):
+    poids = Counter(decouper(document.contenu))
+    for terme in set(decouper(document.titre)):
+        poids[terme] += POIDS_TITRE
+    return {terme: min(valeur, POIDS_MAX) for terme, valeur in poids.items()}
+
+
+def retirer(type_objet, ids):
+    DocumentRecherche.objects.filter(type_objet=type_objet, objet_id__in=list(ids)).delete()
+
+
+# Interrogation
+
+def _perimetre(utilisateur, chemin=''):
+    """
+    Documents lisibles par ``utilisateur`` (tous si None), selon les règles de ``visible_to``
+    appliquées aux droits recopiés dans l'index : un administrateur voit tout, les autres
+    les clients, les missions qu'ils dirigent et les interventions qui leur sont confiées.
+    ``chemin`` préfixe les champs (``'document__'`` depuis un terme).
+    """
+    if utilisateur is None or is_admin(utilisateur):
+        return Q()
+    return (
+        Q(**{f'{chemin}type_objet': 'client'})
+        | Q(**{f'{chemin}type_objet': 'mission', f'{chemin}responsable_id': utilisateur.pk})
+        | Q(**{f'{chemin}type_objet': 'intervention', f'{chemin}intervenant_id': utilisateur.pk})
+    )
+
+
+def _resultats(requete, type_objet, utilisateur=None):
+    """
+    Lignes {'objet_id', 'score'} des objets lisibles contenant tous les mots de la requête,
+    non triées ; None si la requête ne contient aucun mot indexable.
+    """
+    mots = decouper(requete)
+    if not mots:
+        return None
+    if fulltext_disponible():
+        booleen = ' '.join(f'+{mot}' for mot in mots[:-1]) + f' +{mots[-1]}*'
+        correspondance = "MATCH(titre, contenu) AGAINST (%s IN BOOLEAN MODE)"
+        return (
+            DocumentRecherche.objects.filter(_perimetre(utilisateur), type_objet=type_objet)
+            .filter(RawSQL(correspondance, (booleen,), output_field=BooleanField()))
+            .annotate(score=RawSQL(correspondance, (booleen,), output_field=FloatField()))
+            .values('objet_id', 'score')
+        )
+
+    # Préfixe exprimé en intervalle : utilisable par l'index sur toutes les bases (LIKE ne l'est pas sous SQLite)
+    conditions = [Q(terme=mot) for mot in mots[:-1]] + [Q(terme__gte=mots[-1], terme__lt=mots[-1] + '\uffff')]
+    presence = {
+        f'mot_{i}': Max(Case(When(condition, then=1), default=0, output_field=IntegerField()))
+        for i, condition in enumerate(conditions)
+    }
+    return (
+        TermeRecherche.objects.filter(reduce(or_, conditions), _perimetre(utilisateur, 'document__'),
+                                      document__type_objet=type_objet)
+        .values(objet_id=F('document__objet_id'))
+        .annotate(score=Sum('poids'), **presence)
+        .filter(**{nom: 1 for nom in presence})
+        .values('objet_id', 'score')
+    )
+
+
+def rechercher(requete, type_objet, utilisateur=None, limite=10):
+    """Identifiants des objets lisibles contenant tous les mots de la requête, les plus pertinents d'abord"""
+    lignes = _resultats(requete, type_objet, utilisateur)
+    if lignes is None:
+        return []
+    return [ligne['objet_id'] for ligne in lignes.order_by('-score', '-objet_id')[:limite]]
+
+
+def paginer_recherche(request, queryset, type_objet, requete, taille=10, prefixe=''):
+    """
+    PageCurseur des objets de ``queryset`` correspondant à la requête, par pertinence,
+    dans le périmètre de l'utilisateur connecté. Le curseur porte sur (score, objet_id).
+    """
+    lignes = _resultats(requete, type_objet, request.user)
+    if lignes is None:
+        return PageCurseur([], request, prefixe, None, None)
+    page = paginer_par_curseur(
+        request, lignes, ('-score', '-objet_id'), taille, prefixe,
+        champs=[FloatField(), PositiveBigIntegerField()]
+    )
+    objets = queryset.in_bulk([ligne['objet_id'] for ligne in page.objets])
+    page.objets = [objets[ligne['objet_id']] for ligne in page.objets if ligne['objet_id'] in objets]
+    return page
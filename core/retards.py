@@ -0,0 +1,135 @@
+"""
+Moteur de détection des interventions en retard.
+
+Partagé par la commande ``check_retards``, le script ``check_retards_daily.py``,
+la vue ``check_retards_automatiques`` et ``Intervention.verifier_retard()``.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from . import indicateurs, metriques
+from .models import Intervention, Mission, RetardIntervention
+from .notifications import destinataires, notifier_regroupe
+
+# Nombre de lignes insérées par requête lors des bulk_create
+TAILLE_LOT = 500
+
+STATUTS_NON_TERMINES = ['en_attente', 'en_cours']
+
+
+def interventions_a_signaler(aujourd_hui=None, queryset=None):
+    """Interventions non terminées, échéance dépassée, pas encore marquées en retard"""
+    if aujourd_hui is None:
+        aujourd_hui = timezone.now().date()
+    if queryset is None:
+        queryset = Intervention.objects.all()
+    return queryset.filter(
+        statut__in=STATUTS_NON_TERMINES,
+        date_echeance__lt=aujourd_hui,
+        en_retard=False
+    )
+
+
+def _libelle_intervenant(nombre, cibles):
+    if nombre == 1:
+        return f"Votre intervention '{cibles[0]['titre']}' est en retard depuis le {cibles[0]['echeance']}"
+    return f"{nombre} de vos interventions sont en retard"
+
+
+def _libelle_admin(nombre, cibles):
+    if nombre == 1:
+        return f"Intervention en retard automatique : {cibles[0]['titre']} (Intervenant: {cibles[0]['intervenant']})"
+    return f"{nombre} interventions en retard automatique"
+
+
+def notifier_retards(signalees, maintenant=None):
+    """
+    Notifications des retards détectés : une par intervenant et une par administrateur,
+    regroupées par fenêtre (core.notifications.notifier_regroupe) plutôt qu'une par intervention.
+    """
+    par_intervenant = {}
+    toutes = []
+    for intervention in signalees:
+        cible = {
+            'id': intervention.pk,
+            'titre': intervention.titre,
+            'echeance': intervention.date_echeance.strftime('%d/%m/%Y'),
+            'intervenant': str(intervention.intervenant) if intervention.intervenant else 'non assigné',
+        }
+        toutes.append(cible)
+        if intervention.intervenant_id:
+            par_intervenant.setdefault(intervention.intervenant_id, []).append(cible)
+    notifier_regroupe(par_intervenant, 'retard_automatique', _libelle_intervenant, maintenant)
+    # Liste des administrateurs en cache, partagée avec les autres envois par rôle
+    notifier_regroupe(
+        {admin_id: toutes for admin_id in destinataires('administrateur')},
+        'retard_automatique_admin', _libelle_admin, maintenant
+    )
+
+
+def detecter_retards(queryset=None, aujourd_hui=None, taille_lot=TAILLE_LOT):
+    """
+    Marque en retard toutes les interventions concernées et crée les retards
+    et notifications associés. Retourne la liste des interventions signalées.
+
+    Les interventions sont marquées par un unique UPDATE ... WHERE en_retard = False :
+    seule l'exécution dont l'UPDATE a effectivement modifié la ligne la "réclame"
+    (date_retard sert de jeton), ce qui rend deux exécutions concurrentes sans doublon.
+    """
+    with metriques.chronometrer('retards_verification_duree_secondes'):
+        signalees = _detecter_retards(queryset, aujourd_hui, taille_lot)
+    metriques.incrementer('retards_signales_total', len(signalees))
+    return signalees
+
+
+def _detecter_retards(queryset, aujourd_hui, taille_lot):
+    maintenant = timezone.now()
+
+    with transaction.atomic():
+        nombre = interventions_a_signaler(aujourd_hui, queryset).update(
+            en_retard=True,
+            date_retard=maintenant
+        )
+        if not nombre:
+            return []
+
+        signalees = list(
+            Intervention.objects.filter(en_retard=True, date_retard=maintenant)
+            .select_related('intervenant')
+            .order_by('id')
+        )
+        RetardIntervention.objects.bulk_create([
+            RetardIntervention(
+                intervention=intervention,
+                type_retard='fin',
+                date_debut_retard=maintenant,
+                motif=f"Intervention non effectuée à la date d'échéance ({intervention.date_echeance.strftime('%d/%m/%Y')})",
+                impact="Impact sur le planning et la satisfaction client",
+                actions_correctives="Contacter l'intervenant pour reprogrammer",
+                responsable=intervention.intervenant
+            )
+            for intervention in signalees
+        ], batch_size=taille_lot)
+        notifier_retards(signalees, maintenant)
+
+        # L'UPDATE contourne les signaux : mise à jour explicite des indicateurs agrégés
+        clients = dict(Mission.objects.filter(
+            pk__in={intervention.mission_id for intervention in signalees}
+        ).values_list('pk', 'client_id'))
+        variations = {}
+        for intervention in signalees:
+            if intervention.retard_resolu:
+                continue
+            etat = {
+                'client_id': clients.get(intervention.mission_id),
+                'intervenant_id': intervention.intervenant_id,
+                'date': intervention.date,
+                'statut': intervention.statut,
+                'en_retard': True,
+                'retard_resolu': False,
+            }
+            indicateurs.ajouter_etat(variations, etat, 1)
+            indicateurs.ajouter_etat(variations, {**etat, 'en_retard': False}, -1)
+        indicateurs.appliquer_variations(variations)
+
+    return signalees
@@ -0,0 +1,63 @@
+"""
+Rétention des notifications.
+
+Les notifications lues depuis plus de NOTIFICATIONS_RETENTION_JOURS quittent la
+table des notifications pour NotificationArchivee (sans colonne ``lue`` ni index
+de lecture) : la table consultée à chaque page reste petite. Les archives sont
+supprimées passé NOTIFICATIONS_ARCHIVE_JOURS. Les notifications non lues ne sont
+jamais archivées, le compteur dénormalisé n'est donc pas touché.
+
+Le travail est découpé en lots de ``taille_lot`` lignes, chacun dans sa propre
+transaction courte : aucun verrou n'est tenu sur toute la table pendant
+l'archivage. Lancé par la commande ``archiver_notifications``.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Notification, NotificationArchivee
+
+TAILLE_LOT = 1000
+
+CHAMPS_ARCHIVES = ('pk', 'utilisateur_id', 'message', 'type_notification', 'nombre', 'cibles', 'date_creation')
+
+
+def _duree(nom, defaut):
+    return timedelta(days=getattr(settings, nom, defaut))
+
+
+def archiver_notifications(duree=None, taille_lot=TAILLE_LOT):
+    """Archive les notifications lues plus anciennes que ``duree`` ; retourne leur nombre"""
+    limite = timezone.now() - (duree if duree is not None else _duree('NOTIFICATIONS_RETENTION_JOURS', 30))
+    anciennes = Notification.objects.filter(lue=True, date_creation__lt=limite).order_by('date_creation', 'pk')
+    total = 0
+    while True:
+        with transaction.atomic():
+            lot = list(anciennes.values_list(*CHAMPS_ARCHIVES)[:taille_lot])
+            if not lot:
+                return total
+            NotificationArchivee.objects.bulk_create([
+                NotificationArchivee(
+                    utilisateur_id=utilisateur_id, message=message, type_notification=type_notification,
+                    nombre=nombre, cibles=cibles, date_creation=date_creation,
+                )
+                for _, utilisateur_id, message, type_notification, nombre, cibles, date_creation in lot
+            ])
+            Notification.objects.filter(pk__in=[ligne[0] for ligne in lot]).delete()
+        total += len(lot)
+
+
+def purger_archives(duree=None, taille_lot=TAILLE_LOT):
+    """Supprime les archives plus anciennes que ``duree`` ; retourne leur nombre"""
+    limite = timezone.now() - (duree if duree is not None else _duree('NOTIFICATIONS_ARCHIVE_JOURS', 365))
+    anciennes = NotificationArchivee.objects.filter(date_creation__lt=limite).order_by('date_creation')
+    total = 0
+    while True:
+        with transaction.atomic():
+            ids = list(anciennes.values_list('pk', flat=True)[:taille_lot])
+            if not ids:
+                return total
+            NotificationArchivee.objects.filter(pk__in=ids).delete()
+        total += len(ids)
@@ -0,0 +1,291 @@
+"""
+Récepteurs de signaux de l'application core.
+
+Connectés dans CoreConfig.ready().
+"""
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.db import transaction
+from django.dispatch import receiver
+
+from . import autocompletion, indicateurs, miniatures, notifications, pdf, recherche, stockage
+from .models import (
+    FICHIERS_DEDOUBLONNES, Client, Intervention, Mission, PieceJointe, Preuve, RapportFichierJoint, RapportImage,
+    RapportIntervention, Utilisateur,
+)
+
+
+# Indicateurs agrégés des interventions
+
+@receiver(pre_save, sender=Intervention)
+def memoriser_etat_intervention(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    instance._etat_indicateurs = None if instance._state.adding else indicateurs.etat_enregistre(instance.pk)
+
+
+@receiver(post_save, sender=Intervention)
+def maj_indicateurs_intervention(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    ancien = getattr(instance, '_etat_indicateurs', None)
+    nouveau = indicateurs.etat_instance(instance)
+    if ancien == nouveau:
+        return
+    variations = {}
+    indicateurs.ajouter_etat(variations, ancien, -1)
+    indicateurs.ajouter_etat(variations, nouveau, 1)
+    indicateurs.appliquer_variations(variations)
+
+
+@receiver(post_delete, sender=Intervention)
+def retirer_indicateurs_intervention(sender, instance, **kwargs):
+    variations = {}
+    indicateurs.ajouter_etat(variations, indicateurs.etat_instance(instance), -1)
+    indicateurs.appliquer_variations(variations)
+
+
+@receiver(pre_delete, sender=Utilisateur)
+def liberer_indicateurs_intervenant(sender, instance, **kwargs):
+    indicateurs.liberer_intervenant(instance.pk)
+
+
+@receiver(pre_save, sender=Mission)
+def memoriser_client_mission(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding:
+        instance._ancien_client_id = instance._ancien_titre = instance._ancien_assigne_a_id = None
+        return
+    instance._ancien_client_id, instance._ancien_titre, instance._ancien_assigne_a_id = (
+        Mission.objects.filter(pk=instance.pk).values_list('client_id', 'titre', 'assigne_a_id').first()
+        or (None, None, None)
+    )
+
+
+@receiver(post_save, sender=Mission)
+def maj_indicateurs_mission(sender, instance, created=False, raw=False, **kwargs):
+    ancien_client_id = getattr(instance, '_ancien_client_id', None)
+    if raw or created or ancien_client_id is None or ancien_client_id == instance.client_id:
+        return
+    indicateurs.deplacer_mission(instance.pk, ancien_client_id, instance.client_id)
+
+
+# Rendus PDF : une modification des données imprimées périme les rendus existants.
+# (Les noms d'utilisateurs font partie de l'empreinte mais ne sont pas suivis ici :
+# le rendu périmé est remplacé à la demande suivante.)
+
+def _invalider_interventions(intervention_ids):
+    intervention_ids = list(intervention_ids)
+    pdf.invalider_rendus('intervention', intervention_ids)
+    pdf.invalider_rendus(
+        'mission', Intervention.objects.filter(pk__in=intervention_ids).values_list('mission_id', flat=True)
+    )
+
+
+@receiver(post_save, sender=Client)
+def invalider_pdf_client(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    pdf.invalider_rendus('mission', instance.missions.values_list('pk', flat=True))
+
+
+@receiver([post_save, post_delete], sender=Mission)
+def invalider_pdf_mission(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    pdf.invalider_rendus('mission', [instance.pk])
+    pdf.invalider_rendus('intervention', instance.interventions.values_list('pk', flat=True))
+
+
+@receiver([post_save, post_delete], sender=Intervention)
+def invalider_pdf_intervention(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    pdf.invalider_rendus('intervention', [instance.pk])
+    pdf.invalider_rendus('mission', [instance.mission_id])
+
+
+@receiver([post_save, post_delete], sender=RapportIntervention)
+@receiver([post_save, post_delete], sender=PieceJointe)
+def invalider_pdf_rapport(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    _invalider_interventions([instance.intervention_id])
+
+
+# Index de recherche (core/recherche.py). Le document d'une intervention reprend le
+# titre, le client et le responsable de sa mission, celui d'une mission le nom de son client.
+
+@receiver(pre_save, sender=Client)
+def memoriser_nom_client(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding:
+        instance._ancien_nom = None
+        return
+    instance._ancien_nom = Client.objects.filter(pk=instance.pk).values_list('nom', flat=True).first()
+
+
+@receiver(post_save, sender=Client)
+def indexer_client(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    recherche.indexer('client', [instance.pk])
+    if not created and getattr(instance, '_ancien_nom', None) != instance.nom:
+        recherche.indexer('mission', instance.missions.values_list('pk', flat=True))
+        recherche.indexer('intervention', Intervention.objects.filter(mission__client=instance).values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Mission)
+def indexer_mission(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    recherche.indexer('mission', [instance.pk])
+    ancien = tuple(getattr(instance, nom, None) for nom in ('_ancien_titre', '_ancien_client_id', '_ancien_assigne_a_id'))
+    if not created and ancien != (instance.titre, instance.client_id, instance.assigne_a_id):
+        recherche.indexer('intervention', instance.interventions.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Intervention)
+def indexer_intervention(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    recherche.indexer('intervention', [instance.pk])
+
+
+@receiver([post_save, post_delete], sender=RapportIntervention)
+def indexer_rapport(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    recherche.indexer('intervention', [instance.intervention_id])
+
+
+@receiver(post_delete, sender=Client)
+@receiver(post_delete, sender=Mission)
+@receiver(post_delete, sender=Intervention)
+def retirer_de_l_index(sender, instance, **kwargs):
+    recherche.retirer(sender._meta.model_name, [instance.pk])
+
+
+# Index de l'autocomplétion (core/autocompletion.py)
+
+CHAMPS_LIBELLE_UTILISATEUR = {'first_name', 'last_name', 'username', 'role'}
+
+
+@receiver(post_save, sender=Client)
+def suggestions_client(sender, instance, created=False, raw=False, **kwargs):
+    if raw or not (created or getattr(instance, '_ancien_nom', None) != instance.nom):
+        return
+    autocompletion.indexer_suggestions('client', [instance.pk])
+
+
+@receiver(post_save, sender=Mission)
+def suggestions_mission(sender, instance, created=False, raw=False, **kwargs):
+    if raw or not (created or getattr(instance, '_ancien_titre', None) != instance.titre):
+        return
+    autocompletion.indexer_suggestions('mission', [instance.pk])
+
+
+@receiver(post_save, sender=Utilisateur)
+def suggestions_utilisateur(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Les enregistrements partiels (last_login à chaque connexion...) ne touchent pas au libellé
+    if raw or (update_fields is not None and not CHAMPS_LIBELLE_UTILISATEUR & set(update_fields)):
+        return
+    autocompletion.indexer_suggestions('utilisateur', [instance.pk])
+
+
+@receiver(post_delete, sender=Client)
+@receiver(post_delete, sender=Mission)
+@receiver(post_delete, sender=Utilisateur)
+def retirer_des_suggestions(sender, instance, **kwargs):
+    autocompletion.retirer_suggestions(sender._meta.model_name, [instance.pk])
+
+
+# Miniatures des images (core/miniatures.py)
+
+CHAMPS_IMAGES = {
+    PieceJointe: 'fichier',
+    RapportImage: 'image',
+    RapportFichierJoint: 'fichier',
+    Utilisateur: 'photo',
+}
+
+
+@receiver(pre_save, sender=Utilisateur)
+def memoriser_photo(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or instance._state.adding or (update_fields is not None and 'photo' not in update_fields):
+        instance._ancienne_photo = None
+        return
+    instance._ancienne_photo = Utilisateur.objects.filter(pk=instance.pk).values_list('photo', flat=True).first()
+
+
+@receiver(post_save, sender=PieceJointe)
+@receiver(post_save, sender=RapportImage)
+@receiver(post_save, sender=RapportFichierJoint)
+@receiver(post_save, sender=Utilisateur)
+def generer_miniatures(sender, instance, raw=False, update_fields=None, **kwargs):
+    champ = CHAMPS_IMAGES[sender]
+    if raw or (update_fields is not None and champ not in update_fields):
+        return
+    fichier = getattr(instance, champ)
+    ancienne = getattr(instance, '_ancienne_photo', None)
+    if ancienne and ancienne != fichier.name:
+        miniatures.supprimer(ancienne)
+    miniatures.planifier(fichier)
+
+
+@receiver(post_delete, sender=PieceJointe)
+@receiver(post_delete, sender=RapportImage)
+@receiver(post_delete, sender=RapportFichierJoint)
+@receiver(post_delete, sender=Utilisateur)
+def supprimer_miniatures(sender, instance, **kwargs):
+    fichier = getattr(instance, CHAMPS_IMAGES[sender])
+    # Fichier dédoublonné : peut-être partagé, ses miniatures partent avec lui lors de la collecte
+    if fichier and miniatures.est_image(fichier.name) and not fichier.name.startswith(f'{stockage.DOSSIER}/'):
+        miniatures.supprimer(fichier.name, fichier.storage)
+
+
+# Compteurs de références du stockage dédoublonné
+
+@receiver(pre_save, sender=PieceJointe)
+@receiver(pre_save, sender=Preuve)
+@receiver(pre_save, sender=RapportImage)
+@receiver(pre_save, sender=RapportFichierJoint)
+def memoriser_fichier_stocke(sender, instance, raw=False, **kwargs):
+    instance._ancien_fichier_stocke = None
+    if not raw and not instance._state.adding:
+        champ = FICHIERS_DEDOUBLONNES[sender]
+        instance._ancien_fichier_stocke = sender.objects.filter(pk=instance.pk).values_list(champ, flat=True).first()
+
+
+@receiver(post_save, sender=PieceJointe)
+@receiver(post_save, sender=Preuve)
+@receiver(post_save, sender=RapportImage)
+@receiver(post_save, sender=RapportFichierJoint)
+def compter_fichier_stocke(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    nom = getattr(instance, FICHIERS_DEDOUBLONNES[sender]).name
+    ancien = getattr(instance, '_ancien_fichier_stocke', None)
+    if created:
+        stockage.ajuster_references({nom: 1})
+    elif ancien != nom:
+        stockage.ajuster_references({nom: 1, ancien: -1})
+
+
+@receiver(post_delete, sender=PieceJointe)
+@receiver(post_delete, sender=Preuve)
+@receiver(post_delete, sender=RapportImage)
+@receiver(post_delete, sender=RapportFichierJoint)
+def decompter_fichier_stocke(sender, instance, **kwargs):
+    stockage.ajuster_references({getattr(instance, FICHIERS_DEDOUBLONNES[sender]).name: -1})
+
+
+
+# Destinataires des notifications par rôle (core.notifications.destinataires)
+
+@receiver(post_save, sender=Utilisateur)
+@receiver(post_delete, sender=Utilisateur)
+def oublier_destinataires_notifications(sender, instance, created=False, update_fields=None, **kwargs):
+    if not created and update_fields is not None and 'role' not in update_fields:
+        return
+    roles = [role for role, _ in Utilisateur.ROLE_CHOICES]
+    notifications.oublier_destinataires(*roles)
+    # Encore après la validation : une lecture concurrente a pu remettre en cache l'ancienne liste
+    transaction.on_commit(lambda: notifications.oublier_destinataires(*roles))
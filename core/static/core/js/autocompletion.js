@@ -0,0 +1,81 @@
+// Champs à complétion automatique (widget AutocompletionWidget, vue autocompletion)
+(function () {
+    function initialiser(bloc) {
+        if (bloc.dataset.initialise) {
+            return;
+        }
+        bloc.dataset.initialise = '1';
+        const valeur = bloc.querySelector('input[type=hidden]');
+        const saisie = bloc.querySelector('input[type=text]');
+        const liste = bloc.querySelector('.autocompletion-resultats');
+        let minuterie;
+        let requete = 0;
+
+        function vider() {
+            liste.innerHTML = '';
+        }
+
+        saisie.addEventListener('input', function () {
+            // Le texte ne correspond plus à l'objet choisi
+            valeur.value = '';
+            clearTimeout(minuterie);
+            const texte = saisie.value.trim();
+            if (!texte) {
+                vider();
+                return;
+            }
+            minuterie = setTimeout(function () {
+                const numero = ++requete;
+                const url = bloc.dataset.url + '?type=' + encodeURIComponent(bloc.dataset.type) + '&q=' + encodeURIComponent(texte);
+                fetch(url, {credentials: 'same-origin'})
+                    .then(function (reponse) { return reponse.json(); })
+                    .then(function (donnees) {
+                        if (numero !== requete) {
+                            return;
+                        }
+                        vider();
+                        donnees.resultats.forEach(function (resultat) {
+                            const option = document.createElement('button');
+                            option.type = 'button';
+                            option.className = 'list-group-item list-group-item-action';
+                            option.textContent = resultat.libelle;
+                            option.addEventListener('mousedown', function (e) {
+                                e.preventDefault();
+                                valeur.value = resultat.id;
+                                saisie.value = resultat.libelle;
+                                valeur.dispatchEvent(new Event('change', {bubbles: true}));
+                                vider();
+                            });
+                            liste.appendChild(option);
+                        });
+                    });
+            }, 200);
+        });
+
+        saisie.addEventListener('blur', function () {
+            setTimeout(vider, 150);
+        });
+
+        // Un champ obligatoire n'est valide qu'une fois un objet choisi dans la liste
+        if (saisie.required) {
+            saisie.form && saisie.form.addEventListener('submit', function (e) {
+                if (!valeur.value) {
+                    e.preventDefault();
+                    saisie.setCustomValidity('Choisissez une valeur dans la liste.');
+                    saisie.reportValidity();
+                    saisie.setCustomValidity('');
+                }
+            });
+        }
+    }
+
+    function initialiserTout() {
+        document.querySelectorAll('.autocompletion').forEach(initialiser);
+    }
+
+    if (document.readyState === 'loading') {
+        document.addEventListener('DOMContentLoaded', initialiserTout);
+    } else {
+        initialiserTout();
+    }
+})();
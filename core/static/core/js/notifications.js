@@ -0,0 +1,45 @@
+// Notifications en temps réel (core/temps_reel.py) : le flux SSE met à jour le badge de la
+// cloche et affiche chaque nouvelle notification, sans recharger la page.
+(function () {
+    const cloche = document.querySelector('.notification-bell[data-flux]');
+    if (!cloche || !window.EventSource) {
+        return;
+    }
+
+    function majBadge(nombre) {
+        let badge = cloche.querySelector('.notification-badge');
+        if (!nombre) {
+            if (badge) {
+                badge.remove();
+            }
+            return;
+        }
+        if (!badge) {
+            badge = document.createElement('span');
+            badge.className = 'notification-badge';
+            cloche.appendChild(badge);
+        }
+        badge.textContent = nombre;
+    }
+
+    function afficher(notification) {
+        const bulle = document.createElement('div');
+        bulle.className = 'alert alert-info shadow-sm';
+        bulle.style.cssText = 'position: fixed; right: 1.5rem; bottom: 1.5rem; z-index: 1080; max-width: 360px;';
+        bulle.textContent = notification.message;
+        document.body.appendChild(bulle);
+        setTimeout(function () { bulle.remove(); }, 6000);
+    }
+
+    const flux = new EventSource(cloche.dataset.flux);
+    flux.addEventListener('compteur', function (e) {
+        majBadge(JSON.parse(e.data).non_lues);
+    });
+    flux.addEventListener('notification', function (e) {
+        const notification = JSON.parse(e.data);
+        if (!notification.lue) {
+            afficher(notification);
+        }
+        document.dispatchEvent(new CustomEvent('notification:nouvelle', {detail: notification}));
+    });
+})();
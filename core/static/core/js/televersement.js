@@ -0,0 +1,174 @@
+// Téléversement fragmenté et reprenable des champs fichier marqués data-televersement
+// (core/televersement.py). À la soumission du formulaire, chaque fichier est envoyé par
+// blocs ; le formulaire part ensuite avec les jetons des sessions au lieu des fichiers.
+(function () {
+    // Script inclus par base.html et par les pages autonomes : une seule initialisation
+    if (window.televersementInitialise) {
+        return;
+    }
+    window.televersementInitialise = true;
+
+    const URL_SESSIONS = '/televersements/';
+
+    function jetonCsrf(form) {
+        const champ = form.querySelector('input[name=csrfmiddlewaretoken]');
+        if (champ) {
+            return champ.value;
+        }
+        const cookie = document.cookie.split('; ').find(function (c) { return c.startsWith('csrftoken='); });
+        return cookie ? cookie.split('=')[1] : '';
+    }
+
+    function cleReprise(fichier) {
+        return 'televersement:' + fichier.name + ':' + fichier.size + ':' + fichier.lastModified;
+    }
+
+    async function empreinte(donnees) {
+        if (!window.crypto || !window.crypto.subtle) {
+            return '';
+        }
+        const hachage = await window.crypto.subtle.digest('SHA-256', donnees);
+        return Array.from(new Uint8Array(hachage)).map(function (o) { return o.toString(16).padStart(2, '0'); }).join('');
+    }
+
+    async function lireJson(reponse) {
+        try {
+            return await reponse.json();
+        } catch (e) {
+            return {erreur: 'Réponse invalide du serveur (' + reponse.status + ').'};
+        }
+    }
+
+    async function ouvrirSession(fichier, csrf) {
+        // Reprise d'une session interrompue pour le même fichier
+        const jeton = localStorage.getItem(cleReprise(fichier));
+        if (jeton) {
+            const reponse = await fetch(URL_SESSIONS + jeton + '/', {credentials: 'same-origin'});
+            if (reponse.ok) {
+                const session = await reponse.json();
+                if (session.statut === 'en_cours' || session.disponible) {
+                    return session;
+                }
+            }
+            localStorage.removeItem(cleReprise(fichier));
+        }
+        const donnees = new FormData();
+        donnees.append('nom', fichier.name);
+        donnees.append('taille', fichier.size);
+        donnees.append('type', fichier.type);
+        const reponse = await fetch(URL_SESSIONS, {
+            method: 'POST', body: donnees, credentials: 'same-origin', headers: {'X-CSRFToken': csrf}
+        });
+        const session = await lireJson(reponse);
+        if (!reponse.ok) {
+            throw new Error(session.erreur || 'Téléversement refusé.');
+        }
+        localStorage.setItem(cleReprise(fichier), session.jeton);
+        return session;
+    }
+
+    async function televerser(fichier, csrf, progression) {
+        let session = await ouvrirSession(fichier, csrf);
+        let essais = 0;
+        while (session.statut === 'en_cours') {
+            const debut = session.recu;
+            const fin = Math.min(debut + session.taille_bloc, fichier.size);
+            const bloc = await fichier.slice(debut, fin).arrayBuffer();
+            const entetes = {
+                'X-CSRFToken': csrf,
+                'Content-Type': 'application/octet-stream',
+                'Content-Range': 'bytes ' + debut + '-' + (fin - 1) + '/' + fichier.size
+            };
+            const hachage = await empreinte(bloc);
+            if (hachage) {
+                entetes['X-Checksum-Sha256'] = hachage;
+            }
+            let reponse;
+            try {
+                reponse = await fetch(URL_SESSIONS + session.jeton + '/', {
+                    method: 'PUT', body: bloc, credentials: 'same-origin', headers: entetes
+                });
+            } catch (e) {
+                reponse = null;
+            }
+            if (reponse !== null && reponse.status === 422) {
+                // Bloc corrompu en route (la session reste en cours) ou fichier entier refusé
+                session = await lireJson(reponse);
+                if (session.statut === 'en_cours' && ++essais <= 5) {
+                    continue;
+                }
+                break;
+            }
+            if (reponse === null || reponse.status >= 500) {
+                // Coupure réseau : nouvel essai après une pause croissante
+                if (++essais > 5) {
+                    throw new Error('Connexion perdue pendant le téléversement de ' + fichier.name + '.');
+                }
+                await new Promise(function (r) { setTimeout(r, 1000 * essais); });
+                const etat = await fetch(URL_SESSIONS + session.jeton + '/', {credentials: 'same-origin'});
+                if (etat.ok) {
+                    session = await etat.json();
+                }
+                continue;
+            }
+            const resultat = await lireJson(reponse);
+            if (!reponse.ok && reponse.status !== 409) {
+                throw new Error(resultat.erreur || 'Téléversement refusé.');
+            }
+            // 409 : le serveur indique la position à reprendre
+            session = resultat;
+            essais = 0;
+            progression(session.recu / session.taille);
+        }
+        if (session.statut !== 'termine') {
+            localStorage.removeItem(cleReprise(fichier));
+            throw new Error(session.erreur || 'Échec du téléversement de ' + fichier.name + '.');
+        }
+        return session.jeton;
+    }
+
+    document.addEventListener('submit', async function (e) {
+        const form = e.target;
+        if (form.dataset.televersementsEnvoyes) {
+            return;
+        }
+        const champs = Array.from(form.querySelectorAll('input[type=file][data-televersement]'))
+            .filter(function (champ) { return champ.files.length; });
+        if (!champs.length) {
+            return;
+        }
+        e.preventDefault();
+        e.stopImmediatePropagation();
+        const soumetteur = e.submitter;
+        const csrf = jetonCsrf(form);
+        const etat = document.createElement('div');
+        etat.className = 'televersement-etat text-muted small mt-2';
+        form.appendChild(etat);
+
+        try {
+            for (const champ of champs) {
+                for (const fichier of Array.from(champ.files)) {
+                    const jeton = await televerser(fichier, csrf, function (fraction) {
+                        etat.textContent = 'Envoi de ' + fichier.name + ' : ' + Math.floor(fraction * 100) + ' %';
+                    });
+                    const cache = document.createElement('input');
+                    cache.type = 'hidden';
+                    cache.name = 'televersements';
+                    cache.value = champ.name + ':' + jeton;
+                    form.appendChild(cache);
+                    localStorage.removeItem(cleReprise(fichier));
+                }
+                // Les fichiers ne repartent pas dans la requête du formulaire
+                champ.required = false;
+                champ.value = '';
+            }
+        } catch (erreur) {
+            etat.className = 'televersement-etat text-danger small mt-2';
+            etat.textContent = erreur.message + ' Soumettez de nouveau pour reprendre.';
+            return;
+        }
+        etat.textContent = 'Fichiers envoyés, enregistrement...';
+        form.dataset.televersementsEnvoyes = '1';
+        form.requestSubmit(soumetteur || undefined);
+    }, true);
+})();
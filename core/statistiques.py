@@ -0,0 +1,71 @@
+"""
+Indicateurs des tableaux de bord.
+
+Chaque indicateur est calculé par agrégation conditionnelle (``Count(..., filter=Q(...))``) :
+une seule requête par modèle au lieu d'un ``count()`` par chiffre affiché.
+Les chiffres d'interventions sont lus dans les indicateurs agrégés
+(core/indicateurs.py). Les chiffres globaux (vue administrateur) peuvent être
+mis en cache quelques secondes via ``DASHBOARD_CACHE_TTL`` pour absorber les
+pics de connexion.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from .indicateurs import cle_intervenant, lire_indicateur
+from .models import IndicateurIntervention, Mission, RetardIntervention
+
+
+def _avec_cache(cle, calcul):
+    ttl = getattr(settings, 'DASHBOARD_CACHE_TTL', 0)
+    if not ttl:
+        return calcul()
+    return cache.get_or_set(cle, calcul, ttl)
+
+
+def statistiques_dashboard(user, admin):
+    """Totaux et éléments en cours pour le tableau de bord principal"""
+    def calcul():
+        missions = Mission.objects.visible_to(user)
+        stats = missions.aggregate(
+            total_missions=Count('id'),
+            missions_en_cours=Count('id', filter=Q(statut='en_cours')),
+        )
+        indicateur = lire_indicateur('global' if admin else cle_intervenant(user.pk))
+        stats['total_interventions'] = indicateur.total
+        stats['interventions_en_cours'] = indicateur.en_cours
+        return stats
+
+    if admin:
+        return _avec_cache('dashboard:statistiques:admin', calcul)
+    return calcul()
+
+
+def statistiques_retards(user, admin):
+    """Compteurs du tableau de bord des retards"""
+    def calcul():
+        retards = RetardIntervention.objects.visible_to(user)
+        stats = retards.aggregate(
+            total_retards=Count('id'),
+            retards_en_cours=Count('id', filter=Q(resolu=False)),
+            retards_resolus=Count('id', filter=Q(resolu=True)),
+        )
+        stats['interventions_en_retard'] = lire_indicateur('global' if admin else cle_intervenant(user.pk)).en_retard
+        return stats
+
+    if admin:
+        return _avec_cache('dashboard:retards:admin', calcul)
+    return calcul()
+
+
+def indicateurs_par_dimension(limite=10):
+    """Répartitions par client, intervenant et semaine, lues dans la table d'agrégats"""
+    return {
+        'indicateurs_global': lire_indicateur('global'),
+        'indicateurs_clients': IndicateurIntervention.objects.filter(dimension='client')
+            .select_related('client').order_by('-total')[:limite],
+        'indicateurs_intervenants': IndicateurIntervention.objects.filter(dimension='intervenant')
+            .select_related('intervenant').order_by('-total')[:limite],
+        'indicateurs_semaines': IndicateurIntervention.objects.filter(dimension='semaine')
+            .order_by('-semaine')[:limite],
+    }
@@ -0,0 +1,171 @@
+"""
+Stockage des fichiers joints adressé par contenu.
+
+Les pièces jointes, preuves, images et fichiers de rapport partagent
+StockageDedoublonne : un fichier est rangé sous cas/<ab>/<cd>/<sha256><extension>,
+quel que soit le dossier upload_to ou le nom d'origine. Un document déjà présent
+n'est pas réécrit : les lignes qui le joignent pointent vers le même fichier.
+
+FichierStocke compte les références de chaque fichier, tenues à jour par les
+signaux des modèles de FICHIERS_DEDOUBLONNES. ``delete`` ne supprime rien : un
+fichier qui n'est plus référencé est supprimé par ``collecter`` (commande
+``nettoyer_medias``), passé un délai de grâce qui couvre les enregistrements
+encore en cours. ``recompter`` reconstruit les compteurs à partir des tables.
+
+``_save`` et ``collecter`` verrouillent la ligne du fichier (select_for_update) :
+un enregistrement du même contenu attend la fin d'une collecte en cours, puis
+recrée la ligne et dépose de nouveau le fichier.
+"""
+import hashlib
+import os
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+from django.utils.deconstruct import deconstructible
+
+DOSSIER = 'cas'
+TAILLE_LOT = 500
+
+
+@deconstructible
+class StockageDedoublonne(FileSystemStorage):
+    """FileSystemStorage dont les noms de fichiers sont l'empreinte SHA-256 du contenu"""
+
+    def get_available_name(self, name, max_length=None):
+        # Le nom définitif dépend du contenu : il est choisi par _save
+        return name
+
+    def _save(self, name, content):
+        from .models import FichierStocke
+
+        extension = os.path.splitext(name)[1].lower()[:10]
+        dossier_racine = self.path(DOSSIER)
+        os.makedirs(dossier_racine, exist_ok=True)
+
+        empreinte = hashlib.sha256()
+        taille = 0
+        if hasattr(content, 'temporary_file_path'):
+            # Fichier déjà sur disque (téléversement) : empreinte calculée sur place, puis déplacé
+            source = content.temporary_file_path()
+            with open(source, 'rb') as fichier:
+                for bloc in iter(lambda: fichier.read(64 * 1024), b''):
+                    empreinte.update(bloc)
+                    taille += len(bloc)
+            temporaire = None
+        else:
+            descripteur, temporaire = tempfile.mkstemp(dir=dossier_racine, suffix='.tmp')
+            with os.fdopen(descripteur, 'wb') as fichier:
+                for bloc in content.chunks():
+                    empreinte.update(bloc)
+                    fichier.write(bloc)
+                    taille += len(bloc)
+            source = temporaire
+
+        empreinte = empreinte.hexdigest()
+        nom = f"{DOSSIER}/{empreinte[:2]}/{empreinte[2:4]}/{empreinte}{extension}"
+        chemin = self.path(nom)
+        with transaction.atomic():
+            # Verrou sur la ligne : attend la fin d'une collecte en cours de ce fichier. Avant tout
+            # accès au fichier, le délai de grâce repart et ``collecter`` ne le supprime plus
+            stocke, cree = FichierStocke.objects.select_for_update().get_or_create(
+                nom=nom, defaults={'empreinte': empreinte, 'taille': taille}
+            )
+            if not cree:
+                FichierStocke.objects.filter(pk=stocke.pk).update(date_maj=timezone.now())
+            # Ligne créée : le fichier d'une ligne collectée a pu être supprimé, il est déposé de nouveau
+            if os.path.exists(chemin) and not cree:
+                # Contenu déjà stocké : la source est consommée comme si elle avait été déplacée
+                os.remove(source)
+            else:
+                os.makedirs(os.path.dirname(chemin), exist_ok=True)
+                file_move_safe(source, chemin, allow_overwrite=True)
+                if self.file_permissions_mode is not None:
+                    os.chmod(chemin, self.file_permissions_mode)
+        return nom
+
+    def delete(self, name):
+        # Un fichier peut être partagé : seul ``collecter`` supprime, d'après les compteurs
+        if not name.startswith(f'{DOSSIER}/'):
+            super().delete(name)
+
+
+_stockage = StockageDedoublonne()
+
+
+def stockage_medias():
+    """Stockage des fichiers joints (callable : la référence, et non l'instance, figure dans les migrations)"""
+    return _stockage
+
+
+def ajuster_references(variations):
+    """Applique {nom: delta} aux compteurs ; les fichiers hors stockage dédoublonné sont ignorés"""
+    from .models import FichierStocke
+
+    maintenant = timezone.now()
+    for nom, delta in variations.items():
+        if delta and nom and nom.startswith(f'{DOSSIER}/'):
+            FichierStocke.objects.filter(nom=nom).update(references=F('references') + delta, date_maj=maintenant)
+
+
+def recompter():
+    """Reconstruit les compteurs à partir des tables ; retourne le nombre de compteurs corrigés"""
+    from .models import FichierStocke, FICHIERS_DEDOUBLONNES
+
+    comptes = {}
+    for modele, champ in FICHIERS_DEDOUBLONNES.items():
+        for nom, nombre in modele.objects.filter(**{f'{champ}__startswith': f'{DOSSIER}/'}).values(champ).annotate(
+            nombre=Count('pk')
+        ).values_list(champ, 'nombre'):
+            comptes[nom] = comptes.get(nom, 0) + nombre
+
+    corriges = []
+    for fichier in FichierStocke.objects.only('pk', 'nom', 'references').iterator(chunk_size=TAILLE_LOT):
+        vrai_compte = comptes.get(fichier.nom, 0)
+        if fichier.references != vrai_compte:
+            fichier.references = vrai_compte
+            corriges.append(fichier)
+    FichierStocke.objects.bulk_update(corriges, ['references'], batch_size=TAILLE_LOT)
+    return len(corriges)
+
+
+def collecter(delai=None, simulation=False):
+    """
+    Supprime les fichiers sans référence depuis plus de ``delai``
+    (STOCKAGE_DELAI_COLLECTE_MINUTES par défaut), avec leurs miniatures.
+    Retourne (nombre, octets) libérés.
+    """
+    from . import miniatures
+    from .models import FichierStocke
+
+    if delai is None:
+        delai = timedelta(minutes=getattr(settings, 'STOCKAGE_DELAI_COLLECTE_MINUTES', 60))
+
+    candidats = FichierStocke.objects.filter(references__lte=0, date_maj__lt=timezone.now() - delai)
+    nombre = octets = 0
+    for fichier in candidats.iterator(chunk_size=TAILLE_LOT):
+        nombre += 1
+        octets += fichier.taille
+        if simulation:
+            continue
+        with transaction.atomic():
+            # Verrou sur la ligne : un enregistrement du même contenu attend que fichier et ligne
+            # soient supprimés. Référencé entre-temps : la ligne n'est plus à zéro, rien n'est supprimé
+            if not list(FichierStocke.objects.select_for_update().filter(
+                pk=fichier.pk, references__lte=0, date_maj=fichier.date_maj
+            ).values_list('pk', flat=True)):
+                nombre -= 1
+                octets -= fichier.taille
+                continue
+            try:
+                os.remove(_stockage.path(fichier.nom))
+            except FileNotFoundError:
+                pass
+            FichierStocke.objects.filter(pk=fichier.pk).delete()
+        miniatures.supprimer(fichier.nom)
+    return nombre, octets
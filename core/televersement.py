@@ -0,0 +1,251 @@
+"""
+Téléversement fragmenté et reprenable des pièces jointes et fichiers de rapport.
+
+Le client ouvre une session (``creer_session``), envoie le fichier par blocs
+successifs (PUT avec ``Content-Range``, empreinte SHA-256 du bloc facultative),
+et reprend après une coupure à partir de ``recu``. Chaque bloc est écrit à sa
+position dans un fichier partiel de TELEVERSEMENT_DOSSIER, sans passer par le
+décodage multipart de Django ; l'empreinte du fichier entier est vérifiée au
+dernier bloc.
+
+Le formulaire est ensuite soumis avec les jetons des sessions terminées
+(champ ``televersements`` : ``<nom du champ fichier>:<jeton>``) ;
+``fichiers_televerses`` les ajoute à ``request.FILES``. Ces fichiers exposent
+``temporary_file_path`` : le stockage déplace le fichier partiel (renommage sur
+le même disque) au lieu de le recopier, un fichier de plusieurs gigaoctets
+n'est écrit qu'une fois.
+
+Compromis assumé : le jeton est consommé par le premier enregistrement réussi,
+qui emporte le fichier partiel. Tant qu'aucun enregistrement n'a abouti
+(formulaire refusé), le jeton peut être soumis de nouveau ; ensuite le fichier
+doit être renvoyé. Les sessions inactives sont purgées par purge_televersements.
+"""
+import hashlib
+import os
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.utils import timezone
+
+from . import metriques
+from .models import Televersement
+
+# Lecture du corps des requêtes et du fichier partiel
+TAILLE_LECTURE = 64 * 1024
+
+_CONTENT_RANGE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+
+class ErreurTeleversement(Exception):
+    """Requête de téléversement refusée ; ``statut`` est le code HTTP à renvoyer"""
+
+    def __init__(self, message, statut=400):
+        super().__init__(message)
+        self.statut = statut
+
+
+def dossier():
+    return getattr(settings, 'TELEVERSEMENT_DOSSIER', os.path.join(settings.MEDIA_ROOT, '.televersements'))
+
+
+def taille_bloc():
+    return getattr(settings, 'TELEVERSEMENT_TAILLE_BLOC', 8 * 1024 * 1024)
+
+
+def chemin_partiel(session):
+    return os.path.join(dossier(), f'{session.jeton}.part')
+
+
+def creer_session(utilisateur, nom_fichier, taille, type_contenu='', sha256=''):
+    """Ouvre une session et réserve son fichier partiel"""
+    nom_fichier = os.path.basename(nom_fichier or '').strip()
+    if not nom_fichier:
+        raise ErreurTeleversement("Nom de fichier manquant.")
+    try:
+        taille = int(taille)
+    except (TypeError, ValueError):
+        raise ErreurTeleversement("Taille invalide.")
+    taille_max = getattr(settings, 'TELEVERSEMENT_TAILLE_MAX', 2 * 1024 ** 3)
+    if taille <= 0 or taille > taille_max:
+        raise ErreurTeleversement(f"La taille doit être comprise entre 1 et {taille_max} octets.", 413)
+    sha256 = (sha256 or '').lower()
+    if sha256 and not re.fullmatch(r'[0-9a-f]{64}', sha256):
+        raise ErreurTeleversement("Empreinte SHA-256 invalide.")
+
+    session = Televersement.objects.create(
+        utilisateur=utilisateur, nom_fichier=nom_fichier[:255], type_contenu=(type_contenu or '')[:100],
+        taille=taille, sha256=sha256,
+    )
+    os.makedirs(dossier(), exist_ok=True)
+    open(chemin_partiel(session), 'wb').close()
+    return session
+
+
+def recevoir_bloc(session, flux, content_range, sha256_bloc=''):
+    """
+    Écrit le bloc lu dans ``flux`` à sa position. Le bloc doit commencer à ``session.recu`` :
+    sinon 409, le client reprend à la position renvoyée. Retourne la session à jour.
+    """
+    if session.statut != 'en_cours':
+        raise ErreurTeleversement("Ce téléversement n'est plus en cours.", 409)
+    correspondance = _CONTENT_RANGE.match(content_range or '')
+    if not correspondance:
+        raise ErreurTeleversement("En-tête Content-Range attendu : bytes debut-fin/taille.")
+    debut, fin, total = (int(groupe) for groupe in correspondance.groups())
+    longueur = fin - debut + 1
+    if total != session.taille or fin >= total or longueur <= 0 or longueur > taille_bloc():
+        raise ErreurTeleversement("Plage d'octets invalide.", 416)
+    if debut != session.recu:
+        raise ErreurTeleversement("Le bloc ne commence pas à la position attendue.", 409)
+
+    try:
+        partiel = open(chemin_partiel(session), 'r+b')
+    except FileNotFoundError:
+        # Fichier partiel purgé ou perdu : la session ne peut plus reprendre, le client en ouvre une autre
+        Televersement.objects.filter(pk=session.pk).update(
+            statut='echec', erreur="Le fichier partiel a expiré, recommencez l'envoi.", date_maj=timezone.now()
+        )
+        raise ErreurTeleversement("Le fichier partiel a expiré, recommencez l'envoi.", 410)
+
+    empreinte = hashlib.sha256()
+    ecrits = 0
+    with partiel:
+        partiel.seek(debut)
+        while ecrits < longueur:
+            donnees = flux.read(min(TAILLE_LECTURE, longueur - ecrits))
+            if not donnees:
+                break
+            empreinte.update(donnees)
+            partiel.write(donnees)
+            ecrits += len(donnees)
+    if ecrits != longueur:
+        raise ErreurTeleversement("Bloc incomplet.")
+    if sha256_bloc and empreinte.hexdigest() != sha256_bloc.lower():
+        raise ErreurTeleversement("L'empreinte du bloc ne correspond pas, renvoyez-le.", 422)
+    metriques.incrementer('televersement_octets_total', ecrits)
+    metriques.incrementer('televersement_blocs_total')
+
+    # Un envoi concurrent du même bloc a pu avancer la session : il a écrit les mêmes octets
+    Televersement.objects.filter(pk=session.pk, recu=debut).update(recu=fin + 1, date_maj=timezone.now())
+    session.refresh_from_db()
+    if session.recu == session.taille and session.statut == 'en_cours':
+        _terminer(session)
+    return session
+
+
+def _terminer(session):
+    """Vérifie l'empreinte du fichier reconstitué"""
+    if session.sha256:
+        empreinte = hashlib.sha256()
+        with open(chemin_partiel(session), 'rb') as partiel:
+            for bloc in iter(lambda: partiel.read(TAILLE_LECTURE), b''):
+                empreinte.update(bloc)
+        if empreinte.hexdigest() != session.sha256:
+            Televersement.objects.filter(pk=session.pk).update(
+                statut='echec', erreur="L'empreinte du fichier ne correspond pas.", date_maj=timezone.now()
+            )
+            session.refresh_from_db()
+            _supprimer_partiel(session)
+            return
+    Televersement.objects.filter(pk=session.pk, statut='en_cours').update(statut='termine', date_maj=timezone.now())
+    session.refresh_from_db()
+
+
+def etat(session):
+    """Représentation JSON d'une session"""
+    return {
+        'jeton': str(session.jeton),
+        'nom': session.nom_fichier,
+        'taille': session.taille,
+        'recu': session.recu,
+        'statut': session.statut,
+        'erreur': session.erreur,
+        'disponible': session.statut == 'termine' and os.path.exists(chemin_partiel(session)),
+        'taille_bloc': taille_bloc(),
+    }
+
+
+class FichierTeleverse(UploadedFile):
+    """
+    Fichier reconstitué, déplacé (et non recopié) par le stockage à l'enregistrement.
+    Le fichier partiel n'est ouvert qu'à la lecture et refermé une fois lu en entier.
+    """
+
+    def __init__(self, session):
+        self._chemin = chemin_partiel(session)
+        self._fichier = None
+        super().__init__(
+            None, session.nom_fichier, session.type_contenu or 'application/octet-stream', session.taille, None
+        )
+
+    @property
+    def file(self):
+        if self._fichier is None or self._fichier.closed:
+            self._fichier = open(self._chemin, 'rb')
+        return self._fichier
+
+    @file.setter
+    def file(self, fichier):
+        self._fichier = fichier
+
+    @property
+    def closed(self):
+        return self._fichier is None or self._fichier.closed
+
+    def close(self):
+        if self._fichier is not None:
+            self._fichier.close()
+
+    def chunks(self, chunk_size=None):
+        try:
+            yield from super().chunks(chunk_size)
+        finally:
+            self.close()
+
+    def temporary_file_path(self):
+        return self._chemin
+
+
+def fichiers_televerses(request):
+    """
+    ``request.FILES`` complété des téléversements terminés annoncés dans le champ
+    ``televersements``. Les jetons inconnus, d'un autre utilisateur, de sessions non terminées
+    ou déjà consommés (fichier partiel déplacé) sont ignorés.
+    """
+    fichiers = request.FILES.copy()
+    demandes = {}
+    for valeur in request.POST.getlist('televersements'):
+        champ, _, jeton = valeur.rpartition(':')
+        if champ:
+            demandes.setdefault(jeton, []).append(champ)
+    if not demandes:
+        return fichiers
+    sessions = Televersement.objects.filter(utilisateur=request.user, statut='termine', jeton__in=[
+        jeton for jeton in demandes if re.fullmatch(r'[0-9a-f-]{36}', jeton)
+    ])
+    for session in sessions:
+        if not os.path.exists(chemin_partiel(session)):
+            continue
+        for champ in demandes[str(session.jeton)]:
+            fichiers.appendlist(champ, FichierTeleverse(session))
+    return fichiers
+
+
+def _supprimer_partiel(session):
+    try:
+        os.remove(chemin_partiel(session))
+    except FileNotFoundError:
+        pass
+
+
+def purger(duree=None):
+    """Supprime les sessions inactives depuis ``duree`` et leurs fichiers partiels ; retourne leur nombre"""
+    if duree is None:
+        duree = timedelta(hours=getattr(settings, 'TELEVERSEMENT_DUREE_HEURES', 24))
+    sessions = list(Televersement.objects.filter(date_maj__lt=timezone.now() - duree))
+    for session in sessions:
+        _supprimer_partiel(session)
+    Televersement.objects.filter(pk__in=[session.pk for session in sessions]).delete()
+    return len(sessions)
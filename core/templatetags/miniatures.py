@@ -0,0 +1,22 @@
+from django import template
+
+from core import miniatures
+
+register = template.Library()
+
+
+@register.filter
+def miniature(fichier, taille='apercu'):
+    """URL JPEG de la miniature d'une image (l'original tant qu'elle n'est pas générée)"""
+    return miniatures.url_miniature(fichier, taille, 'jpg')
+
+
+@register.filter
+def miniature_webp(fichier, taille='apercu'):
+    """URL WebP de la miniature d'une image (l'original tant qu'elle n'est pas générée)"""
+    return miniatures.url_miniature(fichier, taille, 'webp')
+
+
+@register.filter
+def est_image(fichier):
+    return bool(fichier) and miniatures.est_image(fichier.name)
@@ -0,0 +1,174 @@
+"""
+Diffusion des notifications en temps réel (Server-Sent Events).
+
+Le flux ``notifications/flux/`` est une vue asynchrone servie par un processus
+ASGI dédié (mission_manager/asgi.py, qui ne sert que cette route) ; le reste de
+l'application reste sous WSGI, où les réponses en flux (PDF, export ZIP,
+médias) sont transmises au fil de l'eau.
+
+Chaque navigateur connecté garde ouvert un flux. Le flux attend d'être réveillé
+ou que NOTIFICATIONS_SSE_INTERVALLE s'écoule, puis relit en base les
+notifications postérieures au dernier identifiant envoyé et le compteur de non
+lues. Deux sources de réveil :
+
+- ``publier``, appelé par core.notifications après la validation de la
+  transaction, pour les notifications créées dans le même processus ;
+- le veilleur du processus ASGI, qui tant qu'un flux est ouvert cherche toutes
+  les NOTIFICATIONS_SSE_SCRUTATION secondes les notifications nouvelles, quel
+  que soit le processus qui les a créées (workers WSGI, commandes planifiées) :
+  une requête par processus, et non par flux.
+
+Le navigateur reprend après une coupure à partir de ``Last-Event-ID``. Le flux se
+ferme de lui-même après NOTIFICATIONS_SSE_DUREE secondes ; EventSource se
+reconnecte, ce qui revérifie la session.
+"""
+import asyncio
+import json
+import threading
+import time
+
+from django.conf import settings
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import Notification, Utilisateur
+
+# Nombre maximal de notifications envoyées par relecture
+TAILLE_LOT = 50
+
+# Nombre maximal de notifications examinées par le veilleur à chaque scrutation
+TAILLE_SCRUTATION = 1000
+
+_abonnes = {}
+# Boucle d'évènements -> [tâche du veilleur, nombre de flux ouverts sur cette boucle]
+_veilleurs = {}
+_verrou = threading.Lock()
+
+
+class Abonnement:
+    """Réveils destinés aux flux d'un utilisateur ouverts dans ce processus"""
+
+    def __init__(self, utilisateur_id):
+        self.utilisateur_id = utilisateur_id
+        self.boucle = asyncio.get_running_loop()
+        self.evenement = asyncio.Event()
+
+    def __enter__(self):
+        with _verrou:
+            _abonnes.setdefault(self.utilisateur_id, set()).add(self)
+            veilleur = _veilleurs.get(self.boucle)
+            if veilleur is None:
+                _veilleurs[self.boucle] = [self.boucle.create_task(_veiller()), 1]
+            else:
+                veilleur[1] += 1
+        return self
+
+    def __exit__(self, *exc):
+        with _verrou:
+            abonnements = _abonnes.get(self.utilisateur_id, set())
+            abonnements.discard(self)
+            if not abonnements:
+                _abonnes.pop(self.utilisateur_id, None)
+            veilleur = _veilleurs[self.boucle]
+            veilleur[1] -= 1
+            if not veilleur[1]:
+                # Plus aucun flux ouvert sur cette boucle : le veilleur s'arrête
+                del _veilleurs[self.boucle]
+                veilleur[0].cancel()
+
+    async def attendre(self, delai):
+        """True si réveillé avant ``delai`` secondes"""
+        try:
+            await asyncio.wait_for(self.evenement.wait(), delai)
+        except asyncio.TimeoutError:
+            return False
+        self.evenement.clear()
+        return True
+
+
+def publier(utilisateur_ids):
+    """Réveille les flux ouverts dans ce processus ; appelable depuis n'importe quel thread"""
+    with _verrou:
+        abonnements = [a for utilisateur_id in set(utilisateur_ids) for a in _abonnes.get(utilisateur_id, ())]
+    for abonnement in abonnements:
+        try:
+            abonnement.boucle.call_soon_threadsafe(abonnement.evenement.set)
+        except RuntimeError:
+            # Boucle déjà fermée : le flux se termine
+            pass
+
+
+async def _veiller():
+    """Réveille les flux des destinataires de notifications créées depuis la dernière scrutation"""
+    dernier = await dernier_identifiant()
+    while True:
+        await asyncio.sleep(getattr(settings, 'NOTIFICATIONS_SSE_SCRUTATION', 2))
+        nouvelles = [
+            ligne async for ligne in Notification.objects.filter(pk__gt=dernier).order_by('pk').values_list(
+                'pk', 'utilisateur_id'
+            )[:TAILLE_SCRUTATION]
+        ]
+        if nouvelles:
+            dernier = nouvelles[-1][0]
+            publier([utilisateur_id for _, utilisateur_id in nouvelles])
+
+
+def _evenement(nom, donnees, identifiant=None):
+    lignes = [f"event: {nom}"]
+    if identifiant is not None:
+        lignes.append(f"id: {identifiant}")
+    lignes.append(f"data: {json.dumps(donnees, ensure_ascii=False)}")
+    return "\n".join(lignes) + "\n\n"
+
+
+async def dernier_identifiant(utilisateur_id=None):
+    """Identifiant de la dernière notification de l'utilisateur (de toutes, sans utilisateur)"""
+    notifications = Notification.objects.all()
+    if utilisateur_id is not None:
+        notifications = notifications.filter(utilisateur_id=utilisateur_id)
+    resultat = await notifications.aaggregate(dernier=Max('pk'))
+    return resultat['dernier'] or 0
+
+
+async def flux(utilisateur_id, dernier):
+    """
+    Générateur asynchrone du flux SSE : notifications d'identifiant supérieur à ``dernier``
+    et compteur de non lues, à chaque réveil ou relecture périodique.
+    """
+    intervalle = getattr(settings, 'NOTIFICATIONS_SSE_INTERVALLE', 15)
+    fin = time.monotonic() + getattr(settings, 'NOTIFICATIONS_SSE_DUREE', 300)
+    compteur = None
+    with Abonnement(utilisateur_id) as abonnement:
+        yield f"retry: {getattr(settings, 'NOTIFICATIONS_SSE_REPRISE_MS', 3000)}\n\n"
+        while True:
+            nouvelles = [
+                notification async for notification in Notification.objects.filter(
+                    utilisateur_id=utilisateur_id, pk__gt=dernier
+                ).order_by('pk')[:TAILLE_LOT]
+            ]
+            for notification in nouvelles:
+                dernier = notification.pk
+                yield _evenement('notification', {
+                    'id': notification.pk,
+                    'message': notification.message,
+                    'type': notification.type_notification,
+                    'lue': notification.lue,
+                    'date': timezone.localtime(notification.date_creation).strftime('%d/%m/%Y %H:%M'),
+                }, identifiant=dernier)
+            non_lues = await Utilisateur.objects.filter(pk=utilisateur_id).values_list(
+                'notifications_non_lues', flat=True
+            ).afirst()
+            if non_lues is None:
+                return
+            if non_lues != compteur:
+                compteur = non_lues
+                yield _evenement('compteur', {'non_lues': compteur})
+            if len(nouvelles) == TAILLE_LOT:
+                continue
+
+            restant = fin - time.monotonic()
+            if restant <= 0:
+                return
+            if not await abonnement.attendre(min(intervalle, restant)):
+                # Commentaire SSE : garde la connexion ouverte à travers les proxys
+                yield ": ping\n\n"
@@ -1,3 +1,1155 @@
-from django.test import TestCase
+import asyncio
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import zipfile
+from datetime import date, timedelta
+from io import BytesIO, StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from django.core.cache import cache
+from django.core import mail
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.platypus import Paragraph
+
+from mission_manager import asgi
+
+from . import temps_reel
+from .indicateurs import reconstruire_indicateurs
+from .jeu_donnees import generer
+from .miniatures import chemin_miniature, url_miniature
+from .models import (
+    Client, DocumentRecherche, FichierStocke, IndicateurIntervention, Intervention, Mission, Notification,
+    NotificationArchivee, PieceJointe, RapportIntervention, RenduPDF, RetardIntervention, Televersement, Utilisateur,
+)
+from .pdf import (
+    DELAI_ABANDON, _DocumentFlux, demander_rendu, executer_rendu, interventions_par_lots, rendre_si_en_attente,
+    reserver_rendu,
+)
+from .permissions import can_view_intervention, filter_viewable
+from .metriques import exposition, incrementer, valeurs
+from .notifications import create_notification, destinataires, notify_many
+from .recherche import rechercher
+from .retards import detecter_retards
+from .retention import archiver_notifications, purger_archives
+from .stockage import collecter
+from .televersement import FichierTeleverse, chemin_partiel, creer_session
+from .temps_reel import dernier_identifiant, flux
+
+
+@override_settings(DASHBOARD_CACHE_TTL=0)
+class ListeNombreRequetesTests(TestCase):
+    """Les listes doivent coûter un nombre de requêtes constant, quel que soit le nombre de lignes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Utilisateur.objects.create_user(username='admin', password='x', role='administrateur')
+        cls.client_obj = Client.objects.create(
+            nom='Client', contact='Contact', email='client@example.com', telephone='0', adresse='Adresse'
+        )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def ajouter_lignes(self, nombre):
+        for i in range(nombre):
+            intervenant = Utilisateur.objects.create_user(
+                username=f'intervenant{Utilisateur.objects.count()}', password='x', role='employe'
+            )
+            mission = Mission.objects.create(
+                client=self.client_obj, titre=f'Mission {i}', description='d', nature='n',
+                date=date.today(), lieu='l', assigne_a=intervenant
+            )
+            intervention = Intervention.objects.create(
+                titre=f'Intervention {i}', mission=mission, intervenant=intervenant,
+                date=date.today(), date_echeance=date.today() + timedelta(days=1)
+            )
+            RapportIntervention.objects.create(intervention=intervention, statut='soumis')
+            RetardIntervention.objects.create(
+                intervention=intervention, type_retard='fin', date_debut_retard=intervention.date_creation,
+                motif='m', responsable=intervenant
+            )
+
+    def nombre_requetes(self, url):
+        with CaptureQueriesContext(connection) as requetes:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(requetes)
+
+    def test_nombre_requetes_constant(self):
+        urls = [reverse(nom) for nom in (
+            'dashboard', 'mission_list', 'intervention_list', 'retard_list', 'dashboard_retards', 'rapports_dashboard'
+        )]
+        self.ajouter_lignes(2)
+        avant = {url: self.nombre_requetes(url) for url in urls}
+        self.ajouter_lignes(8)
+        apres = {url: self.nombre_requetes(url) for url in urls}
+        self.assertEqual(avant, apres)
+
+
+class RechercheTests(TestCase):
+    """L'index de recherche suit les modifications et classe les résultats"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_obj = Client.objects.create(
+            nom='Société Électrique', contact='Contact', email='client@example.com', telephone='0', adresse='Adresse'
+        )
+        cls.mission = Mission.objects.create(
+            client=cls.client_obj, titre='Maintenance climatisation', description='Contrôle annuel', nature='n',
+            date=date.today(), lieu='l'
+        )
+        cls.autre = Mission.objects.create(
+            client=cls.client_obj, titre='Audit', description='Vérifier la climatisation', nature='n',
+            date=date.today(), lieu='l'
+        )
+        cls.intervention = Intervention.objects.create(
+            titre='Remplacement filtre', mission=cls.mission,
+            date=date.today(), date_echeance=date.today() + timedelta(days=1)
+        )
+
+    def test_tous_les_mots_sans_accents_dernier_en_prefixe(self):
+        self.assertEqual(rechercher('electrique', 'client'), [self.client_obj.pk])
+        self.assertEqual(rechercher('maintenance clim', 'mission'), [self.mission.pk])
+        self.assertEqual(rechercher('filtre inexistant', 'intervention'), [])
+
+    def test_titre_classe_avant_contenu(self):
+        self.assertEqual(rechercher('climatisation', 'mission'), [self.mission.pk, self.autre.pk])
+
+    def test_synchronisation_par_les_signaux(self):
+        RapportIntervention.objects.create(intervention=self.intervention, travaux_realises='Compresseur changé')
+        self.assertEqual(rechercher('compresseur', 'intervention'), [self.intervention.pk])
+
+        self.client_obj.nom = 'Acme'
+        self.client_obj.save()
+        self.assertEqual(rechercher('acme', 'intervention'), [self.intervention.pk])
+        self.assertEqual(rechercher('electrique', 'mission'), [])
+
+        self.intervention.delete()
+        self.assertEqual(rechercher('filtre', 'intervention'), [])
+
+    def test_perimetre_dans_la_requete(self):
+        employe = Utilisateur.objects.create_user(username='employe', password='x', role='employe')
+        self.assertEqual(rechercher('climatisation', 'mission', employe), [])
+        self.mission.assigne_a = employe
+        self.mission.save()
+        self.assertEqual(rechercher('climatisation', 'mission', employe), [self.mission.pk])
+        # Responsable de la mission sans être l'intervenant : l'intervention reste introuvable (visible_to)
+        self.assertEqual(rechercher('filtre', 'intervention', employe), [])
+        self.client.force_login(employe)
+        self.assertEqual(list(self.client.get(reverse('search'), {'q': 'filtre'}).context['results']['interventions']), [])
+        self.intervention.intervenant = employe
+        self.intervention.save()
+        self.assertEqual(rechercher('filtre', 'intervention', employe), [self.intervention.pk])
+        self.assertEqual(rechercher('electrique', 'client', employe), [self.client_obj.pk])
+
+    def test_pagination_au_dela_de_la_premiere_page(self):
+        admin = Utilisateur.objects.create_user(username='admin', password='x', role='administrateur')
+        for i in range(12):
+            Mission.objects.create(
+                client=self.client_obj, titre=f'Ronde {i}', description='d', nature='n', date=date.today(), lieu='l'
+            )
+        self.client.force_login(admin)
+        reponse = self.client.get(reverse('search'), {'q': 'ronde'})
+        page = reponse.context['results']['missions']
+        self.assertEqual(len(page), 10)
+        self.assertTrue(page.a_suivante)
+        suite = self.client.get(reverse('search') + page.url_suivante).context['results']['missions']
+        self.assertEqual(len(suite), 2)
+        self.assertFalse(suite.a_suivante)
+        self.assertFalse({m.pk for m in page} & {m.pk for m in suite})
+
+
+class VisibiliteTests(TestCase):
+    """Liste, tableaux de bord, fiche et rapports appliquent la même règle par rôle, en une requête pour un lot d'objets"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Utilisateur.objects.create_user(username='admin', password='x', role='administrateur')
+        cls.chef = Utilisateur.objects.create_user(username='chef', password='x', role='employe')
+        cls.freelance = Utilisateur.objects.create_user(username='freelance', password='x', role='freelance')
+        cls.employe = Utilisateur.objects.create_user(username='employe', password='x', role='employe')
+        client = Client.objects.create(
+            nom='Client', contact='Contact', email='client@example.com', telephone='0', adresse='Adresse'
+        )
+        cls.mission = Mission.objects.create(
+            client=client, titre='Dirigée', description='d', nature='n', date=date.today(), lieu='l', assigne_a=cls.chef
+        )
+        autre = Mission.objects.create(client=client, titre='Autre', description='d', nature='n', date=date.today(), lieu='l')
+        echeance = date.today() + timedelta(days=1)
+        cls.de_la_mission = Intervention.objects.create(
+            titre='Sur la mission', mission=cls.mission, intervenant=cls.freelance, date=date.today(), date_echeance=echeance
+        )
+        cls.confiee = Intervention.objects.create(
+            titre='Confiée', mission=autre, intervenant=cls.chef, date=date.today(), date_echeance=echeance
+        )
+        cls.assignee = Intervention.objects.create(
+            titre='Assignée', mission=autre, intervenant=cls.employe, date=date.today(), date_echeance=echeance
+        )
+        cls.etrangere = Intervention.objects.create(
+            titre='Étrangère', mission=autre, date=date.today(), date_echeance=echeance
+        )
+        cls.rapports = {
+            intervention: RapportIntervention.objects.create(intervention=intervention, travaux_realises='Fait')
+            for intervention in (cls.de_la_mission, cls.confiee, cls.assignee, cls.etrangere)
+        }
+
+    def contexte(self, utilisateur, url, cle):
+        self.client.force_login(utilisateur)
+        return set(self.client.get(url).context[cle])
+
+    def test_liste_des_interventions(self):
+        # Responsable d'une mission : seulement les interventions qui lui sont confiées, comme sur la fiche
+        attendu = {
+            self.admin: {self.de_la_mission, self.confiee, self.assignee, self.etrangere},
+            self.chef: {self.confiee},
+            self.freelance: {self.de_la_mission},
+            self.employe: {self.assignee},
+        }
+        for utilisateur, interventions in attendu.items():
+            with self.subTest(utilisateur=utilisateur.username):
+                self.assertEqual(self.contexte(utilisateur, reverse('intervention_list'), 'interventions'), interventions)
+                dashboard = self.contexte(utilisateur, reverse('dashboard'), 'interventions')
+                self.assertTrue(dashboard and dashboard <= interventions)
+
+    def test_fiche_intervention(self):
+        # Fiche : administrateur ou intervenant uniquement, y compris pour le responsable de la mission
+        for utilisateur, intervention, visible in (
+            (self.chef, self.de_la_mission, False),
+            (self.chef, self.confiee, True),
+            (self.freelance, self.de_la_mission, True),
+            (self.employe, self.etrangere, False),
+            (self.admin, self.etrangere, True),
+        ):
+            with self.subTest(utilisateur=utilisateur.username, intervention=intervention.titre):
+                self.client.force_login(utilisateur)
+                response = self.client.get(reverse('intervention_detail', args=[intervention.pk]))
+                self.assertEqual(response.status_code, 200 if visible else 302)
+                self.assertEqual(can_view_intervention(utilisateur, intervention), visible)
+
+    def test_tableau_de_bord_des_rapports(self):
+        attendu = {
+            self.admin: set(self.rapports.values()),
+            self.chef: {self.rapports[self.confiee]},
+            self.freelance: {self.rapports[self.de_la_mission]},
+            self.employe: {self.rapports[self.assignee]},
+        }
+        for utilisateur, rapports in attendu.items():
+            with self.subTest(utilisateur=utilisateur.username):
+                self.assertEqual(self.contexte(utilisateur, reverse('rapports_dashboard'), 'rapports'), rapports)
+
+    def test_visible_to(self):
+        self.assertEqual(set(Intervention.objects.visible_to(self.chef)), {self.confiee})
+        self.assertEqual(set(Intervention.objects.visible_to(self.freelance)), {self.de_la_mission})
+        self.assertEqual(Intervention.objects.visible_to(self.admin).count(), 4)
+        self.assertEqual(set(RapportIntervention.objects.visible_to(self.chef)), {self.rapports[self.confiee]})
+        self.assertEqual(list(Mission.objects.visible_to(self.chef)), [self.mission])
+
+    def test_filter_viewable_une_requete_par_modele(self):
+        objets = [self.etrangere, self.mission, self.confiee, self.de_la_mission]
+        with self.assertNumQueries(2):
+            visibles = filter_viewable(self.chef, objets)
+        self.assertEqual(visibles, [self.mission, self.confiee])
+
+
+@override_settings(AUTOCOMPLETION_CACHE_TTL=0)
+class AutocompletionTests(TestCase):
+    """Les suggestions portent sur le début de chaque mot et respectent le périmètre de l'utilisateur"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Utilisateur.objects.create_user(username='admin', password='x', role='administrateur')
+        cls.employe = Utilisateur.objects.create_user(
+            username='jdupont', password='x', role='employe', first_name='Jean', last_name='Dupont'
+        )
+        cls.client_obj = Client.objects.create(
+            nom='Société Générale', contact='Contact', email='client@example.com', telephone='0', adresse='Adresse'
+        )
+        cls.mission = Mission.objects.create(
+            client=cls.client_obj, titre='Audit réseau', description='d', nature='n', date=date.today(), lieu='l',
+            assigne_a=cls.employe
+        )
+        Mission.objects.create(
+            client=cls.client_obj, titre='Audit sécurité', description='d', nature='n', date=date.today(), lieu='l'
+        )
+
+    def suggestions(self, utilisateur, type_objet, texte):
+        self.client.force_login(utilisateur)
+        reponse = self.client.get(reverse('autocompletion'), {'type': type_objet, 'q': texte})
+        self.assertEqual(reponse.status_code, 200)
+        return [resultat['libelle'] for resultat in reponse.json()['resultats']]
+
+    def test_prefixe_de_chaque_mot(self):
+        self.assertEqual(self.suggestions(self.admin, 'client', 'gene'), ['Société Générale'])
+        self.assertEqual(self.suggestions(self.admin, 'client', 'SOCIETE G'), ['Société Générale'])
+        self.assertEqual(self.suggestions(self.admin, 'utilisateur', 'dup'), ['Jean Dupont (jdupont)'])
+        self.assertEqual(self.suggestions(self.admin, 'utilisateur', 'admin'), [])
+
+    def test_perimetre_des_missions(self):
+        self.assertEqual(self.suggestions(self.admin, 'mission', 'audit'), ['Audit réseau', 'Audit sécurité'])
+        self.assertEqual(self.suggestions(self.employe, 'mission', 'audit'), ['Audit réseau'])
+
+    def test_synchronisation_par_les_signaux(self):
+        self.client_obj.nom = 'Acme'
+        self.client_obj.save()
+        self.assertEqual(self.suggestions(self.admin, 'client', 'gene'), [])
+        self.assertEqual(self.suggestions(self.admin, 'client', 'acm'), ['Acme'])
+        self.mission.delete()
+        self.assertEqual(self.suggestions(self.admin, 'mission', 'audit'), ['Audit sécurité'])
+
+    def test_formulaire_sans_liste_complete(self):
+        self.client.force_login(self.admin)
+        reponse = self.client.get(reverse('mission_edit', args=[self.mission.pk]))
+        self.assertContains(reponse, 'value="Société Générale"')
+        self.assertNotContains(reponse, '<select name="client"')
+
+
+class TeleversementTests(TestCase):
+    """Un fichier envoyé par blocs, avec reprise, devient une pièce jointe sans nouvel envoi"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Utilisateur.objects.create_user(username='admin', password='x', role='administrateur')
+        client = Client.objects.create(
+            nom='Client', contact='Contact', email='client@example.com', telephone='0', adresse='Adresse'
+        )
+        mission = Mission.objects.create(client=client, titre='M', description='d', nature='n', date=date.today(), lieu='l')
+        cls.intervention = Intervention.objects.create(
+            titre='I', mission=mission, date=date.today(), date_echeance=date.today() + timedelta(days=1)
+        )
+
+    def setUp(self):
+        dossier = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, dossier)
+        reglages = override_settings(
+            MEDIA_ROOT=dossier, TELEVERSEMENT_DOSSIER=os.path.join(dossier, '.televersements'), TELEVERSEMENT_TAILLE_BLOC=4
+        )
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+        self.client.force_login(self.admin)
+
+    def envoyer(self, jeton, debut, donnees, total):
+        return self.client.generic(
+            'PUT', reverse('televersement_bloc', args=[jeton]), donnees, content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE=f'bytes {debut}-{debut + len(donnees) - 1}/{total}',
+            HTTP_X_CHECKSUM_SHA256=hashlib.sha256(donnees).hexdigest(),
+        )
+
+    def test_envoi_par_blocs_puis_piece_jointe(self):
+        contenu = b'0123456789'
+        session = self.client.post(reverse('televersement_creer'), {
+            'nom': 'video.mp4', 'taille': len(contenu), 'sha256': hashlib.sha256(contenu).hexdigest(),
+        }).json()
+        jeton = session['jeton']
+
+        self.assertEqual(self.envoyer(jeton, 0, contenu[:4], 10).json()['recu'], 4)
+        # Bloc déjà reçu renvoyé après une coupure : position de reprise
+        reponse = self.envoyer(jeton, 0, contenu[:4], 10)
+        self.assertEqual((reponse.status_code, reponse.json()['recu']), (409, 4))
+        # Bloc altéré en route
+        reponse = self.client.generic(
+            'PUT', reverse('televersement_bloc', args=[jeton]), b'XXXX', content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE='bytes 4-7/10', HTTP_X_CHECKSUM_SHA256=hashlib.sha256(contenu[4:8]).hexdigest(),
+        )
+        self.assertEqual((reponse.status_code, reponse.json()['recu']), (422, 4))
+        self.envoyer(jeton, 4, contenu[4:8], 10)
+        self.assertEqual(self.envoyer(jeton, 8, contenu[8:], 10).json()['statut'], 'termine')
+
+        def soumettre(titre):
+            self.client.post(reverse('piece_jointe_create', args=[self.intervention.pk]), {
+                'titre': titre, 'type_fichier': 'video', 'description': '', 'televersements': f'fichier:{jeton}',
+            })
+
+        # Formulaire refusé : le jeton n'est pas consommé et peut être soumis de nouveau
+        soumettre('')
+        self.assertFalse(self.intervention.pieces_jointes.exists())
+        inode = os.stat(chemin_partiel(Televersement.objects.get(jeton=jeton))).st_ino
+        soumettre('Vidéo')
+        piece = self.intervention.pieces_jointes.get()
+        with piece.fichier.open('rb') as fichier:
+            self.assertEqual(fichier.read(), contenu)
+        # Déplacé (renommé) dans le stockage, sans seconde écriture ; le jeton est consommé
+        self.assertEqual(os.stat(piece.fichier.path).st_ino, inode)
+        self.assertFalse(self.client.get(reverse('televersement_bloc', args=[jeton])).json()['disponible'])
+        soumettre('Vidéo')
+        self.assertEqual(self.intervention.pieces_jointes.count(), 1)
+
+    def test_fichier_partiel_purge(self):
+        jeton = self.client.post(reverse('televersement_creer'), {'nom': 'a.pdf', 'taille': 8}).json()['jeton']
+        os.remove(chemin_partiel(Televersement.objects.get(jeton=jeton)))
+        reponse = self.envoyer(jeton, 0, b'abcd', 8)
+        self.assertEqual((reponse.status_code, reponse.json()['statut']), (410, 'echec'))
+
+    def test_fichier_televerse_referme_apres_lecture(self):
+        session = creer_session(self.admin, 'a.txt', 4)
+        with open(chemin_partiel(session), 'wb') as partiel:
+            partiel.write(b'abcd')
+        fichier = FichierTeleverse(session)
+        self.assertTrue(fichier.closed)
+        self.assertEqual(b''.join(fichier.chunks()), b'abcd')
+        self.assertTrue(fichier.closed)
+        # Relu après fermeture (nouvelle tentative d'enregistrement)
+        self.assertEqual(b''.join(fichier.chunks()), b'abcd')
+        self.assertEqual(fichier.temporary_file_path(), chemin_partiel(session))
+
+    def test_empreinte_du_fichier_verifiee(self):
+        jeton = self.client.post(reverse('televersement_creer'), {
+            'nom': 'a.pdf', 'taille': 4, 'sha256': hashlib.sha256(b'autre').hexdigest(),
+        }).json()['jeton']
+        reponse = self.envoyer(jeton, 0, b'abcd', 4)
+        self.assertEqual((reponse.status_code, reponse.json()['statut']), (422, 'echec'))
+
+
+@override_settings(MINIATURES_ASYNCHRONE=False)
+class MiniaturesTests(TestCase):
+    """Les images téléversées ont des miniatures WebP/JPEG, référencées par les templates"""
+
+    def setUp(self):
+        dossier = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, dossier)
+        reglages = override_settings(MEDIA_ROOT=dossier)
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+
+    def test_miniatures_generees_et_supprimees(self):
+        tampon = BytesIO()
+        Image.new('RGB', (3000, 2000), 'red').save(tampon, 'JPEG')
+        utilisateur = Utilisateur.objects.create_user(username='photo', password='x', role='employe')
+        with self.captureOnCommitCallbacks(execute=True):
+            utilisateur.photo.save('profil.jpg', ContentFile(tampon.getvalue()))
+        storage = utilisateur.photo.storage
+        chemin = chemin_miniature(utilisateur.photo.name, 'vignette', 'webp')
+        self.assertTrue(storage.exists(chemin))
+        with storage.open(chemin_miniature(utilisateur.photo.name, 'apercu', 'jpg')) as fichier:
+            self.assertEqual(Image.open(fichier).size, (640, 427))
+        self.assertTrue(url_miniature(utilisateur.photo, 'vignette', 'webp').endswith('.jpg.webp'))
+
+        utilisateur.delete()
+        self.assertFalse(storage.exists(chemin))
+
+
+class StockageDedoublonneTests(TestCase):
+    """Un même contenu joint plusieurs fois n'est stocké qu'une fois, et supprimé quand plus rien n'y renvoie"""
+
+    def setUp(self):
+        dossier = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, dossier)
+        reglages = override_settings(MEDIA_ROOT=dossier)
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+        client_obj = Client.objects.create(nom='C', contact='c', email='c@example.com', telephone='0', adresse='a')
+        mission = Mission.objects.create(
+            client=client_obj, titre='M', description='d', nature='n', date=date.today(), lieu='l'
+        )
+        self.intervention = Intervention.objects.create(
+            titre='I', mission=mission, date=date.today(), date_echeance=date.today()
+        )
+
+    def joindre(self, nom, contenu):
+        piece = PieceJointe(intervention=self.intervention, titre=nom)
+        piece.fichier.save(nom, ContentFile(contenu))
+        return piece
+
+    def test_contenu_partage_puis_collecte(self):
+        premiere = self.joindre('devis.pdf', b'%PDF contenu')
+        seconde = self.joindre('copie du devis.pdf', b'%PDF contenu')
+        autre = self.joindre('devis.pdf', b'%PDF autre contenu')
+        self.assertEqual(premiere.fichier.name, seconde.fichier.name)
+        self.assertNotEqual(premiere.fichier.name, autre.fichier.name)
+        stocke = FichierStocke.objects.get(nom=premiere.fichier.name)
+        self.assertEqual((stocke.references, stocke.taille), (2, 12))
+        chemin = premiere.fichier.path
+
+        premiere.delete()
+        self.assertTrue(os.path.exists(chemin))
+        seconde.delete()
+        self.assertEqual(FichierStocke.objects.get(pk=stocke.pk).references, 0)
+        self.assertEqual(collecter(timedelta(hours=1)), (0, 0))
+        self.assertEqual(collecter(timedelta(0)), (1, 12))
+        self.assertFalse(os.path.exists(chemin))
+        self.assertTrue(os.path.exists(autre.fichier.path))
+
+    def test_ligne_recreee_fichier_depose_de_nouveau(self):
+        # Ligne collectée alors que le fichier est encore là : un nouvel envoi le réécrit
+        piece = self.joindre('devis.pdf', b'%PDF contenu')
+        FichierStocke.objects.filter(nom=piece.fichier.name).delete()
+        with open(piece.fichier.path, 'wb') as fichier:
+            fichier.write(b'tronque')
+        nouvelle = self.joindre('devis.pdf', b'%PDF contenu')
+        with open(nouvelle.fichier.path, 'rb') as fichier:
+            self.assertEqual(fichier.read(), b'%PDF contenu')
+
+
+@skipUnless(connection.features.has_select_for_update, "Verrous de ligne (select_for_update) indisponibles")
+class CollecteConcurrenteTests(TransactionTestCase):
+    """Un enregistrement du même contenu pendant une collecte attend sa fin, puis dépose de nouveau le fichier"""
+
+    def setUp(self):
+        dossier = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, dossier)
+        reglages = override_settings(MEDIA_ROOT=dossier)
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+        client_obj = Client.objects.create(nom='C', contact='c', email='c@example.com', telephone='0', adresse='a')
+        mission = Mission.objects.create(
+            client=client_obj, titre='M', description='d', nature='n', date=date.today(), lieu='l'
+        )
+        self.intervention = Intervention.objects.create(
+            titre='I', mission=mission, date=date.today(), date_echeance=date.today()
+        )
+
+    def joindre(self, contenu):
+        piece = PieceJointe(intervention=self.intervention, titre='devis.pdf')
+        piece.fichier.save('devis.pdf', ContentFile(contenu))
+        return piece
+
+    def test_enregistrement_pendant_la_collecte(self):
+        ancienne = self.joindre(b'%PDF contenu')
+        chemin = ancienne.fichier.path
+        ancienne.delete()
+        supprime, reprendre = threading.Event(), threading.Event()
+        suppression = os.remove
+
+        def supprimer(nom, *args, **kwargs):
+            suppression(nom, *args, **kwargs)
+            if nom == chemin:
+                # Fichier supprimé, ligne pas encore : la collecte s'interrompt en tenant le verrou
+                supprime.set()
+                reprendre.wait(10)
+
+        def dans_un_thread(fonction, resultat):
+            try:
+                resultat.append(fonction())
+            finally:
+                connection.close()
+
+        collecte, enregistrement = [], []
+        with mock.patch('core.stockage.os.remove', supprimer):
+            collecteur = threading.Thread(target=dans_un_thread, args=(lambda: collecter(timedelta(0)), collecte))
+            collecteur.start()
+            self.assertTrue(supprime.wait(10))
+            enregistreur = threading.Thread(
+                target=dans_un_thread, args=(lambda: self.joindre(b'%PDF contenu'), enregistrement)
+            )
+            enregistreur.start()
+            enregistreur.join(0.5)
+            self.assertTrue(enregistreur.is_alive())
+            reprendre.set()
+            collecteur.join(10)
+            enregistreur.join(10)
+
+        self.assertEqual(collecte, [(1, 12)])
+        self.assertEqual(enregistrement[0].fichier.path, chemin)
+        self.assertTrue(os.path.exists(chemin))
+        self.assertEqual(FichierStocke.objects.get(nom=enregistrement[0].fichier.name).references, 1)
+
+
+class MediaProtegeTests(TestCase):
+    """Les fichiers joints ne sont servis qu'aux utilisateurs qui voient l'intervention"""
+
+    def setUp(self):
+        dossier = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, dossier)
+        reglages = override_settings(MEDIA_ROOT=dossier, MEDIAS_ENVOI='')
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+        self.intervenant = Utilisateur.objects.create_user(username='intervenant', password='x', role='employe')
+        self.autre = Utilisateur.objects.create_user(username='autre', password='x', role='employe')
+        client_obj = Client.objects.create(nom='C', contact='c', email='c@example.com', telephone='0', adresse='a')
+        mission = Mission.objects.create(
+            client=client_obj, titre='M', description='d', nature='n', date=date.today(), lieu='l'
+        )
+        intervention = Intervention.objects.create(
+            titre='I', mission=mission, intervenant=self.intervenant, date=date.today(), date_echeance=date.today()
+        )
+        self.piece = PieceJointe(intervention=intervention, titre='Vidéo')
+        self.piece.fichier.save('visite.mp4', ContentFile(b'0123456789'))
+        self.url = self.piece.fichier.url
+
+    def test_droits_et_plages(self):
+        self.client.force_login(self.autre)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        self.assertEqual(self.client.get('/media/pieces_jointes/inconnu.pdf').status_code, 404)
+
+        self.client.force_login(self.intervenant)
+        reponse = self.client.get(self.url)
+        self.assertEqual(b''.join(reponse.streaming_content), b'0123456789')
+        self.assertEqual(reponse['Content-Type'], 'video/mp4')
+        reponse = self.client.get(self.url, HTTP_RANGE='bytes=2-5')
+        self.assertEqual(reponse.status_code, 206)
+        self.assertEqual(reponse['Content-Range'], 'bytes 2-5/10')
+        self.assertEqual(b''.join(reponse.streaming_content), b'2345')
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE='bytes=-3').status_code, 206)
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE='bytes=20-').status_code, 416)
+
+        with override_settings(MEDIAS_ENVOI='x-accel', MEDIAS_URL_INTERNE='/interne/'):
+            reponse = self.client.get(self.url)
+        self.assertEqual(reponse['X-Accel-Redirect'], '/interne/' + self.piece.fichier.name)
+        self.assertEqual(reponse.content, b'')
+
+
+class NotificationsGroupeesTests(TestCase):
+    """Une notification à tous les administrateurs coûte un nombre de requêtes constant"""
+
+    def setUp(self):
+        cache.clear()
+
+    def requetes_envoi(self):
+        with CaptureQueriesContext(connection) as requetes:
+            notify_many(destinataires('administrateur'), 'Nouveau rapport', 'nouveau_rapport_intervention')
+        return len(requetes)
+
+    def test_requetes_constantes_et_cache_invalide(self):
+        Utilisateur.objects.create_user(username='admin0', password='x', role='administrateur')
+        destinataires('administrateur')
+        peu = self.requetes_envoi()
+        for i in range(1, 8):
+            Utilisateur.objects.create_user(username=f'admin{i}', password='x', role='administrateur')
+        self.assertEqual(len(destinataires('administrateur')), 8)
+        self.assertEqual(self.requetes_envoi(), peu)
+
+        employe = Utilisateur.objects.get(username='admin7')
+        employe.role = 'employe'
+        employe.save()
+        self.assertNotIn(employe.pk, destinataires('administrateur'))
+        self.assertEqual(Notification.objects.filter(utilisateur=employe).count(), 1)
+        self.assertEqual(Utilisateur.objects.get(username='admin0').notifications_non_lues, 2)
+
+
+@override_settings(NOTIFICATIONS_SSE_INTERVALLE=30, NOTIFICATIONS_SSE_DUREE=30)
+class FluxNotificationsTests(TestCase):
+    """Le flux SSE est réveillé par la création d'une notification, sans attendre la relecture périodique"""
+
+    def notifier(self, utilisateur):
+        with self.captureOnCommitCallbacks(execute=True):
+            create_notification(utilisateur, 'Rapport validé', 'rapport_valide')
+
+    async def test_notification_poussee(self):
+        utilisateur = await Utilisateur.objects.acreate(username='flux', role='employe')
+        evenements = flux(utilisateur.pk, await dernier_identifiant(utilisateur.pk))
+        try:
+            self.assertTrue((await anext(evenements)).startswith('retry:'))
+            self.assertIn('"non_lues": 0', await anext(evenements))
+            suivant = asyncio.ensure_future(anext(evenements))
+            await asyncio.sleep(0.05)
+            await sync_to_async(self.notifier)(utilisateur)
+            evenement = await asyncio.wait_for(suivant, 5)
+            self.assertTrue(evenement.startswith('event: notification\nid: '))
+            self.assertIn('Rapport validé', evenement)
+            self.assertIn('"non_lues": 1', await asyncio.wait_for(anext(evenements), 5))
+        finally:
+            await evenements.aclose()
+
+    def test_pas_de_flux_sous_wsgi(self):
+        utilisateur = Utilisateur.objects.create_user(username='wsgi', password='x', role='employe')
+        self.client.force_login(utilisateur)
+        self.assertEqual(self.client.get(reverse('notifications_flux')).status_code, 204)
+
+    @override_settings(NOTIFICATIONS_SSE_SCRUTATION=0.05, NOTIFICATIONS_SSE_INTERVALLE=60)
+    async def test_notification_d_un_autre_processus(self):
+        # Créée sans passer par publier (autre worker, commande) : le veilleur réveille le flux
+        utilisateur = await Utilisateur.objects.acreate(username='veilleur', role='employe')
+        evenements = flux(utilisateur.pk, await dernier_identifiant(utilisateur.pk))
+        try:
+            await anext(evenements)
+            await anext(evenements)
+            suivant = asyncio.ensure_future(anext(evenements))
+            await asyncio.sleep(0.1)
+            await Notification.objects.acreate(utilisateur=utilisateur, message='Autre processus', type_notification='t')
+            self.assertIn('Autre processus', await asyncio.wait_for(suivant, 5))
+        finally:
+            await evenements.aclose()
+        self.assertEqual(temps_reel._veilleurs, {})
+
+    async def asgi_statut(self, chemin):
+        communicateur = ApplicationCommunicator(asgi.application, {
+            'type': 'http', 'method': 'GET', 'path': chemin, 'query_string': b'', 'headers': [],
+            'http_version': '1.1', 'scheme': 'http', 'server': ('testserver', 80),
+        })
+        await communicateur.send_input({'type': 'http.request', 'body': b''})
+        debut = await communicateur.receive_output(5)
+        await communicateur.wait(5)
+        return debut['status']
+
+    async def test_processus_asgi_limite_au_flux(self):
+        self.assertEqual(await self.asgi_statut(reverse('dashboard')), 404)
+        # Anonyme : la vue du flux redirige vers la connexion
+        self.assertEqual(await self.asgi_statut(reverse('notifications_flux')), 302)
+
+
+class RetentionNotificationsTests(TestCase):
+    """Seules les notifications lues et anciennes quittent la table, par lots"""
+
+    def test_archivage_puis_purge(self):
+        utilisateur = Utilisateur.objects.create_user(username='retention', password='x', role='employe')
+        il_y_a_60_jours = timezone.now() - timedelta(days=60)
+        for i in range(4):
+            Notification.objects.create(utilisateur=utilisateur, message=f'Ancienne {i}', type_notification='t', lue=True)
+        Notification.objects.create(
+            utilisateur=utilisateur, message='3 retards', type_notification='t', lue=True, nombre=3, cibles=[1, 2, 3]
+        )
+        Notification.objects.create(utilisateur=utilisateur, message='Non lue', type_notification='t')
+        Notification.objects.update(date_creation=il_y_a_60_jours)
+        Notification.objects.create(utilisateur=utilisateur, message='Récente', type_notification='t', lue=True)
+
+        self.assertEqual(archiver_notifications(timedelta(days=30), taille_lot=2), 5)
+        self.assertEqual(
+            sorted(Notification.objects.values_list('message', flat=True)), ['Non lue', 'Récente']
+        )
+        self.assertEqual(NotificationArchivee.objects.filter(date_creation=il_y_a_60_jours).count(), 5)
+        regroupee = NotificationArchivee.objects.get(message='3 retards')
+        self.assertEqual((regroupee.nombre, regroupee.cibles), (3, [1, 2, 3]))
+        self.assertEqual(purger_archives(timedelta(days=90)), 0)
+        self.assertEqual(purger_archives(timedelta(days=45), taille_lot=2), 5)
+
+
+@override_settings(NOTIFICATIONS_FENETRE_MINUTES=24 * 60, NOTIFICATIONS_DESTINATAIRES_CACHE_TTL=0)
+class NotificationsRegroupeesTests(TestCase):
+    """Les retards détectés dans une même fenêtre donnent une notification par destinataire"""
+
+    def test_retards_regroupes_et_resume(self):
+        admins = [
+            Utilisateur.objects.create_user(username=f'admin{i}', password='x', role='administrateur',
+                                            email=f'admin{i}@example.com')
+            for i in range(2)
+        ]
+        intervenant = Utilisateur.objects.create_user(username='intervenant', password='x', role='employe')
+        client_obj = Client.objects.create(nom='C', contact='c', email='c@example.com', telephone='0', adresse='a')
+        mission = Mission.objects.create(
+            client=client_obj, titre='M', description='d', nature='n', date=date.today(), lieu='l'
+        )
+        hier = date.today() - timedelta(days=1)
+        for i in range(3):
+            Intervention.objects.create(
+                titre=f'Intervention {i}', mission=mission, intervenant=intervenant, date=hier, date_echeance=hier
+            )
+        self.assertEqual(len(detecter_retards()), 3)
+        Intervention.objects.create(titre='Intervention 3', mission=mission, date=hier, date_echeance=hier)
+        self.assertEqual(len(detecter_retards()), 1)
+
+        resumes = Notification.objects.filter(type_notification='retard_automatique_admin')
+        self.assertEqual(resumes.count(), 2)
+        self.assertEqual(resumes.get(utilisateur=admins[0]).nombre, 4)
+        self.assertEqual(resumes.get(utilisateur=admins[0]).message, '4 interventions en retard automatique')
+        self.assertEqual(
+            Notification.objects.get(utilisateur=intervenant).message, '3 de vos interventions sont en retard'
+        )
+        self.assertEqual(Utilisateur.objects.get(pk=admins[0].pk).notifications_non_lues, 1)
+
+        call_command('envoyer_resumes_notifications', stdout=StringIO())
+        self.assertEqual(sorted(email.to[0] for email in mail.outbox), ['admin0@example.com', 'admin1@example.com'])
+        self.assertIn('4 événement(s)', mail.outbox[0].subject)
+
+
+@override_settings(PROFILAGE_SQL=False, PROFILAGE_SQL_PANNEAU=True, PROFILAGE_SQL_TOP=100, DEBUG=False)
+class ProfilageSQLTests(TestCase):
+    """Le profilage à la demande donne le bilan SQL et situe les requêtes dans les templates"""
+
+    def setUp(self):
+        self.admin = Utilisateur.objects.create_user(username='admin', password='x', role='administrateur')
+        client_obj = Client.objects.create(nom='C', contact='c', email='c@example.com', telephone='0', adresse='a')
+        mission = Mission.objects.create(
+            client=client_obj, titre='M', description='d', nature='n', date=date.today(), lieu='l'
+        )
+        intervention = Intervention.objects.create(
+            titre='I', mission=mission, date=date.today(), date_echeance=date.today()
+        )
+        self.retard = RetardIntervention.objects.create(
+            intervention=intervention, type_retard='fin', date_debut_retard=timezone.now(), motif='m'
+        )
+
+    def test_entete_journal_et_panneau(self):
+        url = reverse('retard_detail', args=[self.retard.pk])
+        self.client.force_login(self.admin)
+        self.assertNotIn('X-SQL-Requetes', self.client.get(url))
+
+        with self.assertLogs('core.profilage', 'INFO') as journal:
+            reponse = self.client.get(url, HTTP_X_PROFILAGE_SQL='1')
+        self.assertGreater(int(reponse['X-SQL-Requetes']), 0)
+        self.assertIn('db;dur=', reponse['Server-Timing'])
+        self.assertContains(reponse, 'id="profilage-sql"')
+        ligne = json.loads(journal.records[0].getMessage())
+        self.assertEqual(ligne['vue'], 'retard_detail')
+        # Toutes les requêtes figurent parmi les « lentes » (PROFILAGE_SQL_TOP) : origines vérifiables
+        origines = {requete['origine'] for requete in ligne['lentes']}
+        self.assertTrue(any(origine.startswith('core/retard_detail.html:') for origine in origines), origines)
+
+
+class MetriquesTests(TestCase):
+    """Les métriques de plusieurs processus s'additionnent dans /metrics"""
+
+    def setUp(self):
+        dossier = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, dossier)
+        reglages = override_settings(METRIQUES_DOSSIER=dossier, METRIQUES_JETON='secret')
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+        self.dossier = dossier
+
+    def test_agregation_et_exposition(self):
+        locales = valeurs().get(('televersement_octets_total', ()), 0)
+        # Fichier d'un autre worker
+        with open(os.path.join(self.dossier, '1.json'), 'w') as fichier:
+            json.dump([['televersement_octets_total', [], 1000]], fichier)
+        avant = valeurs()[('televersement_octets_total', ())]
+        self.assertEqual(avant, locales + 1000)
+        incrementer('televersement_octets_total', 24)
+        self.assertEqual(valeurs()[('televersement_octets_total', ())], avant + 24)
+        texte = exposition()
+        self.assertIn('# TYPE mission_manager_televersement_octets_total counter', texte)
+        self.assertIn(f'mission_manager_televersement_octets_total {avant + 24}\n', texte)
+
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        reponse = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+        texte = reponse.content.decode()
+        self.assertIn('# TYPE mission_manager_http_requete_duree_secondes histogram', texte)
+        self.assertIn('mission_manager_http_requete_duree_secondes_bucket{methode="GET",vue="metrics",le="+Inf"}', texte)
+        self.assertIn(f'mission_manager_televersement_octets_total {avant + 24}', texte)
+
+
+class BancEssaiTests(TestCase):
+    """Jeu de données synthétique et comparaison du banc d'essai à sa référence"""
+
+    def setUp(self):
+        dossier = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, dossier)
+        reglages = override_settings(MEDIA_ROOT=dossier)
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+        self.reference = os.path.join(dossier, 'reference.json')
+
+    def test_generation_et_regression(self):
+        bilan = generer(echelle=0.1, volumes={'missions_par_client': 2, 'interventions_par_mission': 5})
+        self.assertEqual(bilan['Intervention'], 5 * 10)
+        self.assertTrue(DocumentRecherche.objects.filter(type_objet='intervention').exists())
+        # Compteurs dénormalisés reconstruits malgré bulk_create
+        admin = Utilisateur.objects.filter(role='administrateur').first()
+        self.assertEqual(admin.notifications_non_lues, admin.notifications.filter(lue=False).count())
+
+        options = {'iterations': 1, 'echauffement': 1, 'reference': self.reference, 'stdout': StringIO()}
+        call_command('benchmark_vues', enregistrer=True, **options)
+        with open(self.reference) as fichier:
+            reference = json.load(fichier)
+        self.assertIn('check_retards_post', reference['scenarios'])
+        call_command('benchmark_vues', marge_ms=10000, **options)
+
+        # Une requête SQL de plus que la référence est une régression
+        reference['scenarios']['dashboard']['requetes'] -= 1
+        with open(self.reference, 'w') as fichier:
+            json.dump(reference, fichier)
+        with self.assertRaises(CommandError):
+            call_command('benchmark_vues', marge_ms=10000, stderr=StringIO(), **options)
+
+
+class AmorcageIndexTests(TestCase):
+    """benchmark_indexes --seed laisse des compteurs de notifications justes"""
+
+    def test_compteurs_apres_amorcage(self):
+        call_command('benchmark_indexes', seed=30, taille_lot=7, repetitions=1, stdout=StringIO())
+        for utilisateur in Utilisateur.objects.filter(username__startswith='bench_'):
+            self.assertEqual(utilisateur.notifications_non_lues, utilisateur.notifications.filter(lue=False).count())
+
+
+class IndicateursTests(TestCase):
+    """Les indicateurs tenus à jour par les signaux égalent une reconstruction complète"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.intervenants = [
+            Utilisateur.objects.create_user(username=f'intervenant{i}', password='x', role='employe') for i in range(2)
+        ]
+        cls.clients = [
+            Client.objects.create(nom=f'Client {i}', contact='c', email='c@example.com', telephone='0', adresse='a')
+            for i in range(2)
+        ]
+        cls.mission = Mission.objects.create(
+            client=cls.clients[0], titre='Mission', description='d', nature='n', date=date.today(), lieu='l'
+        )
+
+    def etat(self):
+        # Une ligne à zéro laissée par les variations équivaut à une ligne absente
+        return {
+            ligne.cle: (ligne.total, ligne.en_attente, ligne.en_cours, ligne.terminee, ligne.en_retard)
+            for ligne in IndicateurIntervention.objects.all() if ligne.total
+        }
+
+    def verifier(self):
+        incremental = self.etat()
+        reconstruire_indicateurs()
+        self.assertEqual(incremental, self.etat())
+
+    def creer(self, **champs):
+        return Intervention.objects.create(**{
+            'titre': 'Intervention', 'mission': self.mission, 'intervenant': self.intervenants[0],
+            'date': date.today(), 'date_echeance': date.today() + timedelta(days=1), **champs,
+        })
+
+    def test_creation_modification_suppression(self):
+        premiere = self.creer()
+        seconde = self.creer(intervenant=None, statut='en_cours')
+        self.creer(intervenant=self.intervenants[1], date=date.today() - timedelta(days=14))
+        self.verifier()
+
+        premiere.statut = 'terminee'
+        premiere.intervenant = self.intervenants[1]
+        premiere.date = date.today() - timedelta(days=7)
+        premiere.save()
+        seconde.en_retard = True
+        seconde.save()
+        self.verifier()
+
+        seconde.retard_resolu = True
+        seconde.save()
+        self.mission.client = self.clients[1]
+        self.mission.save()
+        self.verifier()
+
+        premiere.delete()
+        self.verifier()
+
+    def test_suppression_intervenant(self):
+        self.creer()
+        self.creer(statut='terminee')
+        self.creer(intervenant=None)
+        self.creer(intervenant=self.intervenants[1])
+        self.intervenants[0].delete()
+        self.assertEqual(IndicateurIntervention.objects.get(cle='intervenant:').total, 3)
+        self.verifier()
+
+
+class RenduPDFTests(TestCase):
+    """File des rendus PDF : cache par empreinte, invalidation, réservation et reprise"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.intervenant = Utilisateur.objects.create_user(username='intervenant', password='x', role='employe')
+        client = Client.objects.create(nom='Client', contact='c', email='c@example.com', telephone='0', adresse='a')
+        cls.mission = Mission.objects.create(
+            client=client, titre='Mission', description='d', nature='n', date=date.today(), lieu='l'
+        )
+        cls.intervention = Intervention.objects.create(
+            titre='Intervention', mission=cls.mission, intervenant=cls.intervenant,
+            date=date.today(), date_echeance=date.today() + timedelta(days=1)
+        )
+
+    def setUp(self):
+        dossier = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, dossier)
+        reglages = override_settings(MEDIA_ROOT=dossier)
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+
+    def rendre(self, type_document, objet_id):
+        return rendre_si_en_attente(demander_rendu(type_document, objet_id))
+
+    def test_cache_puis_nouveau_rendu_apres_modification(self):
+        premier = self.rendre('mission', self.mission.pk)
+        self.assertEqual(premier.statut, 'termine')
+        self.assertTrue(premier.fichier.storage.exists(premier.fichier.name))
+
+        # Données inchangées : deux lectures pour l'empreinte, une pour retrouver le rendu, aucune écriture
+        with self.assertNumQueries(3):
+            resservi = demander_rendu('mission', self.mission.pk)
+        self.assertEqual((resservi.pk, resservi.statut), (premier.pk, 'termine'))
+
+        # Modification d'une intervention (ou de son rapport) : rendu périmé et fichier supprimés
+        for modifier in (
+            lambda: Intervention.objects.filter(pk=self.intervention.pk).first().save(),
+            lambda: RapportIntervention.objects.create(intervention=self.intervention, travaux_realises='Fait'),
+        ):
+            rendu = self.rendre('mission', self.mission.pk)
+            with self.captureOnCommitCallbacks(execute=True):
+                modifier()
+            self.assertFalse(RenduPDF.objects.filter(pk=rendu.pk).exists())
+            self.assertFalse(rendu.fichier.storage.exists(rendu.fichier.name))
+
+        self.intervention.titre = 'Intervention modifiée'
+        self.intervention.save()
+        nouveau = demander_rendu('mission', self.mission.pk)
+        self.assertEqual(nouveau.statut, 'en_attente')
+        self.assertNotEqual(nouveau.empreinte, premier.empreinte)
+
+    def test_un_seul_worker_reserve_un_rendu(self):
+        rendu = demander_rendu('intervention', self.intervention.pk)
+        premier = reserver_rendu()
+        self.assertEqual(premier.pk, rendu.pk)
+        self.assertIsNone(reserver_rendu())
+        self.assertIsNone(reserver_rendu(rendu.pk))
+        self.assertTrue(executer_rendu(premier))
+
+    def test_reprise_d_un_rendu_abandonne(self):
+        demander_rendu('intervention', self.intervention.pk)
+        abandonne = reserver_rendu()
+        self.assertIsNone(reserver_rendu())
+
+        RenduPDF.objects.filter(pk=abandonne.pk).update(
+            date_debut=timezone.now() - DELAI_ABANDON - timedelta(minutes=1)
+        )
+        repris = reserver_rendu()
+        self.assertEqual(repris.pk, abandonne.pk)
+
+        # Le worker d'origine qui termine en retard ne remplace pas le rendu repris
+        self.assertFalse(executer_rendu(abandonne))
+        self.assertTrue(executer_rendu(repris))
+        repris.refresh_from_db()
+        self.assertEqual(repris.statut, 'termine')
+        self.assertTrue(repris.fichier.storage.exists(repris.fichier.name))
+
+
+class ExportMissionsTests(TestCase):
+    """Export ZIP : rendus par la file RenduPDF, missions filtrées, réservé aux administrateurs"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Utilisateur.objects.create_user(username='admin', password='x', role='administrateur')
+        cls.chef = Utilisateur.objects.create_user(username='chef', password='x', role='employe')
+        cls.employe = Utilisateur.objects.create_user(username='employe', password='x', role='employe')
+        cls.missions = {}
+        for nom in ('A', 'B'):
+            client = Client.objects.create(nom=nom, contact='c', email='c@example.com', telephone='0', adresse='a')
+            cls.missions[nom] = [
+                Mission.objects.create(client=client, titre=f'{nom}{i}', description='d', nature='n',
+                                       date=date.today(), lieu='l', assigne_a=cls.chef)
+                for i in range(2)
+            ]
+
+    def setUp(self):
+        dossier = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, dossier)
+        reglages = override_settings(MEDIA_ROOT=dossier)
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+
+    def exporter(self, **filtres):
+        return self.client.get(reverse('export_missions'), {'statut': '', **filtres})
+
+    def archive(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        return zipfile.ZipFile(BytesIO(b''.join(response.streaming_content)))
+
+    @override_settings(PDF_RENDU_ASYNCHRONE=False)
+    def test_archive_des_missions_filtrees(self):
+        self.client.force_login(self.admin)
+        archive = self.archive(self.exporter(client=self.missions['A'][0].client_id))
+        self.assertEqual(
+            sorted(archive.namelist()), sorted(f'rapport_mission_{m.pk}.pdf' for m in self.missions['A'])
+        )
+        for nom in archive.namelist():
+            self.assertTrue(archive.read(nom).startswith(b'%PDF'))
+        # Rendus déposés dans la file : un nouvel export les reprend du cache
+        self.assertEqual(RenduPDF.objects.filter(statut='termine').count(), 2)
+        self.assertEqual(len(self.archive(self.exporter()).namelist()), 4)
+        self.assertEqual(RenduPDF.objects.count(), 4)
+
+    @override_settings(PDF_RENDU_ASYNCHRONE=True)
+    def test_attente_du_worker(self):
+        self.client.force_login(self.admin)
+        response = self.exporter()
+        self.assertEqual(response.status_code, 202)
+        self.assertContains(response, '0 / 4', status_code=202)
+        # La requête ne rend rien elle-même : les rendus attendent le worker
+        self.assertEqual(RenduPDF.objects.filter(statut='en_attente').count(), 4)
+
+        call_command('render_pdfs', '--une-fois', stdout=StringIO())
+        RenduPDF.objects.filter(objet_id=self.missions['B'][1].pk).update(statut='echec', erreur='ValueError: boom')
+        archive = self.archive(self.exporter())
+        self.assertEqual(len(archive.namelist()), 4)
+        self.assertEqual(
+            archive.read('ERREURS.txt').decode(), f"Mission {self.missions['B'][1].pk} : ValueError: boom"
+        )
+
+    def test_reserve_aux_administrateurs(self):
+        self.assertRedirects(self.exporter(), reverse('connexion'), fetch_redirect_response=False)
+        for utilisateur in (self.chef, self.employe):
+            self.client.force_login(utilisateur)
+            self.assertEqual(self.exporter().status_code, 403)
+        self.assertFalse(RenduPDF.objects.exists())
+
+    def test_commande(self):
+        sortie = os.path.join(tempfile.mkdtemp(), 'export.zip')
+        self.addCleanup(shutil.rmtree, os.path.dirname(sortie))
+        call_command('export_missions_zip', sortie, '--processus', '1', stdout=StringIO())
+        with zipfile.ZipFile(sortie) as archive:
+            self.assertEqual(len(archive.namelist()), 4)
+        with self.assertRaisesMessage(CommandError, 'date invalide : 2026-13-01'):
+            call_command('export_missions_zip', sortie, '--du', '2026-13-01', stdout=StringIO())
+        with self.assertRaisesMessage(CommandError, 'La date de début doit précéder la date de fin.'):
+            call_command('export_missions_zip', sortie, '--du', '2026-02-01', '--au', '2026-01-01', stdout=StringIO())
+
+
+@override_settings(PDF_RENDU_ASYNCHRONE=False, MEDIAS_ENVOI='')
+class PDFMissionVolumineuseTests(TestCase):
+    """Le rapport d'une mission chargée se construit par pages d'interventions, sans tout garder en mémoire"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Utilisateur.objects.create_user(username='admin', password='x', role='administrateur')
+        client = Client.objects.create(nom='Client', contact='c', email='c@example.com', telephone='0', adresse='a')
+        cls.mission = Mission.objects.create(
+            client=client, titre='Mission', description='d', nature='n', date=date.today(), lieu='l'
+        )
+        # Dates répétées : la pagination doit départager sur l'identifiant
+        Intervention.objects.bulk_create([
+            Intervention(
+                titre=f'Intervention {i}', mission=cls.mission, intervenant=cls.admin,
+                date=date.today() - timedelta(days=i % 7), date_echeance=date.today()
+            )
+            for i in range(120)
+        ])
+
+    def setUp(self):
+        dossier = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, dossier)
+        reglages = override_settings(MEDIA_ROOT=dossier)
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+
+    def test_interventions_par_lots(self):
+        attendu = list(self.mission.interventions.order_by('-date', '-id').values_list('pk', flat=True))
+        # 5 pages de 25, puis une page vide
+        with self.assertNumQueries(6):
+            lues = [intervention.pk for intervention in interventions_par_lots(self.mission, taille_lot=25)]
+        self.assertEqual(lues, attendu)
+
+    def test_flowables_consommes_au_fil_de_l_eau(self):
+        traites = []
+        ecarts = []
+
+        def source():
+            for i in range(500):
+                ecarts.append(i - len(traites))
+                yield Paragraph(f'Ligne {i}', getSampleStyleSheet()['Normal'])
+
+        document = _DocumentFlux(BytesIO(), source(), tampon=10)
+        # Appelé aussi pour les flowables internes de ReportLab (sauts de page...)
+        document.afterFlowable = lambda flowable: isinstance(flowable, Paragraph) and traites.append(flowable)
+        document.construire()
+        self.assertEqual(len(traites), 500)
+        self.assertLessEqual(max(ecarts), 11)
+
+    def test_reponse_complete(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('generer_pdf_mission', args=[self.mission.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        contenu = b''.join(response.streaming_content)
+        self.assertEqual(int(response['Content-Length']), len(contenu))
+        self.assertTrue(contenu.startswith(b'%PDF'))
+        # 120 tables d'intervention : plusieurs pages
+        self.assertGreater(len(re.findall(rb'/Type /Page\b(?!s)', contenu)), 10)
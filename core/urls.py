@@ -6,12 +6,12 @@ from .views import (
     client_list, client_create, client_edit, client_delete,
     mission_list, mission_detail, mission_create, mission_edit, mission_delete,
     intervention_list, intervention_detail, intervention_create, intervention_edit, intervention_delete,
-    piece_jointe_create, piece_jointe_delete,
-    rapports_dashboard, rapport_mission, generer_pdf_mission,
+    piece_jointe_create, piece_jointe_delete, televersement_creer, televersement_bloc, metrics,
+    rapports_dashboard, rapport_mission, generer_pdf_mission, export_missions,
     rapport_intervention, generer_pdf_intervention,
     rapport_intervention_create, rapport_intervention_edit, rapport_intervention_validate,
-    notification_list, notification_mark_read, notification_mark_all_read, notification_delete,
-    search, user_list, user_create,
+    notification_list, notification_mark_read, notification_mark_all_read, notification_delete, notifications_flux,
+    search, autocompletion, user_list, user_create,
     profil_utilisateur,
     intervention_compte_rendu,
     rapport_intervention_submit,
@@ -56,11 +56,14 @@ urlpatterns = [
     # URLs Pièces jointes
     path('interventions/<int:intervention_id>/pieces-jointes/ajouter/', piece_jointe_create, name='piece_jointe_create'),
     path('pieces-jointes/<int:piece_jointe_id>/supprimer/', piece_jointe_delete, name='piece_jointe_delete'),
+    path('televersements/', televersement_creer, name='televersement_creer'),
+    path('televersements/<uuid:jeton>/', televersement_bloc, name='televersement_bloc'),
     
     # URLs Rapports
     path('rapports/', rapports_dashboard, name='rapports_dashboard'),
     path('missions/<int:mission_id>/rapport/', rapport_mission, name='rapport_mission'),
     path('missions/<int:mission_id>/rapport/pdf/', generer_pdf_mission, name='generer_pdf_mission'),
+    path('rapports/export/', export_missions, name='export_missions'),
     path('interventions/<int:intervention_id>/rapport/', rapport_intervention, name='rapport_intervention'),
     path('interventions/<int:intervention_id>/rapport/pdf/', generer_pdf_intervention, name='generer_pdf_intervention'),
     path('interventions/<int:intervention_id>/rapport/creer/', rapport_intervention_create, name='rapport_intervention_create'),
@@ -83,9 +86,12 @@ urlpatterns = [
     path('notifications/<int:notification_id>/lire/', notification_mark_read, name='notification_mark_read'),
     path('notifications/tout-lire/', notification_mark_all_read, name='notification_mark_all_read'),
     path('notifications/<int:notification_id>/supprimer/', notification_delete, name='notification_delete'),
+    path('notifications/flux/', notifications_flux, name='notifications_flux'),
+    path('metrics', metrics, name='metrics'),
     
     # URL Recherche
     path('recherche/', search, name='search'),
+    path('autocompletion/', autocompletion, name='autocompletion'),
 ]
 
 urlpatterns += [
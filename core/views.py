@@ -1,29 +1,34 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, Http404, StreamingHttpResponse
 from django.template.loader import get_template
 from django.conf import settings
 from django.views import View
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
+from django.core.handlers.asgi import ASGIRequest
 from .forms import InterventionForm, PieceJointeForm, RapportInterventionForm, RapportValidationForm
 from .forms import RetardInterventionForm, RetardResolutionForm, InterventionRetardForm
 from .models import Client, Mission, Intervention, PieceJointe, RapportIntervention, RapportFichierJoint
 from .models import Utilisateur, RetardIntervention
 from .permissions import admin_required, employe_required, is_admin, can_view_mission, can_view_intervention
+from .retards import detecter_retards, interventions_a_signaler
+from .notifications import create_notification, destinataires, marquer_lues, notify_many, supprimer_notification
+from .pagination import paginer_par_curseur
+from .statistiques import statistiques_dashboard, statistiques_retards, indicateurs_par_dimension
+from .pdf import demander_rendu, rendre_si_en_attente
+from .export import archiver_rendus, missions_a_exporter
+from .recherche import paginer_recherche
+from .autocompletion import MODELES as TYPES_AUTOCOMPLETION, suggerer
+from .metriques import exposition
+from .medias import nom_valide, peut_consulter, reponse_fichier
+from .temps_reel import dernier_identifiant, flux
+from .televersement import ErreurTeleversement, creer_session, etat, fichiers_televerses, recevoir_bloc
+from .models import Televersement
 import os
-from io import BytesIO
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.lib.units import inch
-from reportlab.lib import colors
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 from datetime import datetime, timedelta
 from .models import Notification
-from django.db import models
 from .forms import UtilisateurCreationForm
 from django.core.exceptions import PermissionDenied
 from .forms import UtilisateurProfilForm
@@ -32,10 +37,13 @@ from django.utils import timezone
 from django.contrib.auth.models import User
 from django.contrib.auth.tokens import default_token_generator
 from django.utils.http import urlsafe_base64_encode
+from django.utils.crypto import constant_time_compare
 from django.utils.encoding import force_bytes
 from django.urls import reverse
 from django.core.mail import send_mail
 from .forms import PasswordResetByUsernameForm
+from .forms import ExportMissionsForm
+from .forms import AutocompletionWidget
 import random
 from django.contrib.auth.hashers import make_password
 
@@ -49,39 +57,24 @@ def dashboard(request):
     user = request.user
     unread_notifications_count = get_unread_notifications_count(request)
     
-    if is_admin(user):
-        # Dashboard administrateur - toutes les missions et interventions
-        missions = Mission.objects.all().order_by('-date_creation')[:2]
-        interventions = Intervention.objects.all().order_by('-date_creation')[:2]
-        total_missions = Mission.objects.count()
-        total_interventions = Intervention.objects.count()
-        missions_en_cours = Mission.objects.filter(statut='en_cours').count()
-        interventions_en_cours = Intervention.objects.filter(statut='en_cours').count()
-    else:
-        # Dashboard employé/freelance - seulement ses missions et interventions
-        missions = Mission.objects.filter(assigne_a=user).order_by('-date_creation')[:2]
-        interventions = Intervention.objects.filter(intervenant=user).order_by('-date_creation')[:2]
-        total_missions = Mission.objects.filter(assigne_a=user).count()
-        total_interventions = Intervention.objects.filter(intervenant=user).count()
-        missions_en_cours = Mission.objects.filter(assigne_a=user, statut='en_cours').count()
-        interventions_en_cours = Intervention.objects.filter(intervenant=user, statut='en_cours').count()
+    # Administrateur : toutes les missions et interventions ; employé/freelance : les siennes
+    missions = Mission.objects.visible_to(user).for_list().order_by('-date_creation')[:2]
+    interventions = Intervention.objects.visible_to(user).for_list().order_by('-date_creation')[:2]
     
     context = {
         'user': user,
         'role': user.role,
         'missions': missions,
         'interventions': interventions,
-        'total_missions': total_missions,
-        'total_interventions': total_interventions,
-        'missions_en_cours': missions_en_cours,
-        'interventions_en_cours': interventions_en_cours,
         'unread_notifications_count': unread_notifications_count,
+        # total_missions, total_interventions, missions_en_cours, interventions_en_cours
+        **statistiques_dashboard(user, is_admin(user)),
     }
     return render(request, 'core/dashboard.html', context)
 
 @login_required
 def client_list(request):
-    clients = Client.objects.all().order_by('-id')
+    clients = paginer_par_curseur(request, Client.objects.all(), ('-id',))
     context = {
         'clients': clients,
         'user': request.user,
@@ -145,12 +138,9 @@ def client_delete(request, client_id):
 def mission_list(request):
     user = request.user
     
-    if is_admin(user):
-        # Administrateur voit toutes les missions
-        missions = Mission.objects.all().order_by('-date_creation')
-    else:
-        # Employé/freelance ne voit que ses missions assignées
-        missions = Mission.objects.filter(assigne_a=user).order_by('-date_creation')
+    # Administrateur : toutes les missions ; employé/freelance : ses missions assignées
+    missions = Mission.objects.visible_to(user)
+    missions = paginer_par_curseur(request, missions.for_list(), ('-date_creation', '-id'))
     
     context = {
         'missions': missions,
@@ -173,6 +163,19 @@ def mission_detail(request, mission_id):
     }
     return render(request, 'core/mission_detail.html', context)
 
+def champs_mission_autocompletion(mission=None):
+    """Champs client et assigné du formulaire de mission, à suggestions plutôt qu'en listes complètes"""
+    return {
+        'champ_client': AutocompletionWidget('client').render(
+            'client', mission.client_id if mission else None,
+            attrs={'id': 'client', 'class': 'form-input', 'placeholder': 'Sélectionner un client', 'required': True}
+        ),
+        'champ_assigne_a': AutocompletionWidget('utilisateur').render(
+            'assigne_a', mission.assigne_a_id if mission else None,
+            attrs={'id': 'assigne_a', 'class': 'form-input', 'placeholder': 'Sélectionner un utilisateur'}
+        ),
+    }
+
 @login_required
 def mission_create(request):
     if request.method == 'POST':
@@ -212,11 +215,8 @@ def mission_create(request):
         
         return redirect('mission_list')
     
-    clients = Client.objects.all()
-    utilisateurs = Utilisateur.objects.filter(role__in=['employe', 'freelance'])
     context = {
-        'clients': clients,
-        'utilisateurs': utilisateurs,
+        **champs_mission_autocompletion(),
         'user': request.user,
     }
     return render(request, 'core/mission_form.html', context)
@@ -263,12 +263,9 @@ def mission_edit(request, mission_id):
             )
         return redirect('mission_list')
     
-    clients = Client.objects.all()
-    utilisateurs = Utilisateur.objects.filter(role__in=['employe', 'freelance'])
     context = {
         'mission': mission,
-        'clients': clients,
-        'utilisateurs': utilisateurs,
+        **champs_mission_autocompletion(mission),
         'user': request.user,
     }
     return render(request, 'core/mission_form.html', context)
@@ -284,16 +281,9 @@ def mission_delete(request, mission_id):
 @login_required
 def intervention_list(request):
     user = request.user
-    if is_admin(user):
-        # Administrateur voit toutes les interventions
-        interventions = Intervention.objects.all().order_by('-date')
-    elif Mission.objects.filter(assigne_a=user).exists():
-        # Chef de projet : voit les interventions de ses missions (créées ou assignées à lui ou à d'autres)
-        missions_ids = Mission.objects.filter(assigne_a=user).values_list('id', flat=True)
-        interventions = Intervention.objects.filter(mission_id__in=missions_ids).order_by('-date')
-    else:
-        # Employé/freelance : ne voit que ses interventions assignées
-        interventions = Intervention.objects.filter(intervenant=user).order_by('-date')
+    # Administrateur : toutes les interventions ; employé/freelance : celles qui lui sont confiées
+    interventions = Intervention.objects.visible_to(user)
+    interventions = paginer_par_curseur(request, interventions.for_list(), ('-date', '-id'))
     context = {
         'interventions': interventions,
         'user': request.user,
@@ -341,7 +331,7 @@ def intervention_create(request):
 
     if request.method == 'POST':
         form = InterventionForm(request.POST)
-        formset = PieceJointeFormSet(request.POST, request.FILES, queryset=PieceJointe.objects.none())
+        formset = PieceJointeFormSet(request.POST, fichiers_televerses(request), queryset=PieceJointe.objects.none())
         if form.is_valid() and formset.is_valid():
             intervention = form.save(commit=False)
             intervention.cree_par = request.user
@@ -441,7 +431,7 @@ def piece_jointe_create(request, intervention_id):
     intervention = get_object_or_404(Intervention, id=intervention_id)
     
     if request.method == 'POST':
-        form = PieceJointeForm(request.POST, request.FILES)
+        form = PieceJointeForm(request.POST, fichiers_televerses(request))
         if form.is_valid():
             piece_jointe = form.save(commit=False)
             piece_jointe.intervention = intervention
@@ -474,30 +464,30 @@ def piece_jointe_delete(request, piece_jointe_id):
 def rapports_dashboard(request):
     """Vue pour afficher le dashboard des rapports pour l'utilisateur connecté"""
     user = request.user
-    rapports = []
+    # Administrateur : tous les rapports ; intervenant : ceux de ses interventions
+    rapports = RapportIntervention.objects.visible_to(user).for_list()
     if user.role in ['employe', 'freelance']:
-        # L'intervenant ne voit que ses rapports
-        rapports = RapportIntervention.objects.filter(
-            intervention__intervenant=user,
-            statut__in=['brouillon', 'soumis', 'rejete', 'valide']
-        ).select_related('intervention', 'intervention__mission').order_by('-date_creation')
         missions = None
     else:
-        # L'admin voit tout
-        rapports = RapportIntervention.objects.all().select_related('intervention', 'intervention__mission').order_by('-date_creation')
-        missions = Mission.objects.all().order_by('-date_creation')
+        # L'admin voit aussi la liste des missions
+        missions = paginer_par_curseur(
+            request, Mission.objects.visible_to(user).for_list(), ('-date_creation', '-id'), prefixe='missions_'
+        )
+    rapports = paginer_par_curseur(request, rapports, ('-date_creation', '-id'), prefixe='rapports_')
     context = {
         'rapports': rapports,
         'missions': missions,
         'user': user,
     }
+    if is_admin(user):
+        context.update(indicateurs_par_dimension())
     return render(request, 'core/rapports_dashboard.html', context)
 
 @login_required
 def rapport_mission(request, mission_id):
     """Vue pour afficher le rapport d'une mission spécifique"""
     mission = get_object_or_404(Mission, id=mission_id)
-    interventions = mission.interventions.all().order_by('-date')
+    interventions = mission.interventions.select_related('intervenant').order_by('-date')
     
     context = {
         'mission': mission,
@@ -559,8 +549,8 @@ def rapport_intervention_create(request, intervention_id):
                 messages.info(request, 'Rapport enregistré en brouillon.')
             rapport.save()
             
-            # Gérer les fichiers uploadés
-            preuves = request.FILES.getlist('preuves')
+            # Gérer les fichiers uploadés (envoi classique ou téléversement fragmenté)
+            preuves = fichiers_televerses(request).getlist('preuves')
             print(f"Nombre de fichiers uploadés: {len(preuves)}")
             for preuve in preuves:
                 try:
@@ -625,8 +615,8 @@ def rapport_intervention_edit(request, intervention_id):
                 messages.info(request, 'Rapport enregistré en brouillon.')
             rapport.save()
             
-            # Gérer les fichiers uploadés
-            preuves = request.FILES.getlist('preuves')
+            # Gérer les fichiers uploadés (envoi classique ou téléversement fragmenté)
+            preuves = fichiers_televerses(request).getlist('preuves')
             print(f"Nombre de fichiers uploadés: {len(preuves)}")
             for preuve in preuves:
                 try:
@@ -751,14 +741,12 @@ def rapport_intervention_submit(request, intervention_id):
             rapport.rejete_par = None
             rapport.date_validation = None
         rapport.save()
-        # Notifier tous les administrateurs
-        admins = Utilisateur.objects.filter(role='administrateur')
-        for admin in admins:
-            create_notification(
-                admin,
-                f"Nouveau rapport d'intervention soumis pour la mission : {intervention.mission.titre}",
-                "nouveau_rapport_intervention"
-            )
+        # Notifier tous les administrateurs (un seul INSERT, liste des administrateurs en cache)
+        notify_many(
+            destinataires('administrateur'),
+            f"Nouveau rapport d'intervention soumis pour la mission : {intervention.mission.titre}",
+            "nouveau_rapport_intervention"
+        )
         messages.success(request, 'Rapport soumis avec succès. Il est maintenant en attente de validation.')
         return redirect('rapport_intervention', intervention_id=intervention.id)
     context = {
@@ -768,207 +756,69 @@ def rapport_intervention_submit(request, intervention_id):
     }
     return render(request, 'core/rapport_intervention_submit.html', context)
 
+def servir_rendu_pdf(request, type_document, objet_id, retour):
+    """Sert le PDF déjà rendu pour l'état actuel de l'objet, ou affiche l'attente du rendu"""
+    rendu = demander_rendu(type_document, objet_id, request.user, relancer='relancer' in request.GET)
+    if not settings.PDF_RENDU_ASYNCHRONE:
+        rendu = rendre_si_en_attente(rendu) or rendu
+    if rendu.statut == 'termine':
+        return reponse_fichier(request, rendu.fichier.name, rendu.fichier.storage, as_attachment=True,
+                               filename=rendu.nom_fichier, content_type='application/pdf')
+    return render(request, 'core/pdf_en_attente.html', {'rendu': rendu, 'retour': retour}, status=202)
+
 @login_required
 def generer_pdf_mission(request, mission_id):
-    """Génère un PDF pour une mission spécifique"""
+    """Génère un PDF pour une mission spécifique (rendu par la commande render_pdfs)"""
     mission = get_object_or_404(Mission, id=mission_id)
-    interventions = mission.interventions.all().order_by('-date')
-    
-    # Créer le PDF
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4)
-    styles = getSampleStyleSheet()
-    story = []
-    
-    # Titre du rapport
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        spaceAfter=30,
-        alignment=TA_CENTER,
-        textColor=colors.darkblue
-    )
-    story.append(Paragraph(f"Rapport de Mission: {mission.titre}", title_style))
-    story.append(Spacer(1, 20))
-    
-    # Informations de la mission
-    mission_data = [
-        ['Client:', mission.client.nom],
-        ['Titre:', mission.titre],
-        ['Description:', mission.description],
-        ['Nature:', mission.nature],
-        ['Date de début:', mission.date.strftime('%d/%m/%Y')],
-        ['Lieu:', mission.lieu],
-        ['Fréquence:', mission.frequence or 'Non spécifiée'],
-        ['Assigné à:', f"{mission.assigne_a.first_name} {mission.assigne_a.last_name}" if mission.assigne_a else 'Non assigné'],
-        ['Statut:', mission.get_statut_display()],
-        ['Date de création:', mission.date_creation.strftime('%d/%m/%Y à %H:%M')],
-    ]
-    
-    mission_table = Table(mission_data, colWidths=[2*inch, 4*inch])
-    mission_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),
-        ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-    ]))
-    story.append(mission_table)
-    story.append(Spacer(1, 20))
-    
-    # Interventions
-    if interventions:
-        story.append(Paragraph("Interventions réalisées:", styles['Heading2']))
-        story.append(Spacer(1, 10))
-        
-        for intervention in interventions:
-            intervention_data = [
-                ['Titre:', intervention.titre],
-                ['Date:', intervention.date.strftime('%d/%m/%Y')],
-                ['Lieu:', intervention.lieu],
-                ['Intervenant:', f"{intervention.intervenant.first_name} {intervention.intervenant.last_name}" if intervention.intervenant else 'Non spécifié'],
-                ['Statut:', intervention.get_statut_display()],
-                ['Compte rendu:', intervention.compte_rendu or 'Aucun compte rendu'],
-                ['Ressources utilisées:', intervention.ressources_utilisees or 'Aucune ressource spécifiée'],
-            ]
-            
-            intervention_table = Table(intervention_data, colWidths=[2*inch, 4*inch])
-            intervention_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (0, -1), colors.lightblue),
-                ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 0), (-1, -1), 9),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ]))
-            story.append(intervention_table)
-            story.append(Spacer(1, 10))
-    else:
-        story.append(Paragraph("Aucune intervention réalisée pour cette mission.", styles['Normal']))
-    
-    # Générer le PDF
-    doc.build(story)
-    
-    # Préparer la réponse
-    pdf = buffer.getvalue()
-    buffer.close()
-    
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="rapport_mission_{mission.id}.pdf"'
-    response.write(pdf)
-    return response
+    return servir_rendu_pdf(request, 'mission', mission.id, reverse('rapport_mission', args=[mission.id]))
 
 @login_required
 def generer_pdf_intervention(request, intervention_id):
-    """Génère un PDF pour une intervention spécifique"""
+    """Génère un PDF pour une intervention spécifique (rendu par la commande render_pdfs)"""
     intervention = get_object_or_404(Intervention, id=intervention_id)
-    pieces_jointes = intervention.pieces_jointes.all()
-    
-    # Créer le PDF
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4)
-    styles = getSampleStyleSheet()
-    story = []
-    
-    # Titre du rapport
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        spaceAfter=30,
-        alignment=TA_CENTER,
-        textColor=colors.darkblue
+    return servir_rendu_pdf(
+        request, 'intervention', intervention.id, reverse('rapport_intervention', args=[intervention.id])
     )
-    story.append(Paragraph(f"Rapport d'Intervention: {intervention.titre}", title_style))
-    story.append(Spacer(1, 20))
-    
-    # Informations de l'intervention
-    intervention_data = [
-        ['Mission:', intervention.mission.titre],
-        ['Titre:', intervention.titre],
-        ['Date:', intervention.date.strftime('%d/%m/%Y')],
-        ['Lieu:', intervention.lieu],
-        ['Intervenant:', f"{intervention.intervenant.first_name} {intervention.intervenant.last_name}" if intervention.intervenant else 'Non spécifié'],
-        ['Statut:', intervention.get_statut_display()],
-        ['Date de création:', intervention.date_creation.strftime('%d/%m/%Y à %H:%M')],
-        ['Date de clôture:', intervention.date_cloture.strftime('%d/%m/%Y à %H:%M') if intervention.date_cloture else 'Non clôturée'],
-    ]
-    
-    intervention_table = Table(intervention_data, colWidths=[2*inch, 4*inch])
-    intervention_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),
-        ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-    ]))
-    story.append(intervention_table)
-    story.append(Spacer(1, 20))
-    
-    # Compte rendu
-    story.append(Paragraph("Compte rendu:", styles['Heading2']))
-    story.append(Paragraph(intervention.compte_rendu or 'Aucun compte rendu disponible.', styles['Normal']))
-    story.append(Spacer(1, 20))
-    
-    # Ressources utilisées
-    story.append(Paragraph("Ressources utilisées:", styles['Heading2']))
-    story.append(Paragraph(intervention.ressources_utilisees or 'Aucune ressource spécifiée.', styles['Normal']))
-    story.append(Spacer(1, 20))
-    
-    # Pièces jointes
-    if pieces_jointes:
-        story.append(Paragraph("Pièces jointes:", styles['Heading2']))
-        story.append(Spacer(1, 10))
-        
-        pieces_data = [['Titre', 'Type', 'Description', 'Date d\'ajout']]
-        for piece in pieces_jointes:
-            pieces_data.append([
-                piece.titre,
-                piece.get_type_fichier_display(),
-                piece.description or 'Aucune description',
-                piece.date_ajout.strftime('%d/%m/%Y')
-            ])
-        
-        pieces_table = Table(pieces_data, colWidths=[1.5*inch, 1*inch, 2*inch, 1*inch])
-        pieces_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.lightblue),
-            ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 8),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ]))
-        story.append(pieces_table)
-    else:
-        story.append(Paragraph("Aucune pièce jointe disponible.", styles['Normal']))
-    
-    # Générer le PDF
-    doc.build(story)
-    
-    # Préparer la réponse
-    pdf = buffer.getvalue()
-    buffer.close()
-    
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="rapport_intervention_{intervention.id}.pdf"'
-    response.write(pdf)
-    return response 
+
+@admin_required
+def export_missions(request):
+    """
+    Export ZIP des rapports PDF des missions filtrées (client, période, statut). Les rendus
+    passent par la file RenduPDF (commande render_pdfs) : la page d'attente se recharge
+    jusqu'à ce qu'ils soient tous traités, puis l'archive est assemblée au fil de l'eau.
+    """
+    form = ExportMissionsForm(request.GET or None)
+    if form.is_bound and form.is_valid():
+        filtres = form.cleaned_data
+        mission_ids = list(missions_a_exporter(
+            filtres['client'], filtres['date_debut'], filtres['date_fin'], filtres['statut']
+        ).values_list('id', flat=True))
+        if not mission_ids:
+            messages.warning(request, "Aucune mission ne correspond à ces critères.")
+            return render(request, 'core/export_missions.html', {'form': form})
+
+        relancer = 'relancer' in request.GET
+        rendus = [demander_rendu('mission', mission_id, request.user, relancer) for mission_id in mission_ids]
+        if not settings.PDF_RENDU_ASYNCHRONE:
+            rendus = [rendre_si_en_attente(rendu) or rendu for rendu in rendus]
+        traites = sum(rendu.statut in ('termine', 'echec') for rendu in rendus)
+        if traites < len(rendus):
+            return render(request, 'core/export_missions.html', {
+                'form': form, 'attente': {'fait': traites, 'total': len(rendus)}
+            }, status=202)
+
+        response = StreamingHttpResponse(archiver_rendus(rendus), content_type='application/zip')
+        response['Content-Disposition'] = f'attachment; filename="rapports_missions_{timezone.now():%Y%m%d_%H%M}.zip"'
+        return response
+    return render(request, 'core/export_missions.html', {'form': form})
 
 @login_required
 def notification_list(request):
     """Vue pour afficher la liste des notifications de l'utilisateur"""
-    notifications = request.user.notifications.all().order_by('-date_creation')
-    
     # Marquer toutes les notifications comme lues
-    unread_notifications = notifications.filter(lue=False)
-    unread_notifications.update(lue=True)
+    marquer_lues(request.user)
+    
+    notifications = paginer_par_curseur(request, request.user.notifications.all(), ('-date_creation', '-id'))
     
     context = {
         'notifications': notifications,
@@ -980,8 +830,7 @@ def notification_list(request):
 def notification_mark_read(request, notification_id):
     """Vue pour marquer une notification comme lue"""
     notification = get_object_or_404(Notification, id=notification_id, utilisateur=request.user)
-    notification.lue = True
-    notification.save()
+    marquer_lues(request.user, Notification.objects.filter(pk=notification.pk))
     
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
         return JsonResponse({'success': True})
@@ -991,7 +840,7 @@ def notification_mark_read(request, notification_id):
 @login_required
 def notification_mark_all_read(request):
     """Vue pour marquer toutes les notifications comme lues"""
-    request.user.notifications.filter(lue=False).update(lue=True)
+    marquer_lues(request.user)
     
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
         return JsonResponse({'success': True})
@@ -1002,25 +851,32 @@ def notification_mark_all_read(request):
 def notification_delete(request, notification_id):
     """Vue pour supprimer une notification"""
     notification = get_object_or_404(Notification, id=notification_id, utilisateur=request.user)
-    notification.delete()
+    supprimer_notification(notification)
     
     messages.success(request, 'Notification supprimée avec succès.')
     return redirect('notification_list')
 
-def create_notification(utilisateur, message, type_notification):
-    """Fonction utilitaire pour créer une notification"""
-    Notification.objects.create(
-        utilisateur=utilisateur,
-        message=message,
-        type_notification=type_notification
-    )
-
-
+@login_required
+async def notifications_flux(request):
+    """Flux SSE des nouvelles notifications et du compteur de non lues (core/temps_reel.py)"""
+    if not isinstance(request, ASGIRequest):
+        # Route non dirigée vers le processus ASGI (mission_manager/asgi.py) : sous WSGI le flux
+        # occuperait un worker, 204 indique à EventSource de ne pas se reconnecter
+        return HttpResponse(status=204)
+    utilisateur = await request.auser()
+    reprise = request.headers.get('Last-Event-ID', '')
+    dernier = int(reprise) if reprise.isdigit() else await dernier_identifiant(utilisateur.pk)
+    response = StreamingHttpResponse(flux(utilisateur.pk, dernier), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # nginx : transmettre chaque événement sans attendre de remplir son tampon
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
 def get_unread_notifications_count(request):
     """Fonction pour obtenir le nombre de notifications non lues"""
     if request.user.is_authenticated:
-        return request.user.notifications.filter(lue=False).count()
+        # Compteur dénormalisé : aucune requête supplémentaire
+        return request.user.notifications_non_lues
     return 0 
 
 @login_required
@@ -1034,28 +890,15 @@ def search(request):
     }
     
     if query:
-        # Recherche dans les missions
-        results['missions'] = Mission.objects.filter(
-            models.Q(titre__icontains=query) |
-            models.Q(description__icontains=query) |
-            models.Q(nature__icontains=query) |
-            models.Q(client__nom__icontains=query)
-        )[:10]
-        
-        # Recherche dans les interventions
-        results['interventions'] = Intervention.objects.filter(
-            models.Q(titre__icontains=query) |
-            models.Q(compte_rendu__icontains=query) |
-            models.Q(mission__titre__icontains=query) |
-            models.Q(mission__client__nom__icontains=query)
-        )[:10]
-        
-        # Recherche dans les clients
-        results['clients'] = Client.objects.filter(
-            models.Q(nom__icontains=query) |
-            models.Q(contact__icontains=query) |
-            models.Q(email__icontains=query)
-        )[:10]
+        # Index de recherche (core/recherche.py) : classement par pertinence, périmètre de
+        # l'utilisateur appliqué dans la requête, une pagination par type d'objet
+        results['missions'] = paginer_recherche(
+            request, Mission.objects.for_list(), 'mission', query, prefixe='missions_'
+        )
+        results['interventions'] = paginer_recherche(
+            request, Intervention.objects.for_list(), 'intervention', query, prefixe='interventions_'
+        )
+        results['clients'] = paginer_recherche(request, Client.objects.all(), 'client', query, prefixe='clients_')
     
     context = {
         'query': query,
@@ -1064,9 +907,70 @@ def search(request):
     }
     return render(request, 'core/search_results.html', context) 
 
+def metrics(request):
+    """Métriques au format Prometheus (core/metriques.py) : jeton METRIQUES_JETON, ou administrateur connecté"""
+    jeton = getattr(settings, 'METRIQUES_JETON', '')
+    if jeton:
+        autorise = constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {jeton}')
+    else:
+        autorise = is_admin(request.user)
+    if not autorise:
+        return HttpResponse(status=403)
+    return HttpResponse(exposition(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@login_required
+def media_protege(request, chemin):
+    """Fichier de MEDIA_ROOT, servi si l'utilisateur peut consulter un objet qui y renvoie"""
+    if not nom_valide(chemin):
+        raise Http404("Fichier introuvable")
+    acces = peut_consulter(request.user, chemin)
+    if acces is None:
+        raise Http404("Fichier introuvable")
+    if not acces:
+        raise PermissionDenied("Vous n'avez pas accès à ce fichier.")
+    return reponse_fichier(request, chemin)
+
+@login_required
+def televersement_creer(request):
+    """Ouvre une session de téléversement fragmenté (POST nom, taille, type, sha256 facultatif)"""
+    if request.method != 'POST':
+        return JsonResponse({'erreur': "Méthode non autorisée."}, status=405)
+    try:
+        session = creer_session(
+            request.user, request.POST.get('nom'), request.POST.get('taille'),
+            request.POST.get('type', ''), request.POST.get('sha256', '')
+        )
+    except ErreurTeleversement as exc:
+        return JsonResponse({'erreur': str(exc)}, status=exc.statut)
+    return JsonResponse(etat(session), status=201)
+
+@login_required
+def televersement_bloc(request, jeton):
+    """GET : état de la session (reprise) ; PUT : bloc suivant, corps brut avec Content-Range"""
+    session = get_object_or_404(Televersement, jeton=jeton, utilisateur=request.user)
+    if request.method == 'PUT':
+        try:
+            session = recevoir_bloc(
+                session, request, request.headers.get('Content-Range'), request.headers.get('X-Checksum-Sha256', '')
+            )
+        except ErreurTeleversement as exc:
+            session.refresh_from_db()
+            return JsonResponse({**etat(session), 'erreur': str(exc)}, status=exc.statut)
+    elif request.method != 'GET':
+        return JsonResponse({'erreur': "Méthode non autorisée."}, status=405)
+    return JsonResponse(etat(session), status=422 if session.statut == 'echec' else 200)
+
+@login_required
+def autocompletion(request):
+    """Suggestions JSON des champs à complétion automatique (?type=client|mission|utilisateur&q=...)"""
+    type_objet = request.GET.get('type', '')
+    if type_objet not in TYPES_AUTOCOMPLETION:
+        return JsonResponse({'erreur': "Type d'objet inconnu."}, status=400)
+    return JsonResponse({'resultats': suggerer(request.user, type_objet, request.GET.get('q', ''))})
+
 @admin_required
 def user_list(request):
-    utilisateurs = Utilisateur.objects.all().order_by('-date_joined')
+    utilisateurs = paginer_par_curseur(request, Utilisateur.objects.all(), ('-date_joined', '-id'))
     context = {
         'utilisateurs': utilisateurs,
         'user': request.user,
@@ -1119,11 +1023,10 @@ def intervention_compte_rendu(request, intervention_id):
         if form.is_valid():
             form.save()
             # Notification au chef de projet ou à l'admin
-            chef = intervention.mission.assigne_a or Utilisateur.objects.filter(role='administrateur').first()
+            chef = intervention.mission.assigne_a_id or next(iter(destinataires('administrateur')), None)
             if chef:
-                from .views import create_notification
-                create_notification(
-                    chef,
+                notify_many(
+                    [chef],
                     f"Compte rendu soumis pour l'intervention '{intervention.titre}'",
                     "compte_rendu_intervention"
                 )
@@ -1503,12 +1406,9 @@ def retard_list(request):
     """Liste des retards d'intervention"""
     user = request.user
     
-    if is_admin(user):
-        # Administrateur voit tous les retards
-        retards = RetardIntervention.objects.all().order_by('-date_creation')
-    else:
-        # Employé/freelance ne voit que ses retards
-        retards = RetardIntervention.objects.filter(responsable=user).order_by('-date_creation')
+    # Administrateur : tous les retards ; employé/freelance : ceux dont il est responsable
+    retards = RetardIntervention.objects.visible_to(user)
+    retards = paginer_par_curseur(request, retards.for_list(), ('-date_creation', '-id'))
     
     context = {
         'retards': retards,
@@ -1671,32 +1571,14 @@ def dashboard_retards(request):
     """Dashboard des retards"""
     user = request.user
     
-    if is_admin(user):
-        # Statistiques pour administrateur
-        total_retards = RetardIntervention.objects.count()
-        retards_en_cours = RetardIntervention.objects.filter(resolu=False).count()
-        retards_resolus = RetardIntervention.objects.filter(resolu=True).count()
-        interventions_en_retard = Intervention.objects.filter(en_retard=True, retard_resolu=False).count()
-    else:
-        # Statistiques pour employé/freelance
-        total_retards = RetardIntervention.objects.filter(responsable=user).count()
-        retards_en_cours = RetardIntervention.objects.filter(responsable=user, resolu=False).count()
-        retards_resolus = RetardIntervention.objects.filter(responsable=user, resolu=True).count()
-        interventions_en_retard = Intervention.objects.filter(
-            intervenant=user, en_retard=True, retard_resolu=False
-        ).count()
+    # Statistiques (une requête agrégée par modèle)
+    statistiques = statistiques_retards(user, is_admin(user))
     
     # Retards récents
-    if is_admin(user):
-        retards_recents = RetardIntervention.objects.all().order_by('-date_creation')[:5]
-    else:
-        retards_recents = RetardIntervention.objects.filter(responsable=user).order_by('-date_creation')[:5]
+    retards_recents = RetardIntervention.objects.visible_to(user).for_list().order_by('-date_creation')[:5]
     
     context = {
-        'total_retards': total_retards,
-        'retards_en_cours': retards_en_cours,
-        'retards_resolus': retards_resolus,
-        'interventions_en_retard': interventions_en_retard,
+        **statistiques,
         'retards_recents': retards_recents,
         'user': request.user,
     }
@@ -1706,19 +1588,8 @@ def dashboard_retards(request):
 def check_retards_automatiques(request):
     """Vérifie manuellement les interventions en retard (pour les administrateurs)"""
     if request.method == 'POST':
-        interventions_traitees = []
-        
-        # Récupérer toutes les interventions non terminées avec échéance dépassée
-        interventions = Intervention.objects.filter(
-            statut__in=['en_attente', 'en_cours'],
-            date_echeance__lt=timezone.now().date(),
-            en_retard=False
-        )
-        
-        for intervention in interventions:
-            # Utiliser la méthode du modèle
-            if intervention.verifier_retard():
-                interventions_traitees.append(intervention)
+        # Moteur partagé avec la commande check_retards
+        interventions_traitees = detecter_retards()
         
         messages.success(
             request, 
@@ -1727,11 +1598,7 @@ def check_retards_automatiques(request):
         return redirect('retard_list')
     
     # Afficher les interventions qui seraient marquées comme en retard
-    interventions_en_retard = Intervention.objects.filter(
-        statut__in=['en_attente', 'en_cours'],
-        date_echeance__lt=timezone.now().date(),
-        en_retard=False
-    )
+    interventions_en_retard = interventions_a_signaler().select_related('mission', 'intervenant')
     
     context = {
         'interventions_en_retard': interventions_en_retard,
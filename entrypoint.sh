@@ -1,9 +1,19 @@
 #!/bin/sh
 set -e
 
+# 0) Metrics shared by the gunicorn workers and background commands start from zero
+export METRIQUES_DOSSIER="${METRIQUES_DOSSIER:-/tmp/metriques}"
+rm -rf "$METRIQUES_DOSSIER" && mkdir -p "$METRIQUES_DOSSIER"
+
 # 1) Run migrations
 python manage.py migrate --noinput
 
+# 1b) Rebuild KPI rollups (catches rows written while signals were bypassed)
+python manage.py refresh_kpi_rollups
+
+# 1c) Build the search and autocomplete indexes on first start (kept in sync by signals afterwards)
+python manage.py rebuild_search_index --si-vide
+
 # 2) Create superuser if not exists via manage.py shell
 python manage.py shell <<'EOF'
 from django.contrib.auth import get_user_model
@@ -21,5 +31,12 @@ EOF
 # 3) Collect static files
 python manage.py collectstatic --noinput
 
-# 4) Start Gunicorn
+# 4) Start the PDF rendering worker in the background
+python manage.py render_pdfs &
+
+# 5) Start the notification stream (async view, long-lived connections) in its own ASGI process.
+#    The reverse proxy routes /notifications/flux/ to port 8001; every other path goes to port 8000.
+gunicorn mission_manager.asgi:application -k uvicorn.workers.UvicornWorker --bind 0.0.0.0:8001 &
+
+# 6) Start Gunicorn (WSGI: streamed PDF, ZIP and media responses are sent as they are produced)
 exec gunicorn mission_manager.wsgi:application --bind 0.0.0.0:8000
\ No newline at end of file
@@ -3,6 +3,11 @@ ASGI config for mission_manager project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+This process only serves the notification stream (an async view that keeps
+connections open): the rest of the site runs under WSGI (mission_manager.wsgi),
+where streaming responses are sent as they are produced. The reverse proxy
+routes ``ROUTES_ASGI`` here; any other path gets a 404.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -13,4 +18,20 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mission_manager.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from django.urls import reverse  # noqa: E402  (after Django setup)
+
+ROUTES_ASGI = (reverse('notifications_flux'),)
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'http' and scope['path'] not in ROUTES_ASGI:
+        await send({
+            'type': 'http.response.start',
+            'status': 404,
+            'headers': [(b'content-type', b'text/plain; charset=utf-8')],
+        })
+        await send({'type': 'http.response.body', 'body': b'Not served by the ASGI process'})
+        return
+    await django_application(scope, receive, send)
@@ -49,12 +49,16 @@ INSTALLED_APPS = [
 AUTH_USER_MODEL = 'core.Utilisateur'
 
 MIDDLEWARE = [
+    # Latence et requêtes SQL par nom d'URL (core/metriques.py) ; en tête pour tout mesurer
+    'core.metriques.MetriquesMiddleware',
     'django.middleware.security.SecurityMiddleware',
     # Whitenoise will be inserted here dynamically below
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # Inactif sauf PROFILAGE_SQL ou en-tête X-Profilage-SQL (voir core/profilage.py)
+    'core.profilage.ProfilageSQLMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -162,6 +166,135 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
 
+# -----------------------------------------------------------------------------
+# PAGINATION (listes paginées par curseur, voir core/pagination.py)
+# -----------------------------------------------------------------------------
+PAGINATION_TAILLE_PAGE = int(os.getenv('PAGINATION_TAILLE_PAGE', '25'))
+PAGINATION_TAILLE_MAX = int(os.getenv('PAGINATION_TAILLE_MAX', '100'))
+
+
+# -----------------------------------------------------------------------------
+# TABLEAUX DE BORD
+# -----------------------------------------------------------------------------
+# Durée (secondes) de mise en cache des indicateurs globaux de l'administrateur ; 0 pour désactiver
+DASHBOARD_CACHE_TTL = int(os.getenv('DASHBOARD_CACHE_TTL', '30'))
+
+
+# -----------------------------------------------------------------------------
+# RAPPORTS PDF (core/pdf.py)
+# -----------------------------------------------------------------------------
+# True : rendus traités par `manage.py render_pdfs` ; False : rendu dans la requête (dev)
+PDF_RENDU_ASYNCHRONE = os.getenv('PDF_RENDU_ASYNCHRONE', 'True') == 'True'
+# Processus de rendu de la commande export_missions_zip, par défaut de --processus (0 : un par CPU)
+PDF_EXPORT_PROCESSUS = int(os.getenv('PDF_EXPORT_PROCESSUS', '0'))
+
+
+# -----------------------------------------------------------------------------
+# AUTOCOMPLÉTION (core/autocompletion.py)
+# -----------------------------------------------------------------------------
+# Durée (secondes) de mise en cache des suggestions, par utilisateur ; 0 pour désactiver
+AUTOCOMPLETION_CACHE_TTL = int(os.getenv('AUTOCOMPLETION_CACHE_TTL', '60'))
+
+
+# -----------------------------------------------------------------------------
+# TÉLÉVERSEMENTS FRAGMENTÉS (core/televersement.py)
+# -----------------------------------------------------------------------------
+# Fichiers en cours de reconstitution ; sur le même disque que MEDIA_ROOT pour y être déplacés
+# (renommés, sans copie) à l'enregistrement du formulaire
+TELEVERSEMENT_DOSSIER = os.getenv('TELEVERSEMENT_DOSSIER', str(MEDIA_ROOT / '.televersements'))
+# Taille maximale d'un bloc et d'un fichier (octets)
+TELEVERSEMENT_TAILLE_BLOC = int(os.getenv('TELEVERSEMENT_TAILLE_BLOC', str(8 * 1024 * 1024)))
+TELEVERSEMENT_TAILLE_MAX = int(os.getenv('TELEVERSEMENT_TAILLE_MAX', str(2 * 1024 ** 3)))
+# Sessions sans activité supprimées par `manage.py purge_televersements` au-delà de ce délai
+TELEVERSEMENT_DUREE_HEURES = int(os.getenv('TELEVERSEMENT_DUREE_HEURES', '24'))
+
+
+# -----------------------------------------------------------------------------
+# MINIATURES DES IMAGES (core/miniatures.py)
+# -----------------------------------------------------------------------------
+# True : générées en arrière-plan après l'enregistrement ; False : dans la requête (tests)
+MINIATURES_ASYNCHRONE = os.getenv('MINIATURES_ASYNCHRONE', 'True') == 'True'
+MINIATURES_THREADS = int(os.getenv('MINIATURES_THREADS', '2'))
+
+
+# -----------------------------------------------------------------------------
+# STOCKAGE DÉDOUBLONNÉ DES FICHIERS JOINTS (core/stockage.py)
+# -----------------------------------------------------------------------------
+# Délai avant que `manage.py nettoyer_medias` supprime un fichier qui n'est plus référencé
+STOCKAGE_DELAI_COLLECTE_MINUTES = int(os.getenv('STOCKAGE_DELAI_COLLECTE_MINUTES', '60'))
+
+
+# -----------------------------------------------------------------------------
+# SERVICE DES FICHIERS MÉDIA (core/medias.py)
+# -----------------------------------------------------------------------------
+# Droits vérifiés par Django, transfert confié au serveur frontal :
+#   ''           : envoyé par Django (FileResponse, requêtes Range) ;
+#   'x-accel'    : nginx, avec un emplacement interne sur MEDIA_ROOT :
+#                  location /media-protege/ { internal; alias /app/media/; }
+#   'x-sendfile' : Apache (mod_xsendfile) ou lighttpd
+MEDIAS_ENVOI = os.getenv('MEDIAS_ENVOI', '')
+MEDIAS_URL_INTERNE = os.getenv('MEDIAS_URL_INTERNE', '/media-protege/')
+# Durée de conservation dans le cache du navigateur (jamais dans un cache partagé)
+MEDIAS_CACHE_SECONDES = int(os.getenv('MEDIAS_CACHE_SECONDES', '3600'))
+
+
+# -----------------------------------------------------------------------------
+# NOTIFICATIONS (core/notifications.py)
+# -----------------------------------------------------------------------------
+# Durée (secondes) de mise en cache des destinataires par rôle ; 0 pour désactiver
+NOTIFICATIONS_DESTINATAIRES_CACHE_TTL = int(os.getenv('NOTIFICATIONS_DESTINATAIRES_CACHE_TTL', '300'))
+# Flux temps réel (core/temps_reel.py, servi par le processus ASGI dédié) : scrutation des nouvelles
+# notifications par le veilleur du processus, relecture en base sans réveil, durée d'une connexion
+# avant reconnexion, délai de reprise
+NOTIFICATIONS_SSE_SCRUTATION = float(os.getenv('NOTIFICATIONS_SSE_SCRUTATION', '2'))
+NOTIFICATIONS_SSE_INTERVALLE = int(os.getenv('NOTIFICATIONS_SSE_INTERVALLE', '15'))
+NOTIFICATIONS_SSE_DUREE = int(os.getenv('NOTIFICATIONS_SSE_DUREE', '300'))
+NOTIFICATIONS_SSE_REPRISE_MS = int(os.getenv('NOTIFICATIONS_SSE_REPRISE_MS', '3000'))
+# Rétention (core/retention.py, `manage.py archiver_notifications`) : notifications lues archivées
+# au-delà de ce nombre de jours, archives supprimées au-delà du second
+NOTIFICATIONS_RETENTION_JOURS = int(os.getenv('NOTIFICATIONS_RETENTION_JOURS', '30'))
+NOTIFICATIONS_ARCHIVE_JOURS = int(os.getenv('NOTIFICATIONS_ARCHIVE_JOURS', '365'))
+# Événements répétitifs (retards automatiques) regroupés en une notification par utilisateur
+# et par fenêtre de ce nombre de minutes ; 0 : une notification par événement
+NOTIFICATIONS_FENETRE_MINUTES = int(os.getenv('NOTIFICATIONS_FENETRE_MINUTES', '60'))
+
+
+# -----------------------------------------------------------------------------
+# PROFILAGE SQL (core/profilage.py)
+# -----------------------------------------------------------------------------
+# True : toutes les requêtes sont profilées ; sinon seulement celles qui portent l'en-tête
+# X-Profilage-SQL: 1 (administrateurs, ou tout le monde en DEBUG). Bilan dans les en-têtes
+# X-SQL-* / Server-Timing et dans le journal core.profilage
+PROFILAGE_SQL = os.getenv('PROFILAGE_SQL', 'False') == 'True'
+# Nombre de requêtes répétées et de requêtes lentes détaillées
+PROFILAGE_SQL_TOP = int(os.getenv('PROFILAGE_SQL_TOP', '5'))
+# Panneau récapitulatif ajouté en bas des pages HTML profilées
+PROFILAGE_SQL_PANNEAU = os.getenv('PROFILAGE_SQL_PANNEAU', str(DEBUG)) == 'True'
+
+
+# -----------------------------------------------------------------------------
+# MÉTRIQUES PROMETHEUS (core/metriques.py, /metrics)
+# -----------------------------------------------------------------------------
+# Dossier partagé par les processus (un fichier par pid, vidé au démarrage par entrypoint.sh) ;
+# vide : seules les valeurs du worker qui répond sont exposées
+METRIQUES_DOSSIER = os.getenv('METRIQUES_DOSSIER', '')
+METRIQUES_INTERVALLE_ECRITURE = float(os.getenv('METRIQUES_INTERVALLE_ECRITURE', '1'))
+# Jeton attendu dans « Authorization: Bearer ... » ; vide : réservé aux administrateurs connectés
+METRIQUES_JETON = os.getenv('METRIQUES_JETON', '')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        # Une ligne JSON par requête profilée
+        'core.profilage': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
+
 # -----------------------------------------------------------------------------
 # DEFAULT AUTO FIELD
 # -----------------------------------------------------------------------------
@@ -15,17 +15,22 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path, include
+import re
+
+from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
 from django.views.generic import RedirectView
 
+from core.views import media_protege
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', RedirectView.as_view(pattern_name='dashboard', permanent=False)),
     path('', include('core.urls')),  # Inclut les URLs de l'app core
 ]
 
-# Configuration pour servir les fichiers média en développement
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+# Fichiers média : droits vérifiés par core.views.media_protege, en production comme en développement ;
+# l'envoi est confié au serveur frontal selon MEDIAS_ENVOI
+urlpatterns += [
+    re_path(r'^%s(?P<chemin>.+)$' % re.escape(settings.MEDIA_URL.lstrip('/')), media_protege, name='media_protege'),
+]